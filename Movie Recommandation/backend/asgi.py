@@ -0,0 +1,234 @@
+"""
+ASGI entry point - async serving mode for the CineAI backend
+POST /api/recommend is served natively on the event loop with the async Groq
+client, so one process can hold hundreds of slow LLM calls without tying up
+a thread each. Blocking database work is offloaded to a bounded thread pool.
+Every other route is handed to the Flask app through asgiref's WSGI adapter.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000 --workers 3
+"""
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from asgiref.wsgi import WsgiToAsgi
+
+from cache import cache_key
+import main
+from logging_setup import get_logger
+from upstream import AsyncUpstreamPool, UpstreamError
+from main import app as flask_app
+from prompts import cache_variant
+
+# Database calls are synchronous; cap how many run at once so a burst of
+# finished LLM calls cannot exhaust the SQLAlchemy connection pool.
+DB_THREADS = int(os.environ.get('ASYNC_DB_THREADS', 8))
+
+_db_executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix='cineai-db')
+_async_client = None
+_in_flight = {}
+logger = get_logger('asgi')
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+def get_async_client():
+    """Create the async upstream pool lazily, once per worker process"""
+    global _async_client
+    if _async_client is None and main.LLM_CONFIGURED:
+        from groq import AsyncGroq
+        _async_client = AsyncUpstreamPool(
+            [AsyncGroq(api_key=key, max_retries=0) for key in main.GROQ_API_KEYS], **main.UPSTREAM_OPTIONS)
+    return _async_client
+
+
+async def run_db(fn, *args):
+    """Run a blocking database helper inside a Flask app context on the DB pool"""
+    def call():
+        with flask_app.app_context():
+            return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, call)
+
+
+async def generate_recommendations_async(query, options):
+    """Async twin of main.generate_recommendations_with_groq"""
+    client = get_async_client()
+    if client is None:
+        return {
+            "success": False,
+            "error": "AI service not configured. Please set GROQ_API_KEY in the script."
+        }
+    try:
+        logger.debug("🤖 Calling Groq AI (Llama 3.3 70B, async) with query: %s", query)
+        started = time.perf_counter()
+        chat_completion = await client.create(**main.build_recommendation_request(query, options))
+        latency_ms = (time.perf_counter() - started) * 1000
+        main.record_stage('llm_call', latency_ms / 1000)
+        with main.timed_stage('parse'):
+            result = main.parse_recommendation_response(chat_completion.choices[0].message.content)
+        if result['success']:
+            result['movies'] = result['movies'][:options['count']]
+        result['accounting'] = main.token_accounting(
+            'llm', options, main.usage_from_completion(chat_completion), latency_ms)
+        return result
+    except UpstreamError as e:
+        logger.warning("❌ Upstream gave up: %s", e)
+        return {"success": False, "error": str(e), "status_code": e.status_code}
+    except Exception as e:
+        logger.error("❌ Error generating recommendations: %s", e)
+        return {"success": False, "error": str(e)}
+
+
+async def fetch_recommendations_async(query, mode, options):
+    """
+    Local index, cache lookup and in-loop single-flight, mirroring main.fetch_recommendations
+    Concurrent identical queries on this event loop await one shared task.
+    """
+    variant = cache_variant(**options)
+    if mode in ('local', 'auto'):
+        local_result = await run_db(main.local_recommendations, query, mode, options['count'])
+        if local_result is not None:
+            return local_result
+
+    cached_movies = await run_db(main.recommendation_cache.get, query, variant)
+    if cached_movies is not None:
+        return {"success": True, "movies": cached_movies, "cached": True, "coalesced": False, "source": "cache",
+                "accounting": {"source": "cache"}}
+
+    key = cache_key(query, variant)
+    precomputed_movies = await run_db(main.precomputed_answers.get, key)
+    if precomputed_movies is not None:
+        return {"success": True, "movies": precomputed_movies, "cached": True, "coalesced": False,
+                "source": "precomputed", "accounting": {"source": "precomputed"}}
+
+    task = _in_flight.get(key)
+    coalesced = task is not None
+    if task is None:
+        task = asyncio.ensure_future(generate_recommendations_async(query, options))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+
+    shared = await asyncio.shield(task)
+    if not coalesced and shared['success']:
+        await run_db(main.recommendation_cache.set, query, shared['movies'], variant)
+
+    result = dict(shared)
+    if 'movies' in result:
+        result['movies'] = [dict(movie) for movie in result['movies']]
+    result['cached'] = False
+    result['coalesced'] = coalesced
+    result['source'] = 'llm'
+    if coalesced:
+        result['accounting'] = main.token_accounting('llm', options)
+    return result
+
+
+async def get_recommendations(data):
+    """Async version of the /api/recommend handler - same request and response shape"""
+    if not data:
+        return 400, {"success": False, "error": "No data provided"}
+
+    query = (data.get('query') or '').strip()
+    if not query:
+        return 400, {"success": False, "error": "Query is required"}
+
+    mode = data.get('mode', flask_app.config['RECOMMENDATION_MODE'])
+    if mode not in main.RECOMMENDATION_MODES:
+        return 400, {"success": False, "error": f"mode must be one of: {', '.join(main.RECOMMENDATION_MODES)}"}
+
+    try:
+        options = main.prompt_options(data)
+    except ValueError as e:
+        return 400, {"success": False, "error": str(e)}
+
+    session_id = data.get('session_id', str(uuid.uuid4()))
+    with main.timed_stage('session'):
+        user_id = await run_db(main.get_or_create_user_id, session_id)
+    if user_id is None:
+        return 500, {"success": False, "error": "Failed to create user session"}
+
+    with main.timed_stage('fetch'):
+        result = await fetch_recommendations_async(query, mode, options)
+    if not result['success']:
+        return result.get('status_code', 500), {"success": False, "error": result.get('error')}
+
+    movies = result['movies']
+    with main.timed_stage('db_save'):
+        recommendation_id = await run_db(
+            main.save_recommendation_to_db, user_id, query, movies, result.get('accounting'))
+
+    return 200, {
+        "success": True,
+        "movies": movies,
+        "session_id": session_id,
+        "recommendation_id": recommendation_id,
+        "timestamp": datetime.utcnow().isoformat(),
+        "query": query,
+        "cached": result.get('cached', False),
+        "coalesced": result.get('coalesced', False),
+        "source": result.get('source', 'llm')
+    }
+
+
+# ==================== ASGI PLUMBING ====================
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'access-control-allow-origin', b'*'),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def app(scope, receive, send):
+    """Route the hot LLM endpoint natively and everything else to Flask"""
+    if scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                _db_executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    if scope['type'] == 'http' and scope['method'] == 'POST' and scope['path'] == '/api/recommend':
+        started = time.perf_counter()
+        try:
+            data = json.loads(await _read_body(receive) or b'null')
+        except ValueError:
+            data = None
+        try:
+            status, payload = await get_recommendations(data)
+        except Exception as e:
+            logger.exception("❌ Error in async get_recommendations: %s", e)
+            status, payload = 500, {"success": False, "error": "Internal server error"}
+        await _send_json(send, status, payload)
+        # Same series the Flask hooks record for routes served through the adapter
+        if flask_app.config['METRICS_ENABLED']:
+            main.HTTP_REQUESTS.inc(method='POST', route='/api/recommend', status=status)
+            main.HTTP_SECONDS.observe(time.perf_counter() - started, method='POST', route='/api/recommend')
+        return
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,156 @@
+"""
+Compare the sync gunicorn deployment with the async (uvicorn + asgi.py) mode
+Starts the fake LLM server, boots each serving mode against a scratch SQLite
+database, fires concurrent /api/recommend requests while probing /api/health,
+and prints throughput and latency for both.
+
+Run from the backend directory:
+    python benchmarks/bench_async_serving.py --requests 120 --concurrency 60 --latency 2
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    # Mirrors the Dockerfile CMD
+    "sync-gunicorn": lambda port: [
+        sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+        '--timeout', '120', 'main:app'],
+    "async-uvicorn": lambda port: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1',
+        '--port', str(port), '--workers', '3', '--log-level', 'warning'],
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def wait_until_up(url, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not become healthy")
+
+
+async def run_load(base_url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, failures, health = [], 0, []
+    done = asyncio.Event()
+
+    async with httpx.AsyncClient(timeout=120.0) as http:
+        async def one(i):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    # Distinct queries so neither the cache nor single-flight kicks in
+                    response = await http.post(f"{base_url}/api/recommend", json={
+                        "query": f"benchmark query {i} {time.time_ns()}",
+                        "session_id": f"bench-{i % 50}",
+                    })
+                    ok = response.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    failures += 1
+
+        async def probe_health():
+            while not done.is_set():
+                started = time.perf_counter()
+                try:
+                    await http.get(f"{base_url}/api/health", timeout=10.0)
+                    health.append(time.perf_counter() - started)
+                except httpx.HTTPError:
+                    health.append(10.0)
+                await asyncio.sleep(0.25)
+
+        prober = asyncio.ensure_future(probe_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await prober
+
+    return {
+        "elapsed": elapsed,
+        "ok": len(latencies),
+        "failed": failures,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "health_p95": percentile(health, 0.95),
+        "health_max": max(health) if health else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--requests', type=int, default=120)
+    parser.add_argument('--concurrency', type=int, default=60)
+    parser.add_argument('--latency', type=float, default=2.0, help="fake LLM latency in seconds")
+    parser.add_argument('--llm-port', type=int, default=8900)
+    parser.add_argument('--app-port', type=int, default=5055)
+    parser.add_argument('--modes', default=','.join(MODES))
+    args = parser.parse_args()
+
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(args.llm_port), '--latency', str(args.latency)])
+    results = {}
+    try:
+        time.sleep(1.0)
+        for mode in args.modes.split(','):
+            workdir = tempfile.mkdtemp(prefix=f'cineai-{mode}-')
+            env = dict(
+                os.environ,
+                GROQ_API_KEY='fake-key',
+                GROQ_BASE_URL=f'http://127.0.0.1:{args.llm_port}',
+                DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+                RECOMMENDATION_CACHE_BACKEND='none',
+            )
+            subprocess.run([sys.executable, '-c', 'import main; main.init_db()'],
+                           cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+            server = subprocess.Popen(MODES[mode](args.app_port), cwd=BACKEND_DIR, env=env,
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                base_url = f'http://127.0.0.1:{args.app_port}'
+                wait_until_up(f'{base_url}/api/health')
+                results[mode] = asyncio.run(run_load(base_url, args.requests, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        fake.terminate()
+        fake.wait()
+
+    print(f"\n{args.requests} requests, concurrency {args.concurrency}, fake LLM latency {args.latency}s\n")
+    print(f"{'mode':<16}{'ok':>6}{'fail':>6}{'req/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'health p95':>12}{'health max':>12}")
+    for mode, r in results.items():
+        print(f"{mode:<16}{r['ok']:>6}{r['failed']:>6}{r['rps']:>9.2f}{r['p50']:>8.2f}{r['p95']:>8.2f}"
+              f"{r['p99']:>8.2f}{r['health_p95']:>12.3f}{r['health_max']:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+One-at-a-time /api/recommend versus a single /api/recommend/batch call
+Starts the fake LLM server (whose generation time grows with output tokens
+and which answers packed prompts per query id), then resolves the same query
+list both ways against a scratch database with the cache disabled and prints
+wall time, LLM calls, tokens and per-query latency.
+
+Run from the backend directory:
+    python benchmarks/bench_batch_recommend.py --queries 24 --duplicates 6
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LLM_PORT = int(os.environ.get('FAKE_LLM_PORT', 8902))
+os.environ.setdefault('GROQ_API_KEY', 'fake-key')
+os.environ.setdefault('GROQ_BASE_URL', f'http://127.0.0.1:{LLM_PORT}')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'batch.db'))
+os.environ.setdefault('RECOMMENDATION_CACHE_BACKEND', 'none')
+
+import main  # noqa: E402
+
+GENRES = ['comedy', 'thriller', 'sci-fi', 'romance', 'horror', 'animated', 'war', 'heist']
+MOODS = ['feel-good', 'dark', 'slow-burn', 'mind-bending', 'classic', 'underrated']
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def wait_until_up(base_url, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base_url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Fake LLM server at {base_url} did not start")
+
+
+def token_totals():
+    stats = main.get_client().stats()
+    return stats['calls'], stats['prompt_tokens'], stats['completion_tokens']
+
+
+def one_at_a_time(http, queries):
+    before = token_totals()
+    latencies = []
+    started = time.perf_counter()
+    for query in queries:
+        call_started = time.perf_counter()
+        response = http.post('/api/recommend', json={"query": query, "session_id": "bench-single"})
+        assert response.status_code == 200, response.get_json()
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    elapsed = time.perf_counter() - started
+    after = token_totals()
+    return elapsed, [b - a for a, b in zip(before, after)], latencies
+
+
+def batched(http, queries):
+    before = token_totals()
+    started = time.perf_counter()
+    response = http.post('/api/recommend/batch', json={"queries": queries, "session_id": "bench-batch"})
+    elapsed = time.perf_counter() - started
+    body = response.get_json()
+    assert response.status_code == 200 and all(result['success'] for result in body['results']), body
+    after = token_totals()
+    return elapsed, [b - a for a, b in zip(before, after)], [result['latency_ms'] for result in body['results']]
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Batch recommendation benchmark")
+    parser.add_argument('--queries', type=int, default=24, help="distinct queries")
+    parser.add_argument('--duplicates', type=int, default=6, help="repeated queries added to the list")
+    parser.add_argument('--latency', type=float, default=0.3, help="fake time to first token")
+    parser.add_argument('--ms-per-token', type=float, default=4.0)
+    args = parser.parse_args()
+
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(LLM_PORT), '--latency', str(args.latency), '--ms-per-token', str(args.ms_per_token)])
+    try:
+        wait_until_up(os.environ['GROQ_BASE_URL'])
+        with main.app.app_context():
+            main.db.create_all()
+        distinct = [f"{MOODS[i % len(MOODS)]} {GENRES[i % len(GENRES)]} movies #{i}" for i in range(args.queries)]
+        queries = distinct + [query.upper() + '!' for query in distinct[:args.duplicates]]
+        http = main.app.test_client()
+
+        rows = [
+            ("one at a time", *one_at_a_time(http, distinct)),
+            (f"batch (pack {main.app.config['BATCH_PACK_SIZE']})", *batched(http, queries)),
+        ]
+        print(f"\n{len(distinct)} distinct queries (+{args.duplicates} duplicates in the batch), "
+              f"fake LLM {args.latency}s + {args.ms_per_token}ms/token\n")
+        print(f"{'path':<18}{'wall s':>8}{'llm calls':>11}{'prompt tok':>12}{'compl tok':>11}"
+              f"{'p50 ms':>9}{'p95 ms':>9}")
+        for label, elapsed, (calls, prompt_tokens, completion_tokens), latencies in rows:
+            print(f"{label:<18}{elapsed:>8.2f}{calls:>11}{prompt_tokens:>12}{completion_tokens:>11}"
+                  f"{percentile(latencies, 0.5):>9.0f}{percentile(latencies, 0.95):>9.0f}")
+        print("\nLatency is per request for one-at-a-time and time-to-result within the batch call.")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,84 @@
+"""
+HTTP caching benchmark for /api/history and /api/statistics
+Seeds a scratch SQLite database and times repeated requests the way the
+frontend makes them: without any caching, answered from the per-worker
+response cache, and revalidated with If-None-Match (304). Also prints the
+bytes on the wire with and without gzip/brotli and the SQL statements per
+request.
+
+Run from the backend directory:
+    python benchmarks/bench_http_cache.py --history 200 --requests 500
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'http_cache.db')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import main  # noqa: E402
+from check_query_counts import StatementCounter, sample_movies  # noqa: E402
+
+SESSION_ID = 'bench-http-cache'
+
+
+def seed(history):
+    with main.app.app_context():
+        main.db.create_all()
+        user_id = main.get_or_create_user_id(SESSION_ID)
+        main.save_batch_to_db(user_id, [(f"seed query {i}", sample_movies(i), None) for i in range(history)])
+        main.session_registry.flush()
+        return StatementCounter(main.db.engine)
+
+
+def run(client, counter, url, requests, cache_ttl, conditional, encoding):
+    """Average (us/request, bytes/response, statements/request) for `requests` GETs of url"""
+    main.response_cache.ttl = cache_ttl
+    main.response_cache.clear()
+    headers = {'Accept-Encoding': encoding} if encoding else {}
+    etag = client.get(url, headers=headers).headers.get('ETag')
+    if conditional:
+        headers['If-None-Match'] = etag
+    counter.count = 0
+    size = 0
+    started = time.perf_counter()
+    for _ in range(requests):
+        size += len(client.get(url, headers=headers).data)
+    elapsed = time.perf_counter() - started
+    return elapsed * 1e6 / requests, size / requests, counter.count / requests
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="HTTP caching benchmark")
+    parser.add_argument('--history', type=int, default=200, help="recommendations in the session")
+    parser.add_argument('--requests', type=int, default=500)
+    args = parser.parse_args()
+
+    counter = seed(args.history)
+    client = main.app.test_client()
+    cases = [
+        ('no caching', 0, False, None),
+        ('no caching, compressed', 0, False, 'br, gzip'),
+        ('response cache', 30, False, None),
+        ('response cache, compressed', 30, False, 'br, gzip'),
+        ('If-None-Match (304)', 30, True, 'br, gzip'),
+    ]
+    urls = [f'/api/history/{SESSION_ID}?limit=5', f'/api/history/{SESSION_ID}?limit=50', '/api/statistics']
+
+    print(f"\n{args.history} recommendations in the session, {args.requests} requests per case\n")
+    print(f"{'url':<44}{'case':<30}{'us/req':>9}{'bytes':>9}{'stmts':>7}")
+    for url in urls:
+        for label, cache_ttl, conditional, encoding in cases:
+            us, size, statements = run(client, counter, url, args.requests, cache_ttl, conditional, encoding)
+            print(f"{url:<44}{label:<30}{us:>9.0f}{size:>9.0f}{statements:>7.1f}")
+        print()
+
+
+if __name__ == '__main__':
+    main_bench()
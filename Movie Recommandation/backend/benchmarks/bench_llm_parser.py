@@ -0,0 +1,89 @@
+"""
+Micro-benchmark for llm_parser
+Times the original parse (fence replace + '['..']' slice + json.loads, all or
+nothing) against parse_movies on typical and damaged responses, and reports
+how many of the movies each one kept. Also measures the streaming parser.
+
+Run from the backend directory:
+    python benchmarks/bench_llm_parser.py --repeat 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from llm_parser import IncrementalMovieParser, parse_movies  # noqa: E402
+from check_llm_parser import FIVE, movie  # noqa: E402
+
+
+def legacy_parse(content):
+    """The parser generate_recommendations_with_groq used before llm_parser"""
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.replace('```json', '').replace('```', '').strip()
+    start_idx = content.find('[')
+    end_idx = content.rfind(']') + 1
+    if start_idx != -1 and end_idx > start_idx:
+        content = content[start_idx:end_idx]
+    movies = json.loads(content)
+    for entry in movies:
+        for field in ('title', 'year', 'genre', 'description', 'rating'):
+            if field not in entry:
+                raise ValueError(f"Missing required field: {field}")
+        entry['year'] = int(entry['year'])
+        entry['rating'] = float(entry['rating'])
+    return movies
+
+
+ARRAY = json.dumps(FIVE, indent=2)
+INPUTS = [
+    ("clean", ARRAY),
+    ("fenced + chatter", f"Here you go:\n```json\n{ARRAY}\n```\nEnjoy!"),
+    ("trailing comma", ARRAY.replace('8.1\n  }\n]', '8.1\n  },\n]')),
+    ("one bad movie", json.dumps(FIVE[:4] + [movie("Bad", rating="n/a")], indent=2)),
+    ("cut at max_tokens", ARRAY[:int(len(ARRAY) * 0.9)]),
+]
+
+
+def kept(parse, text):
+    try:
+        result = parse(text)
+    except Exception:
+        return 0
+    return len(result.movies if hasattr(result, 'movies') else result)
+
+
+def stream_all(text):
+    parser = IncrementalMovieParser()
+    movies = []
+    for start in range(0, len(text), 24):
+        movies += parser.feed(text[start:start + 24])
+    parser.close()
+    return movies
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="llm_parser micro-benchmark")
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"\n{'response':<20}{'legacy us':>11}{'kept':>6}{'new us':>9}{'kept':>6}{'stream us':>11}{'kept':>6}")
+    for name, text in INPUTS:
+        row = [name]
+        for parse in (legacy_parse, parse_movies, stream_all):
+            seconds = timeit.timeit(lambda: kept(parse, text), number=args.repeat)
+            row += [seconds / args.repeat * 1e6, kept(parse, text)]
+        print(f"{row[0]:<20}{row[1]:>11.1f}{row[2]:>6}{row[3]:>9.1f}{row[4]:>6}{row[5]:>11.1f}{row[6]:>6}")
+
+    big = json.dumps([movie(f"Movie {i}") for i in range(500)])
+    seconds = timeit.timeit(lambda: stream_all(big), number=20) / 20
+    print(f"\nstreaming parser throughput: {len(big) / seconds / 1e6:.1f} MB/s")
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,97 @@
+"""
+Logging overhead benchmark
+Times the per-request log lines of /api/recommend (nine of them, as in the
+handler) written the old way - print() to stdout - against the leveled
+logger: inline, buffered (background writer thread), below the level, and OFF.
+Output goes to a real file so the cost of the write itself is counted;
+--write-latency-us adds a delay per write, like stdout piped to a busy log
+collector, which is where the background writer pays off.
+
+Run from the backend directory:
+    python benchmarks/bench_logging.py --requests 20000 --write-latency-us 50
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from logging_setup import configure_logging, get_logger  # noqa: E402
+
+LINES_PER_REQUEST = 9
+DATA = {"query": "mind-bending sci-fi like Inception", "session_id": "3f1c6a2e"}
+
+
+class SlowStream:
+    """File wrapper whose writes take `latency` seconds, like a backed-up pipe"""
+
+    def __init__(self, target, latency):
+        self.target = target
+        self.latency = latency
+
+    def write(self, text):
+        if self.latency:
+            time.sleep(self.latency)
+        return self.target.write(text)
+
+    def flush(self):
+        self.target.flush()
+
+
+def print_request(_logger, i):
+    for step in range(LINES_PER_REQUEST):
+        print(f"📨 STEP {step}: request {i} data {DATA}")
+
+
+def log_request(logger, i, level):
+    for step in range(LINES_PER_REQUEST):
+        logger.log(level, "📨 STEP %d: request %d data %s", step, i, DATA)
+
+
+def run(label, requests, target, write_latency, level='INFO', buffered=False, log_at=20):
+    with open(target, 'w') as raw:
+        out = SlowStream(raw, write_latency)
+        logger = get_logger('bench')
+        configure_logging(level, buffered=buffered, stream=out)
+        started = time.perf_counter()
+        if label == 'print':
+            with contextlib.redirect_stdout(out):
+                for i in range(requests):
+                    print_request(logger, i)
+        else:
+            for i in range(requests):
+                log_request(logger, i, log_at)
+        elapsed = time.perf_counter() - started
+        # Drain the writer thread before the file is closed
+        configure_logging('OFF')
+    return elapsed * 1e6 / requests
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Logging overhead benchmark")
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--write-latency-us', type=float, default=0.0, help="delay added to every write")
+    args = parser.parse_args()
+
+    target = os.path.join(tempfile.mkdtemp(), 'bench.log')
+    cases = [
+        ('print', {}),
+        ('logging, inline', {'buffered': False}),
+        ('logging, buffered', {'buffered': True}),
+        ('debug lines at INFO', {'buffered': True, 'log_at': 10}),
+        ('LOG_LEVEL=OFF', {'level': 'OFF'}),
+    ]
+    print(f"\n{args.requests} requests x {LINES_PER_REQUEST} log lines, "
+          f"{args.write_latency_us:g} us per write\n")
+    print(f"{'mode':<22}{'us/request':>12}")
+    for label, options in cases:
+        print(f"{label:<22}{run(label, args.requests, target, args.write_latency_us / 1e6, **options):>12.1f}")
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,95 @@
+"""
+Prompt template and response-size benchmark
+Starts the fake LLM server (generation time grows with output tokens, output
+is cut at max_tokens), sends the same queries through /api/recommend for each
+template / count / description length, and reads back the token accounting
+saved with every recommendation: prompt and completion tokens, LLM latency and
+latency per completion token.
+
+Run from the backend directory:
+    python benchmarks/bench_prompt_templates.py --queries 20 --ms-per-token 4
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LLM_PORT = int(os.environ.get('FAKE_LLM_PORT', 8903))
+os.environ.setdefault('GROQ_API_KEY', 'fake-key')
+os.environ.setdefault('GROQ_BASE_URL', f'http://127.0.0.1:{LLM_PORT}')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'prompts.db'))
+os.environ.setdefault('RECOMMENDATION_CACHE_BACKEND', 'none')
+
+import main  # noqa: E402
+from bench_batch_recommend import wait_until_up  # noqa: E402
+
+# (template, count, description_length)
+VARIANTS = [
+    ('classic', 5, 'medium'),
+    ('compact', 5, 'medium'),
+    ('compact', 5, 'short'),
+    ('compact', 3, 'short'),
+    ('compact', 10, 'long'),
+]
+
+
+def run_variant(http, queries, template, count, description_length):
+    session_id = f"bench-{template}-{count}-{description_length}"
+    for query in queries:
+        response = http.post('/api/recommend', json={
+            "query": query, "session_id": session_id, "template": template,
+            "count": count, "description_length": description_length})
+        assert response.status_code == 200, response.get_json()
+    with main.app.app_context():
+        Recommendation = main.Recommendation
+        return main.db.session.query(
+                main.db.func.avg(Recommendation.prompt_tokens),
+                main.db.func.avg(Recommendation.completion_tokens),
+                main.db.func.avg(Recommendation.llm_latency_ms),
+                main.db.func.sum(Recommendation.llm_latency_ms) / main.db.func.sum(Recommendation.completion_tokens))\
+            .join(main.User, main.User.id == Recommendation.user_id)\
+            .filter(main.User.session_id == session_id)\
+            .one()
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Prompt template benchmark")
+    parser.add_argument('--queries', type=int, default=20, help="queries per variant")
+    parser.add_argument('--latency', type=float, default=0.2, help="fake time to first token")
+    parser.add_argument('--ms-per-token', type=float, default=4.0)
+    args = parser.parse_args()
+
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(LLM_PORT), '--latency', str(args.latency), '--ms-per-token', str(args.ms_per_token)])
+    try:
+        wait_until_up(os.environ['GROQ_BASE_URL'])
+        with main.app.app_context():
+            main.db.create_all()
+        http = main.app.test_client()
+        queries = [f"movies like number {i} for a rainy evening" for i in range(args.queries)]
+
+        print(f"\n{args.queries} queries per variant, fake LLM {args.latency}s + {args.ms_per_token}ms/token\n")
+        print(f"{'template':<10}{'count':>6}{'desc':>8}{'max_tokens':>12}{'prompt tok':>12}{'compl tok':>11}"
+              f"{'latency ms':>12}{'ms/token':>10}")
+        for template, count, description_length in VARIANTS:
+            max_tokens = main.build_recommendation_request('x', main.prompt_options({
+                "template": template, "count": count, "description_length": description_length}))['max_tokens']
+            prompt_tokens, completion_tokens, latency_ms, ms_per_token = run_variant(
+                http, queries, template, count, description_length)
+            print(f"{template:<10}{count:>6}{description_length:>8}{max_tokens:>12}{prompt_tokens:>12.0f}"
+                  f"{completion_tokens:>11.0f}{latency_ms:>12.0f}{ms_per_token:>10.2f}")
+        print("\nThe fake server ignores description length beyond its canned text, so completion tokens")
+        print("only shrink with the word limit; against Groq, `flask --app main token-report` gives the same view.")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == '__main__':
+    main_bench()
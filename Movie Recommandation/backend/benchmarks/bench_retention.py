@@ -0,0 +1,127 @@
+"""
+Retention job benchmark: how long live writes wait while old rows are deleted
+Seeds a scratch SQLite database with sessions and history, ages part of it,
+then runs the retention job while a background thread keeps saving
+recommendations like live traffic. Compares one huge transaction with the
+chunked default, printing the job time and the writers' save latency.
+
+Run from the backend directory:
+    python benchmarks/bench_retention.py --users 2000 --history 20
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(WORKDIR, 'retention.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + DB_PATH
+os.environ.setdefault('DB_STORAGE_MODE', 'tuned')
+os.environ.setdefault('DB_WRITE_QUEUE', 'false')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import main  # noqa: E402
+from bench_batch_recommend import percentile  # noqa: E402
+from migrations import resync_app_stats  # noqa: E402
+from retention import run_retention  # noqa: E402
+
+MOVIES = [{"title": f"Seed Movie {i}", "year": 1980 + i, "genre": "Drama", "description": "Seeded.", "rating": 7.0}
+          for i in range(40)]
+
+
+def seed(users, history, aged_share):
+    """Bulk-insert users with `history` recommendations each; the first `aged_share` are a year old"""
+    now = datetime.utcnow()
+    old = now - timedelta(days=365)
+    with main.app.app_context():
+        main.db.create_all()
+        catalog_ids = [movie_id for movie_id, _ in main.upsert_catalog_movies(MOVIES).values()]
+        aged = int(users * aged_share)
+        main.db.session.execute(main.User.__table__.insert(), [
+            {'id': n + 1, 'session_id': f"seed-{n}", 'created_at': old if n < aged else now,
+             'last_active': old if n < aged else now} for n in range(users)])
+        recommendations, items = [], []
+        for n in range(users):
+            for r in range(history):
+                recommendation_id = n * history + r + 1
+                recommendations.append({'id': recommendation_id, 'user_id': n + 1, 'query': f"seed query {r}",
+                                        'created_at': old if n < aged else now, 'source': 'llm'})
+                items.extend({'recommendation_id': recommendation_id, 'rank': k + 1, 'rating': 7.0,
+                              'movie_id': catalog_ids[(r + k) % len(catalog_ids)]} for k in range(5))
+        main.db.session.execute(main.Recommendation.__table__.insert(), recommendations)
+        main.db.session.execute(main.RecommendationItem.__table__.insert(), items)
+        main.db.session.commit()
+        resync_app_stats()
+
+
+def restore(source, target):
+    """Copy a closed SQLite database file, dropping the target's WAL files"""
+    with main.app.app_context():
+        main.db.engine.dispose()
+    for suffix in ('-wal', '-shm'):
+        if os.path.exists(target + suffix):
+            os.remove(target + suffix)
+    shutil.copyfile(source, target)
+
+
+def run(chunk_size, template):
+    """Restore the seeded database, run retention under write load; returns (report, save latencies)"""
+    restore(template, DB_PATH)
+    stop = threading.Event()
+    latencies = []
+
+    def writer():
+        with main.app.app_context():
+            user_id, _ = main.upsert_user('live-writer')
+            while not stop.is_set():
+                started = time.perf_counter()
+                main.save_recommendation_to_db(user_id, "live query", MOVIES[:5], {"source": "llm"})
+                latencies.append(time.perf_counter() - started)
+                time.sleep(0.005)
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    time.sleep(0.2)
+    with main.app.app_context():
+        report = run_retention(session_ttl_days=90, rollup_after_days=180, chunk_size=chunk_size,
+                               pause=0.01, vacuum=False)
+    stop.set()
+    thread.join()
+    return report, latencies
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Retention job benchmark")
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--history', type=int, default=20, help="recommendations per user")
+    parser.add_argument('--aged', type=float, default=0.5, help="share of users inactive for a year")
+    args = parser.parse_args()
+
+    seed(args.users, args.history, args.aged)
+    template = os.path.join(WORKDIR, 'seeded.db')
+    with main.app.app_context():
+        main.db.engine.dispose()
+    shutil.copyfile(DB_PATH, template)
+
+    print(f"\n{args.users} users x {args.history} recommendations, {args.aged:.0%} aged\n")
+    print(f"{'chunk size':>12}{'archived':>10}{'chunks':>8}{'job s':>8}{'saves':>7}"
+          f"{'save p50 ms':>13}{'save p99 ms':>13}{'save max ms':>13}")
+    for chunk_size in (10 ** 9, 500):
+        report, latencies = run(chunk_size, template)
+        latencies = [value * 1000 for value in latencies]
+        label = 'one txn' if chunk_size == 10 ** 9 else str(chunk_size)
+        print(f"{label:>12}{report['archived_recommendations']:>10}{report['chunks']:>8}{report['seconds']:>8.2f}"
+              f"{len(latencies):>7}{percentile(latencies, 0.5):>13.1f}{percentile(latencies, 0.99):>13.1f}"
+              f"{max(latencies, default=0):>13.1f}")
+
+
+if __name__ == '__main__':
+    main_bench()
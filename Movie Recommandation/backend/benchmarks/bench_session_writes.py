@@ -0,0 +1,103 @@
+"""
+Database writes spent on session bookkeeping per request, before and after
+"before" replays the original get_or_create_user (SELECT + COMMIT of
+last_active on every call); "after" is the current get_or_create_user_id
+with its in-memory session cache and batched last_active writer.
+
+Run from the backend directory:
+    python benchmarks/bench_session_writes.py --requests 2000 --sessions 100
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'session_writes.db'))
+# Flush only when the benchmark says so, so the batch size is visible
+os.environ.setdefault('LAST_ACTIVE_FLUSH_INTERVAL', '0')
+
+from sqlalchemy import event  # noqa: E402
+
+import main  # noqa: E402
+from main import db, User  # noqa: E402
+
+
+def legacy_get_or_create_user(session_id):
+    """The pre-rework implementation, kept here as the baseline"""
+    user = db.session.query(User).filter_by(session_id=session_id).first()
+    if not user:
+        user = User(session_id=session_id)
+        db.session.add(user)
+        db.session.commit()
+    else:
+        user.last_active = datetime.utcnow()
+        db.session.commit()
+    return user.id
+
+
+class WriteCounter:
+    def __init__(self, engine):
+        self.statements = 0
+        self.writes = 0
+        self.commits = 0
+        event.listen(engine, 'before_cursor_execute', self._on_execute)
+        event.listen(engine, 'commit', self._on_commit)
+
+    def reset(self):
+        self.statements = self.writes = self.commits = 0
+
+    def _on_execute(self, conn, cursor, statement, *args):
+        self.statements += 1
+        if statement.lstrip().split(None, 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE'):
+            self.writes += 1
+
+    def _on_commit(self, conn):
+        self.commits += 1
+
+
+def run(label, resolve, session_ids, counter, flush=None):
+    counter.reset()
+    started = time.perf_counter()
+    for session_id in session_ids:
+        resolve(session_id)
+    if flush:
+        flush()
+    elapsed = time.perf_counter() - started
+    calls = len(session_ids)
+    return (label, counter.statements / calls, counter.writes / calls, counter.commits / calls,
+            elapsed / calls * 1e6)
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Session bookkeeping write benchmark")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sessions', type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(7)
+    with main.app.app_context():
+        db.create_all()
+        counter = WriteCounter(db.engine)
+        before_ids = [f"before-{random.randrange(args.sessions)}" for _ in range(args.requests)]
+        after_ids = [f"after-{random.randrange(args.sessions)}" for _ in range(args.requests)]
+        results = [
+            run("before (SELECT + COMMIT per call)", legacy_get_or_create_user, before_ids, counter),
+            run("after (cache + batched writer)", main.get_or_create_user_id, after_ids, counter,
+                flush=main.session_registry.flush),
+        ]
+
+    print(f"\n{args.requests} requests over {args.sessions} sessions (one last_active flush at the end)\n")
+    print(f"{'path':<36}{'stmts/req':>10}{'writes/req':>12}{'commits/req':>13}{'us/req':>10}")
+    for label, statements, writes, commits, micros in results:
+        print(f"{label:<36}{statements:>10.3f}{writes:>12.3f}{commits:>13.3f}{micros:>10.1f}")
+
+
+if __name__ == '__main__':
+    main_bench()
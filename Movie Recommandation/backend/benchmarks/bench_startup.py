@@ -0,0 +1,116 @@
+"""
+Startup benchmark: import time and time to the first healthy response
+Import: times `import main` in fresh interpreters as it is now (Groq pool
+built on first use), with the pool built eagerly as the import used to do,
+and with the create_all + table inspection `python main.py` used to run on
+every start.
+Boot: starts gunicorn with gunicorn.conf.py against a seeded scratch SQLite
+database, with and without preload_app, and measures the time until
+/api/health answers and the latency of the first local-mode recommendation
+(which loads the local index unless the master already warmed it).
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --runs 5 --workers 3
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+WORKDIR = tempfile.mkdtemp()
+ENV = dict(os.environ, DATABASE_URL='sqlite:///' + os.path.join(WORKDIR, 'startup.db'), LOG_LEVEL='WARNING',
+           GROQ_API_KEY=os.environ.get('GROQ_API_KEY', 'bench-key'))
+
+IMPORT_CASES = {
+    "import main (lazy client)": "import main",
+    "import + eager Groq pool": "import main; main.get_client()",
+    "import + pool + create_all/inspect": (
+        "import main; main.get_client(); main.init_db()\n"
+        "with main.app.app_context(): main.db.inspect(main.db.engine).get_table_names()"),
+}
+
+
+def seed(history):
+    """Create the schema and `history` recommendations so the local index has movies to load"""
+    subprocess.run([sys.executable, '-c', f"""
+import main
+main.init_db()
+with main.app.app_context():
+    user_id = main.get_or_create_user_id('bench-startup')
+    main.save_batch_to_db(user_id, [(f"seed query {{i}}", [
+        {{"title": f"Seed Movie {{i}}-{{k}}", "year": 1980 + k, "genre": "Drama",
+          "description": "A seeded movie about space and time.", "rating": 7.0}} for k in range(5)], None)
+        for i in range({history})])
+    main.session_registry.flush()
+"""], cwd=BACKEND_DIR, env=ENV, check=True)
+
+
+def time_import(code):
+    script = f"import time\nstarted = time.perf_counter()\n{code}\nprint(time.perf_counter() - started)"
+    output = subprocess.run([sys.executable, '-c', script], cwd=BACKEND_DIR, env=ENV,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1]) * 1000
+
+
+def boot(port, workers, preload):
+    """(ms until /api/health is 200, ms for the first local recommendation)"""
+    env = dict(ENV, GUNICORN_PRELOAD='true' if preload else 'false', GUNICORN_WORKERS=str(workers))
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'main:app'],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f'http://127.0.0.1:{port}', timeout=30.0) as http:
+            while True:
+                try:
+                    if http.get('/api/health').status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.perf_counter() - started > 60:
+                    raise RuntimeError("gunicorn did not become healthy")
+                time.sleep(0.005)
+            healthy_ms = (time.perf_counter() - started) * 1000
+            first = time.perf_counter()
+            response = http.post('/api/recommend', json={
+                "query": "space and time", "session_id": "bench-startup", "mode": "local"})
+            assert response.status_code == 200, response.text
+            return healthy_ms, (time.perf_counter() - first) * 1000
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Startup benchmark")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--history', type=int, default=2000, help="seeded recommendations (5 movies each)")
+    parser.add_argument('--port', type=int, default=5099)
+    args = parser.parse_args()
+
+    seed(args.history)
+    print(f"\nimport time, median of {args.runs} fresh interpreters\n")
+    print(f"{'case':<38}{'ms':>8}")
+    for label, code in IMPORT_CASES.items():
+        print(f"{label:<38}{statistics.median(time_import(code) for _ in range(args.runs)):>8.0f}")
+
+    print(f"\ngunicorn boot, {args.workers} workers, {args.history * 5} indexed movies, median of {args.runs}\n")
+    print(f"{'mode':<20}{'healthy ms':>12}{'first local rec ms':>20}")
+    for preload in (False, True):
+        results = [boot(args.port, args.workers, preload) for _ in range(args.runs)]
+        print(f"{'preload' if preload else 'no preload':<20}{statistics.median(r[0] for r in results):>12.0f}"
+              f"{statistics.median(r[1] for r in results):>20.1f}")
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,148 @@
+"""
+Upstream pool behaviour against a misbehaving LLM provider
+Starts the fake LLM server with a per-key rate limit, random 429s and a slow
+tail, then sends the same burst of chat completions through:
+  - a bare Groq client (no retries), the way the backend used to call it
+  - UpstreamPool with one key (buckets, retries, deadline)
+  - UpstreamPool with several keys and hedging
+and prints success rate, latency percentiles and retry/hedge counts.
+Finally checks that a burst the pool rejects (more calls than a key's
+budget within the deadline) leaves the key's buckets at or above zero.
+
+Run from the backend directory:
+    python benchmarks/bench_upstream.py --requests 200 --concurrency 20
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from groq import Groq
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from upstream import UpstreamPool  # noqa: E402
+
+REQUEST = {
+    "messages": [{"role": "user", "content": "Recommend exactly 5 movies for: feel-good comedies"}],
+    "model": "llama-3.3-70b-versatile",
+    "max_tokens": 1024,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def wait_until_up(base_url, timeout=15.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            httpx.get(base_url, timeout=1.0)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Fake LLM server at {base_url} did not start")
+
+
+def run(label, call, total, concurrency):
+    latencies, failures = [], 0
+
+    def one(_):
+        started = time.perf_counter()
+        try:
+            call()
+            return time.perf_counter() - started
+        except Exception:
+            return None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for latency in executor.map(one, range(total)):
+            if latency is None:
+                failures += 1
+            else:
+                latencies.append(latency)
+    elapsed = time.perf_counter() - started
+    return label, len(latencies), failures, elapsed, latencies
+
+
+def check_rejected_burst(base_url, total, concurrency):
+    """A 60 rpm key with a 0.5 s deadline: most of the burst is rejected without spending budget"""
+    pool = UpstreamPool([Groq(api_key='fake-key-burst', base_url=base_url, max_retries=0)],
+                        max_concurrency=total, requests_per_minute=60, timeout=0.5, max_retries=0)
+    _, ok, failed, _, _ = run("rejected burst", lambda: pool.create(**REQUEST), total, concurrency)
+    key = pool.keys[0]
+    key.requests.delay(0, time.monotonic())  # refill up to now
+    print(f"\nrejected burst of {total}: {ok} ok, {failed} failed, "
+          f"{pool.stats()['attempts']} sent, request bucket {key.requests.tokens:.1f}")
+    if key.requests.tokens < 0 or key.tokens.tokens < 0:
+        raise SystemExit("rejected calls were charged to the key's buckets")
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Upstream pool benchmark")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--keys', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--rate-limit-rpm', type=int, default=600, help="fake provider limit per key")
+    parser.add_argument('--error-rate', type=float, default=0.1)
+    parser.add_argument('--slow-fraction', type=float, default=0.05)
+    parser.add_argument('--slow-latency', type=float, default=4.0)
+    parser.add_argument('--port', type=int, default=8901)
+    args = parser.parse_args()
+
+    base_url = f'http://127.0.0.1:{args.port}'
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(args.port), '--latency', str(args.latency), '--jitter', str(args.latency / 3),
+        '--rate-limit-rpm', str(args.rate_limit_rpm), '--error-rate', str(args.error_rate),
+        '--slow-fraction', str(args.slow_fraction), '--slow-latency', str(args.slow_latency)])
+    try:
+        wait_until_up(base_url)
+        keys = [f'fake-key-{index}' for index in range(args.keys)]
+        options = dict(max_concurrency=args.concurrency, requests_per_minute=args.rate_limit_rpm,
+                       timeout=30, max_retries=4, backoff_base=0.2)
+
+        bare = Groq(api_key=keys[0], base_url=base_url, max_retries=0)
+        single = UpstreamPool([Groq(api_key=keys[0], base_url=base_url, max_retries=0)], **options)
+        hedged = UpstreamPool([Groq(api_key=key, base_url=base_url, max_retries=0) for key in keys],
+                              hedge_percentile=90, **options)
+        # Let the hedged pool learn its latency distribution first
+        run("warm-up", lambda: hedged.create(**REQUEST), 30, args.concurrency)
+        for pool in (hedged,):
+            pool.retries = pool.hedges = pool.hedge_wins = pool.failures = pool.attempts = 0
+
+        scenarios = [
+            ("bare client", lambda: bare.chat.completions.create(**REQUEST), None),
+            ("pool, 1 key", lambda: single.create(**REQUEST), single),
+            (f"pool, {args.keys} keys + hedging", lambda: hedged.create(**REQUEST), hedged),
+        ]
+        print(f"\n{args.requests} requests, concurrency {args.concurrency}, fake provider: "
+              f"{args.rate_limit_rpm} rpm/key, {args.error_rate:.0%} random 429s, "
+              f"{args.slow_fraction:.0%} take {args.slow_latency}s\n")
+        print(f"{'client':<26}{'ok':>6}{'failed':>8}{'p50 s':>8}{'p95 s':>8}{'p99 s':>8}"
+              f"{'attempts':>10}{'retries':>9}{'hedges':>8}")
+        for label, call, pool in scenarios:
+            _, ok, failed, _, latencies = run(label, call, args.requests, args.concurrency)
+            stats = pool.stats() if pool else {"attempts": args.requests, "retries": 0, "hedges": 0}
+            print(f"{label:<26}{ok:>6}{failed:>8}{percentile(latencies, 0.5):>8.2f}"
+                  f"{percentile(latencies, 0.95):>8.2f}{percentile(latencies, 0.99):>8.2f}"
+                  f"{stats['attempts']:>10}{stats['retries']:>9}{stats['hedges']:>8}")
+        check_rejected_burst(base_url, args.requests, min(args.requests, 100))
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == '__main__':
+    main_bench()
@@ -0,0 +1,97 @@
+"""
+Warm-cache benchmark: LLM calls avoided by precomputing the top queries
+Replays a Zipf-distributed query stream (a few queries dominate, as in
+production) against the fake LLM server in three phases:
+
+    1. history  - builds up the recommendations table the job mines
+    2. warm     - runs `flask --app main warm-cache` once
+    3. replay   - a fresh stream of the same distribution, as after a cold start
+
+The response cache is disabled so every query not precomputed reaches the LLM.
+Prints the job report and the replay's hit rate, LLM calls and latency.
+
+Run from the backend directory:
+    python benchmarks/bench_warm_cache.py --distinct 400 --requests 600 --top 100
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+LLM_PORT = int(os.environ.get('FAKE_LLM_PORT', 8904))
+os.environ.setdefault('GROQ_API_KEY', 'fake-key')
+os.environ.setdefault('GROQ_BASE_URL', f'http://127.0.0.1:{LLM_PORT}')
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'warm.db'))
+os.environ.setdefault('RECOMMENDATION_CACHE_BACKEND', 'none')
+os.environ.setdefault('PRECOMPUTE_RELOAD_INTERVAL', '0')
+
+import main  # noqa: E402
+from bench_batch_recommend import percentile, wait_until_up  # noqa: E402
+
+
+def zipf_stream(rng, distinct, requests, exponent):
+    """`requests` queries drawn from `distinct` ones with Zipf popularity"""
+    weights = [1 / rank ** exponent for rank in range(1, distinct + 1)]
+    queries = [f"query {rank} movies for tonight" for rank in range(1, distinct + 1)]
+    return rng.choices(queries, weights=weights, k=requests)
+
+
+def replay(http, queries, session_id):
+    calls_before = main.get_client().stats()['calls']
+    sources = {}
+    latencies = []
+    for query in queries:
+        started = time.perf_counter()
+        response = http.post('/api/recommend', json={"query": query, "session_id": session_id})
+        latencies.append((time.perf_counter() - started) * 1000)
+        body = response.get_json()
+        assert response.status_code == 200, body
+        sources[body['source']] = sources.get(body['source'], 0) + 1
+    return sources, main.get_client().stats()['calls'] - calls_before, latencies
+
+
+def main_bench():
+    parser = argparse.ArgumentParser(description="Warm-cache benchmark")
+    parser.add_argument('--distinct', type=int, default=400, help="distinct queries in the distribution")
+    parser.add_argument('--requests', type=int, default=600, help="requests per phase")
+    parser.add_argument('--top', type=int, default=100, help="queries the job precomputes")
+    parser.add_argument('--exponent', type=float, default=1.1, help="Zipf exponent")
+    parser.add_argument('--latency', type=float, default=0.05, help="fake LLM latency")
+    parser.add_argument('--seed', type=int, default=3)
+    args = parser.parse_args()
+
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(LLM_PORT), '--latency', str(args.latency)])
+    try:
+        wait_until_up(os.environ['GROQ_BASE_URL'])
+        with main.app.app_context():
+            main.db.create_all()
+        http = main.app.test_client()
+        rng = random.Random(args.seed)
+
+        baseline = replay(http, zipf_stream(rng, args.distinct, args.requests, args.exponent), 'bench-history')
+        result = main.app.test_cli_runner().invoke(args=['warm-cache', '--top', str(args.top)])
+        print(result.output.strip().splitlines()[-2])
+        warmed = replay(http, zipf_stream(rng, args.distinct, args.requests, args.exponent), 'bench-replay')
+
+        print(f"\n{args.requests} requests per phase over {args.distinct} queries (Zipf {args.exponent}), "
+              f"top {args.top} precomputed\n")
+        print(f"{'phase':<10}{'precomputed':>13}{'llm calls':>11}{'p50 ms':>9}{'p95 ms':>9}")
+        for label, (sources, llm_calls, latencies) in (("cold", baseline), ("warmed", warmed)):
+            print(f"{label:<10}{sources.get('precomputed', 0) / args.requests:>13.1%}{llm_calls:>11}"
+                  f"{percentile(latencies, 0.5):>9.1f}{percentile(latencies, 0.95):>9.1f}")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == '__main__':
+    main_bench()
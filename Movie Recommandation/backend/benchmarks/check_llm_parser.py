@@ -0,0 +1,167 @@
+"""
+Corpus and fuzz check for llm_parser
+The corpus pins down how known LLM output quirks are handled (fences,
+chatter, trailing commas, truncation, wrong types, nested objects). The fuzz
+pass mangles valid responses at random and checks the invariants: parsing
+never raises, every returned movie is fully coerced, and every movie that is
+still intact in the mangled text is recovered. Streaming in random chunk
+sizes must give the same movies as parsing the whole response.
+
+Run from the backend directory:
+    python benchmarks/check_llm_parser.py --fuzz 5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from llm_parser import IncrementalMovieParser, parse_keyed_movies_response, parse_movies  # noqa: E402
+
+
+def movie(title, year=1999, **overrides):
+    entry = {"title": title, "year": year, "genre": "Drama, Crime",
+             "description": f"A story about {title} with \"quotes\", {{braces}} and a \\ backslash.",
+             "rating": 8.1}
+    entry.update(overrides)
+    return entry
+
+
+FIVE = [movie(title) for title in ("Alpha", "Bravo", "Charlie", "Delta", "Echo")]
+ARRAY = json.dumps(FIVE, indent=2)
+
+# (name, response text, expected titles, expected drop reasons, truncated)
+CORPUS = [
+    ("clean array", ARRAY, ["Alpha", "Bravo", "Charlie", "Delta", "Echo"], [], False),
+    ("json fence", f"```json\n{ARRAY}\n```", ["Alpha", "Bravo", "Charlie", "Delta", "Echo"], [], False),
+    ("bare fence", f"```\n{ARRAY}\n```", ["Alpha", "Bravo", "Charlie", "Delta", "Echo"], [], False),
+    ("chatter around", f"Here are your movies!\n{ARRAY}\nLet me know [if] you want more.",
+     ["Alpha", "Bravo", "Charlie", "Delta", "Echo"], [], False),
+    ("trailing commas", json.dumps(FIVE[:2]).replace('8.1}', '8.1,}').replace('}]', '},]'),
+     ["Alpha", "Bravo"], [], False),
+    ("truncated mid object", ARRAY[:ARRAY.index('"Delta"') + 20],
+     ["Alpha", "Bravo", "Charlie"], ["truncated"], True),
+    ("truncated after object", json.dumps(FIVE[:2])[:-1], ["Alpha", "Bravo"], [], False),
+    ("wrapper object", json.dumps({"movies": FIVE[:3]}), ["Alpha", "Bravo", "Charlie"], [], False),
+    ("truncated wrapper", json.dumps({"recommendations": FIVE[:3]})[:-40],
+     ["Alpha", "Bravo"], ["truncated"], True),
+    ("missing field", json.dumps([FIVE[0], {"title": "Nope", "year": 2000}, FIVE[1]]),
+     ["Alpha", "Bravo"], ["Missing required field: genre"], False),
+    ("bad rating", json.dumps([FIVE[0], movie("Nope", rating="great")]),
+     ["Alpha"], ["Invalid year/rating for movie: Nope"], False),
+    ("broken object", "[" + json.dumps(FIVE[0]) + ', {"title": "Nope" "year": 1}, ' + json.dumps(FIVE[1]) + "]",
+     ["Alpha", "Bravo"], ["invalid JSON"], False),
+    ("string fields", json.dumps([movie("Alpha", year="1999 (re-release)", rating="8.5/10",
+                                        genre=["Drama", "War"])]), ["Alpha"], [], False),
+    ("nested object", json.dumps([movie("Alpha", scores={"imdb": 8.1, "rt": {"critics": 90}})]),
+     ["Alpha"], [], False),
+    ("empty", "", [], [], False),
+    ("prose only", "I'm sorry, I can't help with that.", [], [], False),
+]
+
+
+def check_movie(parsed):
+    assert set(parsed) == {"title", "year", "genre", "description", "rating"}, parsed
+    assert isinstance(parsed["title"], str) and parsed["title"]
+    assert isinstance(parsed["year"], int)
+    assert isinstance(parsed["genre"], str) and isinstance(parsed["description"], str)
+    assert isinstance(parsed["rating"], float) and 0.0 <= parsed["rating"] <= 10.0
+
+
+def stream(text, rng):
+    parser = IncrementalMovieParser()
+    movies, position = [], 0
+    while position < len(text):
+        size = rng.randint(1, 40)
+        movies += parser.feed(text[position:position + size])
+        position += size
+    parser.close()
+    return movies
+
+
+def run_corpus():
+    failures = 0
+    rng = random.Random(1)
+    for name, text, titles, reasons, truncated in CORPUS:
+        result = parse_movies(text)
+        got = ([m["title"] for m in result.movies], [d["reason"] for d in result.dropped], result.truncated)
+        ok = got == (titles, reasons, truncated)
+        for parsed in result.movies:
+            check_movie(parsed)
+        streamed = [m["title"] for m in stream(text, rng)]
+        ok = ok and streamed == titles
+        if not ok:
+            failures += 1
+            print(f"FAIL {name}: got {got}, streamed {streamed}")
+    # Trailing commas are only repaired outside strings
+    text = json.dumps([movie("Alpha", description="Lists like [a, b,] and {c,} stay as written")])
+    parsed = parse_movies(text.replace('}]', ',}]'))
+    if [m["description"] for m in parsed.movies] != ["Lists like [a, b,] and {c,} stay as written"]:
+        failures += 1
+        print(f"FAIL trailing comma inside a string: {parsed.movies}")
+    keyed = parse_keyed_movies_response("```json\n" + json.dumps({"q1": FIVE[:2], "q2": [{"title": "x"}]}) + "\n```")
+    if list(keyed) != ["q1"] or len(keyed["q1"]) != 2:
+        failures += 1
+        print(f"FAIL keyed response: {keyed}")
+    print(f"corpus: {len(CORPUS) + 2 - failures}/{len(CORPUS) + 2} cases ok")
+    return failures
+
+
+def mangle(rng):
+    movies = [movie(f"Movie {rng.randrange(10000)}", rating=round(rng.uniform(6, 10), 1))
+              for _ in range(rng.randint(1, 8))]
+    text = json.dumps(movies, indent=rng.choice([None, 2]))
+    operations = rng.sample(["fence", "chatter", "trailing", "truncate", "corrupt"], rng.randint(1, 3))
+    if "trailing" in operations:
+        text = text.replace("}", ",}", 1)
+    if "corrupt" in operations:
+        index = rng.randrange(len(text))
+        text = text[:index] + rng.choice(['"', '{', '}', ',', ':']) + text[index:]
+    if "truncate" in operations:
+        text = text[:rng.randrange(1, len(text) + 1)]
+    if "fence" in operations:
+        text = f"```json\n{text}\n```"
+    if "chatter" in operations:
+        text = f"Sure, here you go:\n{text}\nEnjoy!"
+    # Movies whose exact serialization survived untouched must be recovered
+    intact = [m["title"] for m in movies if json.dumps(m) in text or json.dumps(m, indent=2) in text]
+    return text, intact
+
+
+def run_fuzz(iterations, seed):
+    rng = random.Random(seed)
+    failures = 0
+    for iteration in range(iterations):
+        text, intact = mangle(rng)
+        try:
+            result = parse_movies(text)
+            for parsed in result.movies:
+                check_movie(parsed)
+            titles = [m["title"] for m in result.movies]
+            missing = [title for title in intact if title not in titles]
+            assert not missing, f"lost intact movies {missing}"
+            streamed = stream(text, rng)
+            if not result.salvaged:
+                assert [m["title"] for m in streamed] == titles or result.dropped, "stream and whole parse differ"
+        except AssertionError as e:
+            failures += 1
+            if failures <= 5:
+                print(f"FAIL fuzz #{iteration}: {e}\n{text[:300]!r}")
+        except Exception as e:
+            failures += 1
+            if failures <= 5:
+                print(f"FAIL fuzz #{iteration} raised {type(e).__name__}: {e}\n{text[:300]!r}")
+    print(f"fuzz: {iterations - failures}/{iterations} mangled responses ok (seed {seed})")
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="llm_parser corpus and fuzz check")
+    parser.add_argument('--fuzz', type=int, default=2000, help="fuzz iterations")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+    sys.exit(1 if run_corpus() + run_fuzz(args.fuzz, args.seed) else 0)
@@ -0,0 +1,66 @@
+"""
+last_active check for the session registry
+A session this worker has never seen (served by another worker, or before a
+restart) is resolved from the database as a cache miss. The miss must still
+count as activity: after flush() the user's last_active has to move forward,
+otherwise the retention job would expire a session that is in use.
+
+Run from the backend directory:
+    python benchmarks/check_sessions.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ.setdefault('DATABASE_URL', 'sqlite:///' + os.path.join(tempfile.mkdtemp(), 'sessions.db'))
+
+import main  # noqa: E402
+from sessions import SessionRegistry  # noqa: E402
+
+SESSION_ID = 'check-sessions'
+
+
+def last_active(user_id):
+    return main.db.session.get(main.User, user_id).last_active
+
+
+def new_registry():
+    """A second worker's registry: same database, empty cache, no background writer"""
+    return SessionRegistry(main.upsert_user, main.flush_last_active, flush_interval=0)
+
+
+def run_check():
+    failures = 0
+    with main.app.app_context():
+        main.db.create_all()
+        first = new_registry()
+        user_id = first.get_user_id(SESSION_ID)
+        if first.stats()['pending_last_active']:
+            failures += 1
+            print("FAIL a new session queued a last_active update its insert already set")
+
+        stale = datetime.utcnow() - timedelta(days=30)
+        main.db.session.execute(main.User.__table__.update()
+                                .where(main.User.id == user_id).values(last_active=stale))
+        main.db.session.commit()
+
+        second = new_registry()
+        if second.get_user_id(SESSION_ID) != user_id:
+            failures += 1
+            print("FAIL the second registry resolved a different user")
+        second.flush()
+        main.db.session.expire_all()
+        if last_active(user_id) <= stale:
+            failures += 1
+            print(f"FAIL last_active stayed at {last_active(user_id)} after a cache miss and flush()")
+    print(f"sessions: {3 - failures}/3 checks ok")
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if run_check() else 0)
@@ -0,0 +1,266 @@
+"""
+Fake Groq/OpenAI-compatible chat completion server for local benchmarks
+Answers POST /openai/v1/chat/completions with a canned movie list after a
+configurable delay, so the backend can be load tested without the real API.
+It can also misbehave like a real provider: a per-key requests-per-minute
+limit and random failures answered with 429 + Retry-After, a slow tail, and
+answers in the untidy shapes real models produce (--shape, see SHAPES).
+
+Run with:
+    python benchmarks/fake_llm_server.py --port 8900 --latency 2.0
+then start the backend with GROQ_BASE_URL=http://127.0.0.1:8900 GROQ_API_KEY=fake
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import defaultdict, deque
+
+# Packed multi-query prompts list their queries as a JSON object after this marker
+PACKED_QUERIES_RE = re.compile(r'Preferences by id: (\{.*?\})\n')
+# Response size requested by the prompt templates in prompts.py
+COUNT_RE = re.compile(r'exactly (\d+) movies')
+WORDS_RE = re.compile(r'at most (\d+) words')
+
+import uvicorn
+
+# Ways a model wraps or damages its JSON; 'mixed' picks one per request
+SHAPES = ('json', 'fenced', 'prose', 'trailing-comma', 'bad-entry', 'truncated', 'mixed')
+
+MOVIES = [
+    {"title": "The Shawshank Redemption", "year": 1994, "genre": "Drama",
+     "description": "Two imprisoned men bond over years, finding solace and eventual redemption through acts of common decency.",
+     "rating": 9.3},
+    {"title": "Groundhog Day", "year": 1993, "genre": "Comedy, Fantasy, Romance",
+     "description": "A cynical weatherman relives the same day over and over until he learns to become a better person.",
+     "rating": 8.0},
+    {"title": "Back to the Future", "year": 1985, "genre": "Adventure, Comedy, Sci-Fi",
+     "description": "A teenager is accidentally sent thirty years into the past in a time-traveling DeLorean.",
+     "rating": 8.5},
+    {"title": "Spirited Away", "year": 2001, "genre": "Animation, Adventure, Family",
+     "description": "A young girl wanders into a world ruled by gods and spirits and must work to free her parents.",
+     "rating": 8.6},
+    {"title": "Mad Max: Fury Road", "year": 2015, "genre": "Action, Adventure, Sci-Fi",
+     "description": "In a post-apocalyptic wasteland, a drifter and a rebel warrior flee a tyrant across the desert.",
+     "rating": 8.1},
+]
+
+
+class FakeLLM:
+    """Holds the behaviour knobs shared by every request"""
+
+    def __init__(self, latency=1.0, jitter=0.0, chunk_delay=0.02, rate_limit_rpm=0,
+                 error_rate=0.0, slow_fraction=0.0, slow_latency=0.0, ms_per_token=0.0, shape='json'):
+        self.latency = latency
+        self.jitter = jitter
+        self.chunk_delay = chunk_delay
+        self.rate_limit_rpm = rate_limit_rpm
+        self.error_rate = error_rate
+        self.slow_fraction = slow_fraction
+        self.slow_latency = slow_latency
+        self.ms_per_token = ms_per_token
+        self.shape = shape
+        self.requests = 0
+        self.rejected = 0
+        self._windows = defaultdict(deque)
+
+    def retry_after(self, api_key):
+        """Seconds the caller must wait if this request should get a 429, else None"""
+        if self.error_rate and random.random() < self.error_rate:
+            return 1
+        if not self.rate_limit_rpm:
+            return None
+        now = time.monotonic()
+        window = self._windows[api_key]
+        while window and now - window[0] >= 60:
+            window.popleft()
+        if len(window) >= self.rate_limit_rpm:
+            return max(1, math.ceil(60 - (now - window[0])))
+        window.append(now)
+        return None
+
+    @staticmethod
+    def movies(prompt):
+        """As many canned movies as the prompt asks for, descriptions cut to its word limit"""
+        count = COUNT_RE.search(prompt)
+        words = WORDS_RE.search(prompt)
+        movies = []
+        for index in range(int(count.group(1)) if count else len(MOVIES)):
+            movie = dict(MOVIES[index % len(MOVIES)])
+            if index >= len(MOVIES):
+                movie['title'] += f" {index // len(MOVIES) + 1}"
+            if words:
+                movie['description'] = ' '.join(movie['description'].split()[:int(words.group(1))])
+            movies.append(movie)
+        return movies
+
+    def shaped(self, movies):
+        """Serialize the answer in this server's --shape"""
+        shape = random.choice(SHAPES[:-1]) if self.shape == 'mixed' else self.shape
+        if shape == 'bad-entry' and movies:
+            movies = [dict(movie) for movie in movies]
+            movies[-1]['rating'] = f"{movies[-1]['rating']}/10"
+            movies[-1].pop('title')
+        content = json.dumps(movies, indent=2)
+        if shape == 'fenced':
+            return f"```json\n{content}\n```"
+        if shape == 'prose':
+            return f"Here are some movies you might enjoy:\n\n{content}\n\nEnjoy your movie night!"
+        if shape == 'trailing-comma':
+            return content.replace('\n  }', ',\n  }').replace('}\n]', '},\n]')
+        if shape == 'truncated':
+            return content[:max(1, len(content) - len(content) // (2 * max(1, len(movies))))]
+        return content
+
+    def content(self, request):
+        prompt = ''.join(message.get('content', '') for message in request.get('messages', []))
+        movies = self.movies(prompt)
+        packed = PACKED_QUERIES_RE.search(prompt)
+        if packed:
+            content = json.dumps({key: movies for key in json.loads(packed.group(1))}, indent=2)
+        else:
+            content = self.shaped(movies)
+        # Like a real model, stop at max_tokens (~4 characters per token)
+        if request.get('max_tokens'):
+            content = content[:request['max_tokens'] * 4]
+        return content
+
+    @staticmethod
+    def prompt_tokens(request):
+        return sum(len(message.get('content', '')) for message in request.get('messages', [])) // 4
+
+    def delay(self):
+        if self.slow_fraction and random.random() < self.slow_fraction:
+            return self.slow_latency
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+    def completion(self, model, request):
+        content = self.content(request)
+        prompt_tokens = self.prompt_tokens(request)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            },
+        }
+
+    def chunks(self, model, request):
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        content = self.content(request)
+        prompt_tokens = self.prompt_tokens(request)
+        for start in range(0, len(content), 24):
+            yield {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": content[start:start + 24]}, "finish_reason": None}],
+            }
+        yield {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+            # Groq reports usage for streamed completions on the last chunk
+            "x_groq": {"id": completion_id, "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4,
+            }},
+        }
+
+
+def create_app(llm):
+    async def _read_body(receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                return body
+
+    async def app(scope, receive, send):
+        if scope['type'] != 'http':
+            return
+        if scope['method'] != 'POST' or not scope['path'].endswith('/chat/completions'):
+            await send({'type': 'http.response.start', 'status': 404, 'headers': []})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        request = json.loads(await _read_body(receive) or b'{}')
+        model = request.get('model', 'fake-model')
+        llm.requests += 1
+        api_key = dict(scope['headers']).get(b'authorization', b'')
+        retry_after = llm.retry_after(api_key)
+        if retry_after is not None:
+            llm.rejected += 1
+            body = json.dumps({"error": {"message": "Rate limit reached", "type": "requests",
+                                         "code": "rate_limit_exceeded"}}).encode()
+            await send({'type': 'http.response.start', 'status': 429,
+                        'headers': [(b'content-type', b'application/json'),
+                                    (b'retry-after', str(retry_after).encode())]})
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        await asyncio.sleep(llm.delay())
+
+        if request.get('stream'):
+            await send({'type': 'http.response.start', 'status': 200,
+                        'headers': [(b'content-type', b'text/event-stream')]})
+            for chunk in llm.chunks(model, request):
+                await send({'type': 'http.response.body', 'more_body': True,
+                            'body': f"data: {json.dumps(chunk)}\n\n".encode()})
+                await asyncio.sleep(llm.chunk_delay)
+            await send({'type': 'http.response.body', 'body': b"data: [DONE]\n\n"})
+            return
+
+        completion = llm.completion(model, request)
+        # Real completions take longer the more tokens they generate
+        await asyncio.sleep(completion['usage']['completion_tokens'] * llm.ms_per_token / 1000)
+        body = json.dumps(completion).encode()
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': [(b'content-type', b'application/json')]})
+        await send({'type': 'http.response.body', 'body': body})
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency', type=float, default=1.0, help="seconds before the response starts")
+    parser.add_argument('--jitter', type=float, default=0.0, help="+/- seconds of random latency")
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help="seconds between stream chunks")
+    parser.add_argument('--rate-limit-rpm', type=int, default=0, help="requests per minute per API key before 429s")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of requests answered with a random 429")
+    parser.add_argument('--slow-fraction', type=float, default=0.0, help="share of requests taking --slow-latency")
+    parser.add_argument('--slow-latency', type=float, default=5.0, help="seconds for the slow tail")
+    parser.add_argument('--ms-per-token', type=float, default=0.0, help="extra generation time per completion token")
+    parser.add_argument('--shape', choices=SHAPES, default='json', help="how single-query answers are formatted")
+    args = parser.parse_args()
+
+    llm = FakeLLM(latency=args.latency, jitter=args.jitter, chunk_delay=args.chunk_delay,
+                  rate_limit_rpm=args.rate_limit_rpm, error_rate=args.error_rate,
+                  slow_fraction=args.slow_fraction, slow_latency=args.slow_latency,
+                  ms_per_token=args.ms_per_token, shape=args.shape)
+    uvicorn.run(create_app(llm), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
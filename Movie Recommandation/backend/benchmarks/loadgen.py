@@ -0,0 +1,312 @@
+"""
+End-to-end load test of the CineAI backend against the fake LLM server
+Each scenario boots the fake LLM server and the backend (gunicorn or the
+async uvicorn mode) on a fresh scratch database, then replays a mix of
+simulated users: every user keeps one session, asks for recommendations
+drawn from a Zipf query distribution (popular queries repeat, as in
+production), reads its history and the statistics page. Reports per endpoint
+p50/p95/p99 latency, requests/sec, errors, and how much the database grew.
+
+    python benchmarks/loadgen.py                             # every scenario
+    python benchmarks/loadgen.py --quick --scenarios mixed   # smoke run
+    python benchmarks/loadgen.py --output before.json
+    python benchmarks/loadgen.py --baseline before.json      # exit 1 on a regression
+
+Run from the backend directory. No network access or Groq key is needed.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from sqlalchemy import create_engine, inspect, text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [BACKEND_DIR, os.path.join(BACKEND_DIR, 'benchmarks')]
+
+from bench_async_serving import MODES, percentile, wait_until_up  # noqa: E402
+from storage import database_uri  # noqa: E402
+
+GENRES = ['comedy', 'thriller', 'sci-fi', 'romance', 'horror', 'animated', 'war', 'heist', 'noir', 'western']
+MOODS = ['feel-good', 'dark', 'slow-burn', 'mind-bending', 'classic', 'underrated', 'cozy', 'tense']
+
+# Endpoint weights per scenario, the fake LLM's behaviour and the backend's environment.
+# 'queries' is the number of distinct queries the Zipf distribution draws from.
+SCENARIOS = {
+    'mixed': {
+        'description': "typical traffic: recommendations with repeats, history and statistics reads",
+        'mix': {'recommend': 0.55, 'history': 0.30, 'statistics': 0.12, 'clear': 0.03},
+        'queries': 300,
+        'llm': ['--latency', '0.3', '--jitter', '0.1'],
+    },
+    'cold-llm': {
+        'description': "every recommendation is a new query, so each one reaches the LLM",
+        'mix': {'recommend': 1.0},
+        'queries': 0,
+        'llm': ['--latency', '0.5', '--jitter', '0.2'],
+    },
+    'hot-cache': {
+        'description': "a few popular queries, answered from the cache after the first time",
+        'mix': {'recommend': 1.0},
+        'queries': 20,
+        'llm': ['--latency', '0.5'],
+    },
+    'read-heavy': {
+        'description': "users browsing their history and the statistics page",
+        'mix': {'recommend': 0.1, 'history': 0.6, 'statistics': 0.3},
+        'queries': 100,
+        'llm': ['--latency', '0.3'],
+    },
+    'flaky-llm': {
+        'description': "messy model output, random 429s and a slow tail",
+        'mix': {'recommend': 0.7, 'history': 0.2, 'statistics': 0.1},
+        'queries': 300,
+        'llm': ['--latency', '0.4', '--shape', 'mixed', '--error-rate', '0.05',
+                '--slow-fraction', '0.05', '--slow-latency', '3'],
+        'env': {'UPSTREAM_BACKOFF_BASE': '0.1', 'UPSTREAM_BACKOFF_MAX': '1'},
+    },
+}
+
+# Percentiles compared by --baseline, with the samples needed before each one is more than noise
+CHECKED_FIELDS = {'p95': 20, 'p99': 100}
+# Latency changes smaller than this (ms) are never reported
+NOISE_FLOOR_MS = 5.0
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def make_query(rng, rank=None):
+    """A realistic preference; the same rank always gives the same text"""
+    if rank is None:
+        return f"{rng.choice(MOODS)} {rng.choice(GENRES)} movies like title {rng.randrange(10 ** 9)}"
+    local = random.Random(rank)
+    return f"{local.choice(MOODS)} {local.choice(GENRES)} movies for night {rank}"
+
+
+class Recorder:
+    """Latencies and failures per endpoint"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.failures = {}
+        self.statuses = {}
+
+    def add(self, endpoint, seconds, status):
+        self.statuses.setdefault(endpoint, {}).setdefault(status, 0)
+        self.statuses[endpoint][status] += 1
+        if status is not None and 200 <= status < 300:
+            self.latencies.setdefault(endpoint, []).append(seconds)
+        else:
+            self.failures[endpoint] = self.failures.get(endpoint, 0) + 1
+
+    def summary(self, elapsed):
+        rows = {}
+        for endpoint in sorted(set(self.latencies) | set(self.failures)):
+            latencies = self.latencies.get(endpoint, [])
+            rows[endpoint] = {
+                'ok': len(latencies),
+                'failed': self.failures.get(endpoint, 0),
+                'rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+                'p50': round(percentile(latencies, 0.50) * 1000, 1),
+                'p95': round(percentile(latencies, 0.95) * 1000, 1),
+                'p99': round(percentile(latencies, 0.99) * 1000, 1),
+                'statuses': {str(status): count for status, count in self.statuses.get(endpoint, {}).items()},
+            }
+        return rows
+
+
+async def run_users(base_url, scenario, users, requests, seed):
+    """`users` concurrent sessions sharing `requests` requests; returns (recorder, elapsed)"""
+    rng = random.Random(seed)
+    recorder = Recorder()
+    endpoints, weights = zip(*scenario['mix'].items())
+    popularity = zipf_weights(scenario['queries']) if scenario['queries'] else None
+    remaining = [requests]
+
+    async def user(http, session_id):
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            endpoint = rng.choices(endpoints, weights)[0]
+            if endpoint == 'recommend':
+                rank = rng.choices(range(1, len(popularity) + 1), popularity)[0] if popularity else None
+                call = http.post('/api/recommend', json={"query": make_query(rng, rank), "session_id": session_id})
+            elif endpoint == 'history':
+                call = http.get(f'/api/history/{session_id}', params={"limit": 20})
+            elif endpoint == 'statistics':
+                call = http.get('/api/statistics')
+            else:
+                call = http.delete(f'/api/clear-history/{session_id}')
+            started = time.perf_counter()
+            try:
+                status = (await call).status_code
+            except httpx.HTTPError:
+                status = None
+            recorder.add(endpoint, time.perf_counter() - started, status)
+
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0, limits=limits) as http:
+        started = time.perf_counter()
+        await asyncio.gather(*(user(http, f"load-{seed}-{n}") for n in range(users)))
+        return recorder, time.perf_counter() - started
+
+
+def database_size(database_url):
+    """(bytes on disk, {table: rows}) for the scratch database"""
+    engine = create_engine(database_uri(database_url))
+    try:
+        with engine.connect() as connection:
+            rows = {table: connection.execute(text(f'SELECT COUNT(*) FROM "{table}"')).scalar()
+                    for table in inspect(connection).get_table_names()}
+            if engine.dialect.name == 'postgresql':
+                size = connection.execute(text("SELECT pg_database_size(current_database())")).scalar()
+            else:
+                path = engine.url.database
+                size = sum(os.path.getsize(path + suffix) for suffix in ('', '-wal')
+                           if os.path.exists(path + suffix))
+    finally:
+        engine.dispose()
+    return size, rows
+
+
+def run_scenario(name, scenario, args):
+    workdir = tempfile.mkdtemp(prefix=f'cineai-load-{name}-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(workdir, 'load.db')}"
+    env = dict(
+        os.environ,
+        GROQ_API_KEY='fake-key',
+        GROQ_BASE_URL=f'http://127.0.0.1:{args.llm_port}',
+        DATABASE_URL=database_url,
+        RECOMMENDATION_CACHE_PATH=os.path.join(workdir, 'cache.db'),
+        LOG_LEVEL='WARNING',
+        **scenario.get('env', {}),
+    )
+    fake = subprocess.Popen([
+        sys.executable, os.path.join(BACKEND_DIR, 'benchmarks', 'fake_llm_server.py'),
+        '--port', str(args.llm_port), *scenario['llm']])
+    server = None
+    try:
+        subprocess.run([sys.executable, '-c', 'import main; main.init_db()'],
+                       cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL)
+        server = subprocess.Popen(MODES[args.mode](args.app_port), cwd=BACKEND_DIR, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        base_url = f'http://127.0.0.1:{args.app_port}'
+        wait_until_up(f'{base_url}/api/health')
+        size_before, rows_before = database_size(database_url)
+        recorder, elapsed = asyncio.run(run_users(base_url, scenario, args.users, args.requests, args.seed))
+        size_after, rows_after = database_size(database_url)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        fake.terminate()
+        fake.wait()
+
+    endpoints = recorder.summary(elapsed)
+    completed = sum(row['ok'] for row in endpoints.values())
+    return {
+        'elapsed': round(elapsed, 2),
+        'rps': round(completed / elapsed, 2) if elapsed else 0.0,
+        'endpoints': endpoints,
+        'db_bytes_before': size_before,
+        'db_bytes_growth': size_after - size_before,
+        'db_bytes_per_request': round((size_after - size_before) / completed, 1) if completed else 0.0,
+        'db_rows_growth': {table: rows_after.get(table, 0) - rows_before.get(table, 0)
+                           for table in sorted(rows_after) if rows_after.get(table, 0) != rows_before.get(table, 0)},
+    }
+
+
+def print_report(results, args):
+    print(f"\n{args.mode}, {args.users} users, {args.requests} requests per scenario\n")
+    print(f"{'scenario':<12}{'endpoint':<12}{'ok':>6}{'fail':>6}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, result in results.items():
+        for endpoint, row in result['endpoints'].items():
+            print(f"{name:<12}{endpoint:<12}{row['ok']:>6}{row['failed']:>6}{row['rps']:>9.1f}"
+                  f"{row['p50']:>9.1f}{row['p95']:>9.1f}{row['p99']:>9.1f}")
+    print(f"\n{'scenario':<12}{'req/s':>9}{'db growth':>12}{'bytes/req':>11}  rows added")
+    for name, result in results.items():
+        rows = ', '.join(f"{table} +{count}" for table, count in result['db_rows_growth'].items())
+        print(f"{name:<12}{result['rps']:>9.1f}{result['db_bytes_growth'] / 1024:>10.0f}KB"
+              f"{result['db_bytes_per_request']:>11.0f}  {rows}")
+
+
+def regressions(results, baseline, tolerance):
+    """Human-readable list of metrics worse than the baseline by more than `tolerance`"""
+    found = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if previous['rps'] and result['rps'] < previous['rps'] * (1 - tolerance):
+            found.append(f"{name}: req/s {previous['rps']} -> {result['rps']}")
+        for endpoint, row in result['endpoints'].items():
+            before = previous['endpoints'].get(endpoint)
+            if before is None:
+                continue
+            for field, min_samples in CHECKED_FIELDS.items():
+                if min(row['ok'], before['ok']) < min_samples:
+                    continue
+                if before[field] and row[field] > max(before[field] * (1 + tolerance),
+                                                      before[field] + NOISE_FLOOR_MS):
+                    found.append(f"{name} {endpoint}: {field} {before[field]} ms -> {row[field]} ms")
+            if row['failed'] > before['failed'] + max(1, before['ok'] * tolerance / 10):
+                found.append(f"{name} {endpoint}: failures {before['failed']} -> {row['failed']}")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CineAI end-to-end load test")
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help=f"comma separated, from: {', '.join(SCENARIOS)}")
+    parser.add_argument('--mode', choices=list(MODES), default='sync-gunicorn')
+    parser.add_argument('--users', type=int, default=20, help="concurrent simulated users")
+    parser.add_argument('--requests', type=int, default=400, help="requests per scenario")
+    parser.add_argument('--quick', action='store_true', help="small run for a local smoke test")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--database-url', help="run against this database instead of a scratch SQLite file")
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="results JSON of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a regression")
+    parser.add_argument('--llm-port', type=int, default=8905)
+    parser.add_argument('--app-port', type=int, default=5056)
+    args = parser.parse_args()
+    if args.quick:
+        args.users, args.requests = min(args.users, 8), min(args.requests, 80)
+
+    names = args.scenarios.split(',')
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    results = {}
+    for name in names:
+        print(f"▶ {name}: {SCENARIOS[name]['description']}")
+        results[name] = run_scenario(name, SCENARIOS[name], args)
+    print_report(results, args)
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump({'mode': args.mode, 'users': args.users, 'requests': args.requests,
+                       'scenarios': results}, out, indent=2)
+    if args.baseline:
+        with open(args.baseline) as source:
+            baseline = json.load(source)['scenarios']
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print(f"\n❌ {len(found)} regression(s) beyond {args.tolerance:.0%}:")
+            for line in found:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"\n✅ No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""
+Concurrent writer stress test for the SQLite storage modes
+Starts N worker processes (like gunicorn workers) with T threads each, all
+saving recommendations into one fresh SQLite file at the same time, and
+counts saves that failed (e.g. "database is locked").
+
+Exits non-zero if the tuned mode loses any write. bench_storage_backends.py
+runs the same workload against PostgreSQL.
+
+Run from the backend directory:
+    python benchmarks/stress_sqlite_writers.py --processes 4 --threads 8 --saves 25
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def sample_movies(worker, number):
+    return [
+        {
+            'title': f"Stress Movie {worker}-{number}-{rank}",
+            'year': 1990 + rank,
+            'genre': 'Drama',
+            'description': 'A movie written by the stress test.',
+            'rating': 7.0 + rank / 10,
+        }
+        for rank in range(5)
+    ]
+
+
+def configure(mode, database_url):
+    # Must run before importing main: the engine is created at import time
+    os.environ['DATABASE_URL'] = database_url
+    os.environ['DB_STORAGE_MODE'] = mode
+    os.environ['LAST_ACTIVE_FLUSH_INTERVAL'] = '0'
+    os.environ.setdefault('LOCAL_INDEX_REFRESH_INTERVAL', '3600')
+
+
+def create_schema(mode, database_url):
+    configure(mode, database_url)
+    import main
+    with main.app.app_context():
+        main.db.create_all()
+
+
+def run_worker(mode, database_url, worker, threads, saves, start_at, results):
+    configure(mode, database_url)
+    import main
+
+    with main.app.app_context():
+        user_id, _ = main.upsert_user(f"stress-{mode}-{worker}")
+
+    failed = []
+
+    def writer(thread):
+        with main.app.app_context():
+            for number in range(saves):
+                recommendation_id = main.save_recommendation_to_db(
+                    user_id, f"stress {worker} {thread} {number}",
+                    sample_movies(f"{worker}.{thread}", number))
+                if recommendation_id is None:
+                    failed.append(1)
+
+    while time.time() < start_at:
+        time.sleep(0.001)
+    pool = [threading.Thread(target=writer, args=(thread,)) for thread in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    results.put((threads * saves, len(failed),
+                 main.write_queue.stats() if main.write_queue else None))
+
+
+def stress(mode, processes, threads, saves, database_url=None):
+    """Run one concurrent write round; a fresh SQLite file is used unless database_url is given"""
+    database_url = database_url or 'sqlite:///' + os.path.join(tempfile.mkdtemp(), f'stress_{mode}.db')
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=create_schema, args=(mode, database_url))
+    setup.start()
+    setup.join()
+    results = context.Queue()
+    start_at = time.time() + 3  # lets every process finish importing first
+    workers = [
+        context.Process(target=run_worker,
+                        args=(mode, database_url, worker, threads, saves, start_at, results))
+        for worker in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    collected = [results.get() for _ in workers]
+    elapsed = time.time() - start_at
+    for worker in workers:
+        worker.join()
+
+    attempted = sum(total for total, _, _ in collected)
+    failed = sum(failures for _, failures, _ in collected)
+    batches = [queue_stats for _, _, queue_stats in collected if queue_stats]
+    average_batch = (sum(stats['jobs'] for stats in batches) / max(1, sum(stats['batches'] for stats in batches))
+                     if batches else 1.0)
+    return mode, attempted, failed, attempted / elapsed, average_batch
+
+
+def main_stress():
+    parser = argparse.ArgumentParser(description="SQLite concurrent writer stress test")
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--saves', type=int, default=25, help="saves per thread")
+    parser.add_argument('--modes', default='default,tuned')
+    args = parser.parse_args()
+
+    writers = args.processes * args.threads
+    print(f"\n{writers} concurrent writers ({args.processes} processes x {args.threads} threads), "
+          f"{args.saves} saves each\n")
+    print(f"{'mode':<10}{'saves':>8}{'failed':>8}{'saves/s':>10}{'avg batch':>11}")
+    tuned_failures = 0
+    for mode in args.modes.split(','):
+        mode, attempted, failed, rate, average_batch = stress(mode, args.processes, args.threads, args.saves)
+        print(f"{mode:<10}{attempted:>8}{failed:>8}{rate:>10.1f}{average_batch:>11.2f}")
+        if mode == 'tuned':
+            tuned_failures = failed
+
+    if tuned_failures:
+        print(f"\n❌ tuned mode lost {tuned_failures} writes")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main_stress()
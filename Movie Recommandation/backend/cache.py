@@ -0,0 +1,278 @@
+"""
+Recommendation response cache
+Sits in front of the Groq call so trivially different phrasings of the same
+request ("Feel-good 90s comedies!" vs "feel good 90s comedies") share one entry.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from logging_setup import get_logger
+
+logger = get_logger('cache')
+
+# Words that carry no signal for a movie preference. Negations ("not", "no",
+# "without") are deliberately kept because they change the meaning of a query.
+STOPWORDS = frozenset({
+    'a', 'an', 'the', 'and', 'or', 'of', 'to', 'in', 'on', 'for', 'with',
+    'about', 'from', 'by', 'at', 'as', 'is', 'are', 'be', 'some', 'any',
+    'i', 'me', 'my', 'we', 'us', 'our', 'you', 'your', 'it', 'that', 'this',
+    'want', 'like', 'love', 'watch', 'see', 'find', 'show', 'give', 'get',
+    'recommend', 'recommendation', 'recommendations', 'suggest', 'please',
+    'movie', 'movies', 'film', 'films', 'something', 'would', 'could', 'can',
+})
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]+")
+
+
+def normalize_query(query):
+    """
+    Fold a free-text query into a cache key
+    Lowercases, replaces punctuation with spaces, collapses whitespace and
+    drops stopwords. Falls back to the folded text if only stopwords remain.
+    """
+    folded = _PUNCTUATION_RE.sub(' ', (query or '').lower())
+    tokens = folded.split()
+    meaningful = [token for token in tokens if token not in STOPWORDS]
+    return ' '.join(meaningful or tokens)
+
+
+def cache_key(query, variant=None):
+    """
+    Key for a query's cached answer; `variant` separates response shapes
+    (e.g. a different movie count) that must not share an entry
+    """
+    key = normalize_query(query)
+    return f"{key}|{variant}" if variant else key
+
+
+# ==================== BACKENDS ====================
+
+class MemoryCacheBackend:
+    """In-process LRU store - fastest, but private to a single worker"""
+
+    name = 'memory'
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """
+    File-backed LRU store shared by every gunicorn worker on the host
+    Each thread keeps its own connection; WAL mode lets readers proceed
+    while another worker is writing.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS recommendation_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_recommendation_cache_last_access"
+                " ON recommendation_cache (last_access)"
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            # Connections must not be shared across a fork (gunicorn --preload)
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value FROM recommendation_cache WHERE key = ? AND expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute(
+            "UPDATE recommendation_cache SET last_access = ? WHERE key = ?",
+            (now, key),
+        )
+        return row[0]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO recommendation_cache (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl, now),
+            )
+            conn.execute("DELETE FROM recommendation_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM recommendation_cache WHERE key IN ("
+                " SELECT key FROM recommendation_cache"
+                " ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM recommendation_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM recommendation_cache")
+
+    def size(self):
+        return self._connect().execute("SELECT COUNT(*) FROM recommendation_cache").fetchone()[0]
+
+
+# ==================== CACHE FACADE ====================
+
+class RecommendationCache:
+    """Normalizes queries, serializes movie lists and tracks hit/miss counters"""
+
+    def __init__(self, backend, ttl=3600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _count(self, attribute):
+        with self._lock:
+            setattr(self, attribute, getattr(self, attribute) + 1)
+
+    def get(self, query, variant=None):
+        """Return the cached movie list for a query, or None on a miss"""
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(cache_key(query, variant))
+        except Exception as e:
+            self._count('errors')
+            logger.warning("⚠️  Recommendation cache read failed: %s", e)
+            return None
+        if value is None:
+            self._count('misses')
+            return None
+        self._count('hits')
+        return json.loads(value)
+
+    def peek(self, query, variant=None):
+        """Like get(), but without touching the hit/miss counters (used for polling)"""
+        if not self.enabled:
+            return None
+        try:
+            value = self.backend.get(cache_key(query, variant))
+        except Exception:
+            return None
+        return json.loads(value) if value is not None else None
+
+    def set(self, query, movies, variant=None):
+        """Store a movie list under the normalized query"""
+        if not self.enabled:
+            return
+        try:
+            self.backend.set(cache_key(query, variant), json.dumps(movies), self.ttl)
+        except Exception as e:
+            self._count('errors')
+            logger.warning("⚠️  Recommendation cache write failed: %s", e)
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        """Counters are per worker process; size reflects the backend itself"""
+        lookups = self.hits + self.misses
+        stats = {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.enabled else "none",
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0,
+        }
+        if self.enabled:
+            try:
+                stats["size"] = self.backend.size()
+                stats["max_entries"] = self.backend.max_entries
+            except Exception:
+                stats["size"] = None
+        return stats
+
+
+def create_recommendation_cache(backend_name, ttl, max_entries, path=None):
+    """Build a cache from configuration ('memory', 'sqlite' or 'none')"""
+    backend_name = (backend_name or 'none').lower()
+    if backend_name == 'memory':
+        backend = MemoryCacheBackend(max_entries=max_entries)
+    elif backend_name == 'sqlite':
+        backend = SQLiteCacheBackend(path, max_entries=max_entries)
+    elif backend_name in ('none', 'off', 'disabled'):
+        backend = None
+    else:
+        raise ValueError(f"Unknown recommendation cache backend: {backend_name}")
+    return RecommendationCache(backend, ttl=ttl)
@@ -0,0 +1,33 @@
+"""
+Gunicorn settings for the sync deployment
+    gunicorn -c gunicorn.conf.py main:app
+
+With preload_app the master imports main once and warms the local index and
+precomputed answers; workers fork with all of it already in memory
+(copy-on-write) instead of each importing and loading it again. Nothing that
+holds a socket is shared: the master closes its database connections before
+the fork, each worker drops the inherited pool in post_fork, and the Groq
+clients are only built on a worker's first LLM call.
+"""
+
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 3))
+threads = int(os.environ.get('GUNICORN_THREADS', 2))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+
+def when_ready(server):
+    """Runs in the master after the (preloaded) app is imported, before any worker forks"""
+    if preload_app:
+        import main
+        main.warm_worker_state()
+
+
+def post_fork(server, worker):
+    """Forget pooled connections inherited from the master without closing its sockets"""
+    if preload_app:
+        import main
+        with main.app.app_context():
+            main.db.engine.dispose(close=False)
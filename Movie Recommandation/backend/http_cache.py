@@ -0,0 +1,205 @@
+"""
+HTTP-level caching and compression for the read endpoints
+History and statistics responses carry an ETag built from a cheap validator
+read from the database (a session's newest recommendation, the app_stats
+counters row). A client that already holds the current body gets 304 Not
+Modified; a worker that already serialized it serves the cached bytes. The
+validator always comes from the database, so a worker never serves a body
+another worker has made stale - the in-process cache only saves the page
+queries and the serialization. Large JSON bodies are compressed with brotli
+when the package is installed, gzip otherwise.
+"""
+
+import gzip
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import timezone
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # optional: pip install brotli
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+
+
+def make_etag(*parts):
+    """Short digest of the values a response depends on"""
+    return hashlib.blake2b(json.dumps(parts, default=str).encode(), digest_size=12).hexdigest()
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' or None for a request's Accept-Encoding (werkzeug MIMEAccept)"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Conditional GET check; If-None-Match takes precedence over If-Modified-Since
+    `last_modified` is a naive UTC datetime, as stored in the database.
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0, tzinfo=timezone.utc) <= request.if_modified_since
+    return False
+
+
+def _validators(response, etag, last_modified, cache_control):
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def not_modified_response(etag, last_modified=None, cache_control='no-cache'):
+    return _validators(Response(status=304), etag, last_modified, cache_control)
+
+
+class CachedBody:
+    """Serialized JSON body plus its compressed variants, built on first use"""
+
+    def __init__(self, etag, body, last_modified=None):
+        self.etag = etag
+        self.body = body
+        self.last_modified = last_modified
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        if encoding not in self._encoded:
+            self._encoded[encoding] = compress(self.body, encoding)
+        return self._encoded[encoding]
+
+    def response(self, accept_encodings, min_bytes, cache_control='no-cache'):
+        """200 response with validators; compressed when large enough and accepted"""
+        encoding = choose_encoding(accept_encodings) if min_bytes and len(self.body) >= min_bytes else None
+        response = Response(self.encoded(encoding) if encoding else self.body, mimetype=JSON_MIMETYPE)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return _validators(response, self.etag, self.last_modified, cache_control)
+
+
+def compress_response(response, accept_encodings, min_bytes):
+    """Compress a finished JSON response in place (after_request) if it is large enough"""
+    if (not min_bytes or response.status_code != 200 or response.mimetype != JSON_MIMETYPE
+            or response.direct_passthrough or response.is_streamed or 'Content-Encoding' in response.headers):
+        return response
+    body = response.get_data()
+    encoding = choose_encoding(accept_encodings) if len(body) >= min_bytes else None
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+    return response
+
+
+class ResponseCache:
+    """
+    Short-lived per-worker cache of serialized responses
+    Entries are grouped by scope (a user id, or 'statistics') so a write can
+    drop every cached page of that scope at once; scopes are evicted LRU. A
+    scope may carry an alias (the session id the user was looked up by).
+    get() only returns a body whose ETag matches the current validator.
+    """
+
+    def __init__(self, ttl=30.0, max_scopes=1024, max_entries_per_scope=8):
+        self.ttl = ttl
+        self.max_scopes = max_scopes
+        self.max_entries_per_scope = max_entries_per_scope
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self._scopes = OrderedDict()  # scope -> {key: (expires_at, CachedBody)}
+        self._aliases = {}  # alias -> scope
+        self._alias_of = {}  # scope -> alias
+        self._lock = threading.Lock()
+
+    def scope_for(self, alias):
+        with self._lock:
+            return self._aliases.get(alias)
+
+    def has(self, scope, key):
+        """Whether a (possibly stale) entry exists - worth reading the validator for"""
+        with self._lock:
+            return key in self._scopes.get(scope, {})
+
+    def get(self, scope, key, etag):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._scopes.get(scope, {}).get(key)
+            if entry is None or entry[0] <= now or entry[1].etag != etag:
+                self.misses += 1
+                return None
+            self._scopes.move_to_end(scope)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, scope, key, cached_body, alias=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            entries = self._scopes.setdefault(scope, {})
+            entries[key] = (time.monotonic() + self.ttl, cached_body)
+            while len(entries) > self.max_entries_per_scope:
+                entries.pop(next(iter(entries)))
+            self._scopes.move_to_end(scope)
+            if alias is not None:
+                self._drop_alias(scope)
+                self._aliases[alias] = scope
+                self._alias_of[scope] = alias
+            while len(self._scopes) > self.max_scopes:
+                self._drop_alias(self._scopes.popitem(last=False)[0])
+
+    def invalidate(self, *scopes):
+        with self._lock:
+            for scope in scopes:
+                if self._scopes.pop(scope, None) is not None:
+                    self.invalidations += 1
+                self._drop_alias(scope)
+
+    def clear(self):
+        with self._lock:
+            self._scopes.clear()
+            self._aliases.clear()
+            self._alias_of.clear()
+
+    def _drop_alias(self, scope):
+        alias = self._alias_of.pop(scope, None)
+        if alias is not None and self._aliases.get(alias) == scope:
+            del self._aliases[alias]
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "scopes": len(self._scopes),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "invalidations": self.invalidations,
+                "ttl_seconds": self.ttl,
+                "compression": 'br' if brotli is not None else 'gzip',
+            }
@@ -0,0 +1,312 @@
+"""
+Parsing helpers for Groq AI movie responses
+Shared by the blocking, streaming and batch recommendation paths.
+
+Responses are parsed with a fast path (one json.loads of the whole array) and,
+when that fails, a salvage pass that scans for complete {...} objects while
+tracking string/escape state. The salvage pass tolerates code fences, chatter
+around the JSON, trailing commas and output cut off at max_tokens, keeps every
+valid movie and reports what it had to drop.
+"""
+
+import json
+import re
+
+REQUIRED_FIELDS = ('title', 'year', 'genre', 'description', 'rating')
+
+# Characters the scanner has to look at; everything else is skipped in C
+_SIGNIFICANT_RE = re.compile(r'[{}"\\]')
+# A string literal (kept as is) or a comma right before a closing bracket
+_TRAILING_COMMA_RE = re.compile(r'"(?:[^"\\]|\\.)*"|,\s*([}\]])')
+_YEAR_RE = re.compile(r'\d{4}')
+_NUMBER_RE = re.compile(r'-?\d+(?:\.\d+)?')
+_MOVIE_ANCHOR_RE = re.compile(r'\{\s*"title"\s*:')
+_decoder = json.JSONDecoder()
+
+
+def coerce_movie(movie):
+    """
+    Validate a single movie object and return it with fields coerced to the stored types
+    Accepts the usual LLM variations ("1994", "8.5/10", genre lists). Raises
+    ValueError when a field is missing or cannot be converted.
+    """
+    if not isinstance(movie, dict):
+        raise ValueError("Movie entry is not an object")
+    try:
+        title, year, genre, description, rating = (
+            movie['title'], movie['year'], movie['genre'], movie['description'], movie['rating'])
+    except KeyError as e:
+        raise ValueError(f"Missing required field: {e.args[0]}")
+    if title is None or year is None or genre is None or description is None or rating is None:
+        missing = next(field for field in REQUIRED_FIELDS if movie[field] is None)
+        raise ValueError(f"Missing required field: {missing}")
+
+    # Exact type checks first: the common case needs no conversion at all
+    try:
+        if type(year) is not int:
+            year = int(_YEAR_RE.search(str(year)).group())
+        if type(rating) is not float:
+            rating = float(rating) if type(rating) is int else float(_NUMBER_RE.search(str(rating)).group())
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f"Invalid year/rating for movie: {movie.get('title')}")
+
+    if type(title) is not str:
+        title = str(title)
+    title = title.strip()
+    if not title:
+        raise ValueError("Missing required field: title")
+    if type(genre) is not str:
+        genre = ', '.join(str(part) for part in genre) if isinstance(genre, (list, tuple)) else str(genre)
+    return {
+        'title': title,
+        'year': year,
+        'genre': genre,
+        'description': description if type(description) is str else str(description),
+        'rating': rating if 0.0 <= rating <= 10.0 else min(10.0, max(0.0, rating)),
+    }
+
+
+def _strip_fences(content):
+    content = content.strip()
+    if content.startswith('```'):
+        content = content.replace('```json', '').replace('```', '').strip()
+    return content
+
+
+def _drop_trailing_comma(match):
+    return match.group(1) or match.group()
+
+
+def _loads_lenient(text):
+    """json.loads, retried once with trailing commas (outside strings) removed"""
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        repaired = _TRAILING_COMMA_RE.sub(_drop_trailing_comma, text)
+        if repaired == text:
+            raise
+        return json.loads(repaired)
+
+
+def _unwrap(data):
+    """The movie list inside a response, or None"""
+    if isinstance(data, dict):
+        for key in ('movies', 'recommendations', 'results'):
+            if isinstance(data.get(key), list):
+                return data[key]
+    return data if isinstance(data, list) else None
+
+
+class ParseResult:
+    """Movies recovered from a response plus a report of what was dropped"""
+
+    def __init__(self, movies, dropped, truncated=False, salvaged=False):
+        self.movies = movies
+        self.dropped = dropped
+        self.truncated = truncated
+        self.salvaged = salvaged
+
+
+def parse_movies(content):
+    """
+    Parse a complete Groq AI response without raising
+    Returns a ParseResult; `salvaged` is True when the fast path failed and
+    movies were recovered object by object.
+    """
+    content = _strip_fences(content or '')
+
+    # Fast path: a well-formed array (or wrapper object) decodes in one call
+    start_idx = content.find('[')
+    end_idx = content.rfind(']') + 1
+    if start_idx != -1 and end_idx > start_idx:
+        try:
+            movies = _unwrap(_loads_lenient(content[start_idx:end_idx]))
+            if movies is None and content.lstrip().startswith('{'):
+                movies = _unwrap(_loads_lenient(content))
+        except json.JSONDecodeError:
+            movies = None
+        if movies is not None:
+            valid, dropped = [], []
+            for index, movie in enumerate(movies):
+                try:
+                    valid.append(coerce_movie(movie))
+                except ValueError as e:
+                    dropped.append({"index": index, "reason": str(e), "text": json.dumps(movie)[:200]})
+            if valid or not dropped:
+                return ParseResult(valid, dropped)
+
+    parser = IncrementalMovieParser()
+    movies = parser.feed(content)
+    parser.close()
+    if any(dropped['reason'] != 'truncated' for dropped in parser.dropped):
+        movies = _resync(content, movies)
+    return ParseResult(movies, parser.dropped, truncated=parser.truncated, salvaged=True)
+
+
+def _resync(content, movies):
+    """
+    Second salvage pass after the scanner lost its place
+    A stray quote flips the scanner's string state for the rest of the text,
+    so decode again from every '{"title":' anchor and add what it missed.
+    """
+    anchored = []
+    position = 0
+    while True:
+        match = _MOVIE_ANCHOR_RE.search(content, position)
+        if match is None:
+            break
+        try:
+            candidate, position = _decoder.raw_decode(content, match.start())
+            anchored.append(coerce_movie(candidate))
+        except ValueError:
+            position = match.end()
+    if len(anchored) <= len(movies):
+        return movies
+    seen = {(movie['title'], movie['year']) for movie in anchored}
+    return anchored + [movie for movie in movies if (movie['title'], movie['year']) not in seen]
+
+
+class IncrementalMovieParser:
+    """
+    Pull complete movie objects out of a JSON array while it is still streaming
+    Tracks string/escape state and brace nesting so each object can be decoded
+    the moment its closing brace arrives. Leading chatter and code fences are
+    ignored because nothing is captured until the first '{'.
+    """
+
+    def __init__(self):
+        self._buffer = ''
+        self._scan_pos = 0
+        self._object_starts = []
+        # Per open object: did a nested object already fail to decode?
+        self._child_failed = []
+        self._in_string = False
+        self._escaped = False
+        self._objects_seen = 0
+        self.truncated = False
+        self.dropped = []
+
+    def feed(self, chunk):
+        """Consume the next piece of text and return any movies it completed"""
+        self._buffer += chunk
+        movies = []
+        buffer = self._buffer
+        position = self._scan_pos
+        if self._escaped and position < len(buffer):
+            # The previous chunk ended on a backslash inside a string
+            self._escaped = False
+            position += 1
+        search = _SIGNIFICANT_RE.search
+        while True:
+            match = search(buffer, position)
+            if match is None:
+                break
+            position = match.start()
+            char = buffer[position]
+            if self._in_string:
+                if char == '\\':
+                    if position + 1 >= len(buffer):
+                        self._escaped = True
+                        position += 1
+                        break
+                    position += 2
+                    continue
+                if char == '"':
+                    self._in_string = False
+            elif char == '"':
+                if self._object_starts:
+                    self._in_string = True
+            elif char == '{':
+                self._object_starts.append(position)
+                self._child_failed.append(False)
+            elif char == '}' and self._object_starts:
+                start = self._object_starts.pop()
+                movie = self._decode(buffer[start:position + 1], report=not self._child_failed.pop())
+                if movie is not None:
+                    movies.append(movie)
+            position += 1
+        self._scan_pos = len(buffer)
+
+        # Drop text that can no longer belong to an open object
+        if not self._object_starts:
+            self._buffer = ''
+            self._scan_pos = 0
+        elif self._object_starts[0] > 0:
+            offset = self._object_starts[0]
+            self._buffer = self._buffer[offset:]
+            self._scan_pos -= offset
+            self._object_starts = [start - offset for start in self._object_starts]
+        return movies
+
+    def close(self):
+        """Mark the end of the response; an object still open was cut off (max_tokens)"""
+        if self._object_starts:
+            self.truncated = True
+            self.dropped.append({
+                "index": self._objects_seen,
+                "reason": "truncated",
+                "text": self._buffer[self._object_starts[-1]:][:200],
+            })
+        self._buffer = ''
+        self._scan_pos = 0
+        self._object_starts = []
+        self._child_failed = []
+
+    def _decode(self, text, report):
+        try:
+            candidate = _loads_lenient(text)
+        except json.JSONDecodeError:
+            # Only the innermost broken object is reported, not every enclosing one
+            if report:
+                self._drop(text, "invalid JSON")
+            if self._child_failed:
+                self._child_failed[-1] = True
+            return None
+        # Wrapper objects ({"movies": [...]}) and nested values are not movies
+        if not isinstance(candidate, dict) or 'title' not in candidate:
+            return None
+        try:
+            movie = coerce_movie(candidate)
+        except ValueError as e:
+            self._drop(text, str(e))
+            return None
+        self._objects_seen += 1
+        return movie
+
+    def _drop(self, text, reason):
+        self.dropped.append({"index": self._objects_seen, "reason": reason, "text": text[:200]})
+        self._objects_seen += 1
+
+
+def parse_keyed_movies_response(content):
+    """
+    Parse a packed multi-query response ({"q1": [movies], "q2": [movies]})
+    Returns {key: movies} for every key with at least one valid movie; invalid
+    entries are skipped so one bad movie does not cost the whole batch.
+    Raises json.JSONDecodeError for unparseable text.
+    """
+    content = _strip_fences(content)
+    start_idx = content.find('{')
+    end_idx = content.rfind('}') + 1
+    if start_idx != -1 and end_idx > start_idx:
+        content = content[start_idx:end_idx]
+
+    packed = _loads_lenient(content)
+    if not isinstance(packed, dict):
+        raise ValueError("Invalid response format - expected object keyed by query id")
+
+    results = {}
+    for key, movies in packed.items():
+        if isinstance(movies, dict):
+            movies = movies.get('movies')
+        if not isinstance(movies, list):
+            continue
+        valid = []
+        for movie in movies:
+            try:
+                valid.append(coerce_movie(movie))
+            except ValueError:
+                continue
+        if valid:
+            results[key] = valid
+    return results
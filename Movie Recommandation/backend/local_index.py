@@ -0,0 +1,214 @@
+"""
+Local retrieval engine over every movie the LLM has already recommended
+Keeps a deduplicated catalog (title + year) in memory with a BM25 index over
+title, genre and description, so common queries can be answered on CPU in
+milliseconds without an upstream call.
+"""
+
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+
+from cache import STOPWORDS
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_DECADE_RE = re.compile(r"\b(?:(19|20)?(\d)0)'?s\b")
+_YEAR_RE = re.compile(r"\b(19\d{2}|20\d{2})\b")
+
+# Genre terms are repeated so a genre match outweighs a passing mention in a plot
+GENRE_WEIGHT = 3
+TITLE_WEIGHT = 2
+
+
+def _stem(token):
+    if len(token) > 4 and token.endswith('ies'):
+        return token[:-3] + 'y'
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords removed and plurals folded"""
+    return [_stem(token) for token in _TOKEN_RE.findall((text or '').lower()) if token not in STOPWORDS]
+
+
+def year_range(query):
+    """Extract a (start, end) release-year window from "90s", "1980s" or "2004" in a query"""
+    text = (query or '').lower()
+    decade = _DECADE_RE.search(text)
+    if decade:
+        century = decade.group(1) or ('20' if decade.group(2) in '012' else '19')
+        start = int(century + decade.group(2) + '0')
+        return start, start + 9
+    year = _YEAR_RE.search(text)
+    if year:
+        return int(year.group(1)), int(year.group(1))
+    return None
+
+
+class LocalMovieIndex:
+    """
+    Incrementally updated BM25 index
+    Rows are pulled from the movie catalog by increasing id, so every worker
+    converges on the same catalog regardless of which worker saved a row.
+    """
+
+    def __init__(self, load_rows_since, refresh_interval=5.0, k1=1.5, b=0.75):
+        self.load_rows_since = load_rows_since
+        self.refresh_interval = refresh_interval
+        self.k1 = k1
+        self.b = b
+        self.movies = []
+        self.last_row_id = 0
+        self.queries_served = 0
+        self._keys = {}
+        self._postings = defaultdict(dict)
+        self._doc_lengths = []
+        self._total_length = 0
+        self._seen_ids = set()
+        self._last_refresh = 0.0
+        self._lock = threading.RLock()
+
+    # ---------- building ----------
+
+    def _add_movie(self, movie):
+        key = (' '.join(movie['title'].lower().split()), int(movie['year']))
+        doc_id = self._keys.get(key)
+        if doc_id is not None:
+            existing = self.movies[doc_id]
+            existing['times_recommended'] += 1
+            # Running mean of the ratings the LLM has given this title
+            existing['rating'] += (float(movie['rating']) - existing['rating']) / existing['times_recommended']
+            return
+
+        doc_id = len(self.movies)
+        self._keys[key] = doc_id
+        self.movies.append({
+            'title': movie['title'],
+            'year': int(movie['year']),
+            'genre': movie['genre'],
+            'description': movie['description'],
+            'rating': float(movie['rating']),
+            'times_recommended': max(1, int(movie.get('times_recommended', 1))),
+        })
+        terms = (tokenize(movie['title']) * TITLE_WEIGHT
+                 + tokenize(movie['genre']) * GENRE_WEIGHT
+                 + tokenize(movie['description']))
+        frequencies = defaultdict(int)
+        for term in terms:
+            frequencies[term] += 1
+        for term, frequency in frequencies.items():
+            self._postings[term][doc_id] = frequency
+        self._doc_lengths.append(len(terms))
+        self._total_length += len(terms)
+
+    def add_rows(self, rows):
+        """
+        Index rows this worker has just written, ahead of the next refresh
+        Movies already in the index only have their popularity and rating updated.
+        """
+        with self._lock:
+            for row in rows:
+                if row['id'] > self.last_row_id:
+                    self._seen_ids.add(row['id'])
+                self._add_movie(row)
+
+    def refresh(self, force=False):
+        """Pull rows inserted since the last refresh (by any worker)"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            self._last_refresh = now
+            while True:
+                rows = self.load_rows_since(self.last_row_id)
+                if not rows:
+                    break
+                for row in rows:
+                    if row['id'] not in self._seen_ids:
+                        self._add_movie(row)
+                self.last_row_id = max(self.last_row_id, rows[-1]['id'])
+            self._seen_ids = {row_id for row_id in self._seen_ids if row_id > self.last_row_id}
+
+    # ---------- querying ----------
+
+    def search(self, query, limit=5):
+        """
+        Return up to `limit` (movie, score, match_fraction) tuples
+        match_fraction is the share of distinct query terms a movie contains.
+        """
+        self.refresh()
+        terms = set(tokenize(query))
+        window = year_range(query)
+        if window:
+            # The decade/year is applied as a filter rather than matched as text
+            terms = {term for term in terms if not term.isdigit()}
+        if not terms and not window:
+            return []
+
+        with self._lock:
+            document_count = len(self.movies)
+            if document_count == 0:
+                return []
+            average_length = self._total_length / document_count
+            scores = defaultdict(float)
+            matched = defaultdict(int)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (document_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, frequency in postings.items():
+                    length_norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / average_length
+                    scores[doc_id] += idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+                    matched[doc_id] += 1
+
+            candidates = scores.keys() if terms else range(document_count)
+            if window:
+                candidates = [doc_id for doc_id in candidates
+                              if window[0] <= self.movies[doc_id]['year'] <= window[1]]
+
+            ranked = sorted(
+                candidates,
+                key=lambda doc_id: scores.get(doc_id, 0.0)
+                * (1 + 0.1 * math.log1p(self.movies[doc_id]['times_recommended'])),
+                reverse=True,
+            )[:limit]
+            return [
+                (dict(self.movies[doc_id]), scores.get(doc_id, 0.0),
+                 matched.get(doc_id, 0) / len(terms) if terms else 1.0)
+                for doc_id in ranked
+            ]
+
+    def recommend(self, query, count=5, min_match=0.6):
+        """
+        Answer a query locally if the index is confident enough, else return None
+        Every returned movie must contain at least `min_match` of the query terms.
+        """
+        results = self.search(query, limit=count)
+        if len(results) < count or any(match < min_match for _, _, match in results):
+            return None
+        with self._lock:
+            self.queries_served += 1
+        return [
+            {
+                'title': movie['title'],
+                'year': movie['year'],
+                'genre': movie['genre'],
+                'description': movie['description'],
+                'rating': round(movie['rating'], 1),
+            }
+            for movie, _, _ in results
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "movies": len(self.movies),
+                "terms": len(self._postings),
+                "last_row_id": self.last_row_id,
+                "queries_served": self.queries_served,
+            }
@@ -0,0 +1,102 @@
+"""
+Leveled, buffered logging for the CineAI backend
+Every module logs through a child of the 'cineai' logger. Records are put on
+a queue and written by a background thread, so a request never waits on a
+stdout write; per-request detail is logged at DEBUG and skipped entirely at
+the default INFO level. LOG_LEVEL=OFF silences the backend's logs.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+LOGGER_NAME = 'cineai'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'OFF')
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+def get_logger(name):
+    """Logger for one backend module, e.g. get_logger('cache') -> 'cineai.cache'"""
+    return logging.getLogger(f"{LOGGER_NAME}.{name}")
+
+
+class _ForkSafeQueueHandler(QueueHandler):
+    """
+    Queue handler that owns its writer thread
+    A gunicorn worker forked after the app was imported inherits the queue but
+    not the thread, so the first record in a new process starts a fresh one.
+    """
+
+    def __init__(self, target):
+        super().__init__(queue.SimpleQueue())
+        self.target = target
+        self._listener = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self.queue = queue.SimpleQueue()
+                self._listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                self._listener.start()
+                self._pid = os.getpid()
+
+    def prepare(self, record):
+        # The listener lives in this process, so the record is formatted once, by
+        # the writer thread, instead of also being pre-formatted and copied here
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        return record
+
+    def emit(self, record):
+        self._ensure_listener()
+        super().emit(record)
+
+    def stop(self):
+        """Drain the queue (called at exit so buffered records are not lost)"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+            self._pid = None
+
+
+def configure_logging(level='INFO', buffered=True, stream=None):
+    """
+    Attach a single handler to the 'cineai' logger
+    `level` is one of LOG_LEVELS. With `buffered`, records are written by a
+    background thread; otherwise they are written inline. Safe to call again
+    (e.g. from tests) - the previous handler is replaced.
+    """
+    level = (level or 'INFO').upper()
+    if level not in LOG_LEVELS:
+        raise ValueError(f"LOG_LEVEL must be one of: {', '.join(LOG_LEVELS)}")
+
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        if isinstance(handler, _ForkSafeQueueHandler):
+            handler.stop()
+    logger.propagate = False
+
+    if level == 'OFF':
+        logger.addHandler(logging.NullHandler())
+        logger.setLevel(logging.CRITICAL + 1)
+        return logger
+
+    target = logging.StreamHandler(stream or sys.stdout)
+    target.setFormatter(logging.Formatter(LOG_FORMAT))
+    if buffered:
+        handler = _ForkSafeQueueHandler(target)
+        atexit.register(handler.stop)
+    else:
+        handler = target
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    return logger
@@ -1,13 +1,40 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta
 import os
-from groq import Groq
+import base64
+import csv
+import io
 import json
+import threading
+import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from contextlib import contextmanager
 
-GROQ_API_KEY = "enter api key here"  
+import click
+
+from cache import cache_key, create_recommendation_cache, normalize_query
+from http_cache import (CachedBody, ResponseCache, compress_response, is_not_modified, make_etag,
+                        not_modified_response)
+from singleflight import SingleFlight, SQLiteFlightLock
+from llm_parser import IncrementalMovieParser, parse_keyed_movies_response, parse_movies
+from local_index import LocalMovieIndex
+from logging_setup import configure_logging, get_logger
+from metrics import CONTENT_TYPE, MetricsRegistry
+from precompute import PrecomputedAnswers, rank_queries
+from prompts import (DEFAULT_COUNT, DEFAULT_DESCRIPTION_LENGTH, DEFAULT_TEMPLATE, MAX_COUNT, build_batch_request,
+                     build_request, cache_variant, validate_options)
+from sessions import SessionRegistry
+from storage import configure_engine, database_uri, describe_engine, engine_options
+from upstream import UpstreamError, UpstreamPool
+from write_queue import WriteQueue
+
+GROQ_API_KEY = os.environ.get("GROQ_API_KEY", "enter api key here")
+# Several keys (comma separated) are rotated across the upstream pool
+GROQ_API_KEYS = [key.strip() for key in os.environ.get("GROQ_API_KEYS", GROQ_API_KEY).split(',') if key.strip()]
 
 
 app = Flask(__name__)
@@ -19,18 +46,164 @@ CORS(app,
      supports_credentials=True)
 
 
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///movies.db'
+# SQLite by default; set DATABASE_URL=postgresql://... to share one database across hosts
+app.config['SQLALCHEMY_DATABASE_URI'] = database_uri(os.environ.get('DATABASE_URL', 'sqlite:///movies.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+# Create missing tables when the development server starts (python main.py). Importing the app
+# (gunicorn) never does schema work; there tables come from `flask --app main init-db`.
+app.config['DB_AUTO_CREATE'] = os.environ.get('DB_AUTO_CREATE', 'true').lower() == 'true'
+
+# Storage mode: 'default' or 'tuned' (WAL, busy_timeout, mmap, sized pool - see storage.py).
+# The write queue batches recommendation inserts from concurrent requests into one transaction.
+app.config['DB_STORAGE_MODE'] = os.environ.get('DB_STORAGE_MODE', 'default')
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+    app.config['SQLALCHEMY_DATABASE_URI'], app.config['DB_STORAGE_MODE'])
+app.config['DB_WRITE_QUEUE'] = os.environ.get(
+    'DB_WRITE_QUEUE', 'true' if app.config['DB_STORAGE_MODE'] == 'tuned' else 'false').lower() == 'true'
+app.config['DB_WRITE_QUEUE_MAX_BATCH'] = int(os.environ.get('DB_WRITE_QUEUE_MAX_BATCH', 64))
+app.config['DB_WRITE_QUEUE_MAX_WAIT_MS'] = float(os.environ.get('DB_WRITE_QUEUE_MAX_WAIT_MS', 5))
+# A save still queued after this many seconds is taken back and written directly
+app.config['DB_WRITE_QUEUE_TIMEOUT'] = float(os.environ.get('DB_WRITE_QUEUE_TIMEOUT', 10))
 app.config['SECRET_KEY'] = 'dev-secret-key-change-in-production'
 
+# Recommendation cache: 'memory' (per worker), 'sqlite' (shared by all workers) or 'none'
+app.config['RECOMMENDATION_CACHE_BACKEND'] = os.environ.get('RECOMMENDATION_CACHE_BACKEND', 'memory')
+app.config['RECOMMENDATION_CACHE_TTL'] = int(os.environ.get('RECOMMENDATION_CACHE_TTL', 6 * 60 * 60))
+app.config['RECOMMENDATION_CACHE_MAX_ENTRIES'] = int(os.environ.get('RECOMMENDATION_CACHE_MAX_ENTRIES', 2048))
+app.config['RECOMMENDATION_CACHE_PATH'] = os.environ.get(
+    'RECOMMENDATION_CACHE_PATH', os.path.join(app.instance_path, 'recommendation_cache.db'))
+
+# Single-flight: coalesce identical in-flight LLM queries. Cross-process coalescing
+# uses a lock table and needs the shared 'sqlite' cache to hand results between workers.
+app.config['SINGLE_FLIGHT_CROSS_PROCESS'] = os.environ.get('SINGLE_FLIGHT_CROSS_PROCESS', 'false').lower() == 'true'
+app.config['SINGLE_FLIGHT_LOCK_PATH'] = os.environ.get(
+    'SINGLE_FLIGHT_LOCK_PATH', app.config['RECOMMENDATION_CACHE_PATH'])
+app.config['SINGLE_FLIGHT_WAIT_TIMEOUT'] = float(os.environ.get('SINGLE_FLIGHT_WAIT_TIMEOUT', 60))
+
+# Recommendation source: 'llm' (cache + Groq), 'local' (local index only) or 'auto'
+# (local index when it is confident, Groq otherwise). Requests may override via "mode".
+app.config['RECOMMENDATION_MODE'] = os.environ.get('RECOMMENDATION_MODE', 'llm')
+app.config['LOCAL_INDEX_MIN_MATCH'] = float(os.environ.get('LOCAL_INDEX_MIN_MATCH', 0.6))
+app.config['LOCAL_INDEX_REFRESH_INTERVAL'] = float(os.environ.get('LOCAL_INDEX_REFRESH_INTERVAL', 5))
+
+# Session bookkeeping: cached session_id -> user_id mappings, last_active written in batches.
+# A mapping unused for SESSION_CACHE_MAX_IDLE seconds is looked up again.
+app.config['SESSION_CACHE_MAX_ENTRIES'] = int(os.environ.get('SESSION_CACHE_MAX_ENTRIES', 50000))
+app.config['SESSION_CACHE_MAX_IDLE'] = float(os.environ.get('SESSION_CACHE_MAX_IDLE', 3600))
+app.config['LAST_ACTIVE_FLUSH_INTERVAL'] = float(os.environ.get('LAST_ACTIVE_FLUSH_INTERVAL', 30))
+
+# Upstream LLM pool (see upstream.py): shared concurrency cap, per-key RPM/TPM buckets
+# (0 = unlimited; set them to the provider's limits), retries, per-call deadline, hedging.
+app.config['UPSTREAM_MAX_CONCURRENCY'] = int(os.environ.get('UPSTREAM_MAX_CONCURRENCY', 16))
+app.config['UPSTREAM_REQUESTS_PER_MINUTE'] = int(os.environ.get('UPSTREAM_REQUESTS_PER_MINUTE', 0))
+app.config['UPSTREAM_TOKENS_PER_MINUTE'] = int(os.environ.get('UPSTREAM_TOKENS_PER_MINUTE', 0))
+app.config['UPSTREAM_TIMEOUT'] = float(os.environ.get('UPSTREAM_TIMEOUT', 30))
+app.config['UPSTREAM_MAX_RETRIES'] = int(os.environ.get('UPSTREAM_MAX_RETRIES', 3))
+app.config['UPSTREAM_BACKOFF_BASE'] = float(os.environ.get('UPSTREAM_BACKOFF_BASE', 0.5))
+app.config['UPSTREAM_BACKOFF_MAX'] = float(os.environ.get('UPSTREAM_BACKOFF_MAX', 8))
+app.config['UPSTREAM_HEDGE_PERCENTILE'] = float(os.environ.get('UPSTREAM_HEDGE_PERCENTILE', 0))
+
+# Logging: DEBUG (per-request detail), INFO, WARNING, ERROR or OFF. Buffered logging writes
+# from a background thread. METRICS_ENABLED times each request stage and serves GET /metrics.
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_BUFFERED'] = os.environ.get('LOG_BUFFERED', 'true').lower() == 'true'
+app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# HTTP caching: history and statistics answer conditional GETs (ETag) with 304, and keep
+# serialized bodies per worker for RESPONSE_CACHE_TTL seconds (0 disables the body cache).
+# JSON responses of at least RESPONSE_COMPRESSION_MIN_BYTES are gzip/brotli encoded (0 disables).
+app.config['RESPONSE_CACHE_TTL'] = float(os.environ.get('RESPONSE_CACHE_TTL', 30))
+app.config['RESPONSE_CACHE_MAX_ENTRIES'] = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+app.config['RESPONSE_COMPRESSION_MIN_BYTES'] = int(os.environ.get('RESPONSE_COMPRESSION_MIN_BYTES', 1024))
+
+configure_logging(app.config['LOG_LEVEL'], buffered=app.config['LOG_BUFFERED'])
+logger = get_logger('main')
+
 db = SQLAlchemy(app)
 
-if GROQ_API_KEY and GROQ_API_KEY != "your_groq_api_key_here":
-    client = Groq(api_key=GROQ_API_KEY)
-    print("✅ Groq AI client initialized with llama-3.3-70b-versatile")
-else:
-    print("⚠️  WARNING: GROQ_API_KEY not set. Please update the GROQ_API_KEY variable in the script.")
-    client = None
+with app.app_context():
+    configure_engine(db.engine, app.config['DB_STORAGE_MODE'])
+
+recommendation_cache = create_recommendation_cache(
+    app.config['RECOMMENDATION_CACHE_BACKEND'],
+    ttl=app.config['RECOMMENDATION_CACHE_TTL'],
+    max_entries=app.config['RECOMMENDATION_CACHE_MAX_ENTRIES'],
+    path=app.config['RECOMMENDATION_CACHE_PATH'],
+)
+
+recommendation_flight = SingleFlight(
+    lock_store=SQLiteFlightLock(
+        app.config['SINGLE_FLIGHT_LOCK_PATH'],
+        lease_seconds=app.config['SINGLE_FLIGHT_WAIT_TIMEOUT'],
+    ) if app.config['SINGLE_FLIGHT_CROSS_PROCESS'] else None,
+    wait_timeout=app.config['SINGLE_FLIGHT_WAIT_TIMEOUT'],
+)
+
+# Prompt template and response size (see prompts.py). max_tokens is computed from the
+# movie count and description length; requests may override all three.
+app.config['PROMPT_TEMPLATE'] = os.environ.get('PROMPT_TEMPLATE', DEFAULT_TEMPLATE)
+app.config['RECOMMENDATION_COUNT'] = int(os.environ.get('RECOMMENDATION_COUNT', DEFAULT_COUNT))
+app.config['RECOMMENDATION_MAX_COUNT'] = int(os.environ.get('RECOMMENDATION_MAX_COUNT', MAX_COUNT))
+app.config['DESCRIPTION_LENGTH'] = os.environ.get('DESCRIPTION_LENGTH', DEFAULT_DESCRIPTION_LENGTH)
+
+# Warm-cache job (flask --app main warm-cache): how many of the most requested queries to
+# precompute, the window of requests mined, and the age at which a stored answer is
+# regenerated. Workers check the precomputed table for changes every RELOAD_INTERVAL seconds.
+app.config['PRECOMPUTE_TOP_QUERIES'] = int(os.environ.get('PRECOMPUTE_TOP_QUERIES', 200))
+app.config['PRECOMPUTE_WINDOW_DAYS'] = float(os.environ.get('PRECOMPUTE_WINDOW_DAYS', 14))
+app.config['PRECOMPUTE_MAX_AGE_HOURS'] = float(os.environ.get('PRECOMPUTE_MAX_AGE_HOURS', 24))
+app.config['PRECOMPUTE_RELOAD_INTERVAL'] = float(os.environ.get('PRECOMPUTE_RELOAD_INTERVAL', 30))
+
+# Retention job (flask --app main retention): sessions inactive for SESSION_TTL_DAYS are deleted
+# and recommendations older than ROLLUP_AFTER_DAYS are folded into daily rollups (0 disables
+# either), CHUNK_SIZE rows per transaction. SQLite is vacuumed once VACUUM_THRESHOLD of its pages are free.
+app.config['RETENTION_SESSION_TTL_DAYS'] = float(os.environ.get('RETENTION_SESSION_TTL_DAYS', 90))
+app.config['RETENTION_ROLLUP_AFTER_DAYS'] = float(os.environ.get('RETENTION_ROLLUP_AFTER_DAYS', 180))
+app.config['RETENTION_CHUNK_SIZE'] = int(os.environ.get('RETENTION_CHUNK_SIZE', 500))
+app.config['RETENTION_CHUNK_PAUSE'] = float(os.environ.get('RETENTION_CHUNK_PAUSE', 0.05))
+app.config['RETENTION_VACUUM_THRESHOLD'] = float(os.environ.get('RETENTION_VACUUM_THRESHOLD', 0.2))
+
+# Batch endpoint: queries per request, queries packed into one prompt, packs run in parallel
+app.config['BATCH_MAX_QUERIES'] = int(os.environ.get('BATCH_MAX_QUERIES', 50))
+app.config['BATCH_PACK_SIZE'] = int(os.environ.get('BATCH_PACK_SIZE', 4))
+app.config['BATCH_MAX_PARALLEL'] = int(os.environ.get('BATCH_MAX_PARALLEL', 4))
+
+UPSTREAM_OPTIONS = {
+    'max_concurrency': app.config['UPSTREAM_MAX_CONCURRENCY'],
+    'requests_per_minute': app.config['UPSTREAM_REQUESTS_PER_MINUTE'],
+    'tokens_per_minute': app.config['UPSTREAM_TOKENS_PER_MINUTE'],
+    'timeout': app.config['UPSTREAM_TIMEOUT'],
+    'max_retries': app.config['UPSTREAM_MAX_RETRIES'],
+    'backoff_base': app.config['UPSTREAM_BACKOFF_BASE'],
+    'backoff_max': app.config['UPSTREAM_BACKOFF_MAX'],
+    'hedge_percentile': app.config['UPSTREAM_HEDGE_PERCENTILE'],
+}
+
+LLM_CONFIGURED = bool(GROQ_API_KEYS) and GROQ_API_KEY != "your_groq_api_key_here"
+if not LLM_CONFIGURED:
+    logger.warning("⚠️  GROQ_API_KEY not set. Please update the GROQ_API_KEY variable in the script.")
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    The Groq upstream pool, built on first use (None when no key is configured)
+    Importing groq and setting up an HTTPS client (SSL context) per key is slow,
+    so app import and worker boot skip it. Under gunicorn --preload
+    each worker builds its own pool after the fork instead of sharing sockets.
+    """
+    global _client
+    if _client is None and LLM_CONFIGURED:
+        with _client_lock:
+            if _client is None:
+                from groq import Groq
+                # The pool retries and times out calls itself, so the SDK's own retries are off
+                _client = UpstreamPool([Groq(api_key=key, max_retries=0) for key in GROQ_API_KEYS], **UPSTREAM_OPTIONS)
+                logger.info("✅ Groq AI client pool initialized with llama-3.3-70b-versatile (%d API key(s))",
+                            len(GROQ_API_KEYS))
+    return _client
 
 # ==================== DATABASE MODELS ====================
 
@@ -50,67 +223,394 @@ class Recommendation(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     query = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    movies = db.relationship('Movie', backref='recommendation', lazy=True, cascade='all, delete-orphan')
+    # Where the movies came from (llm, llm-batch, cache, local) and, for LLM rows,
+    # the prompt template, token usage and call latency behind them
+    source = db.Column(db.String(20))
+    prompt_template = db.Column(db.String(20))
+    prompt_tokens = db.Column(db.Integer)
+    completion_tokens = db.Column(db.Integer)
+    llm_latency_ms = db.Column(db.Float)
+    # History pages: WHERE user_id = ? ORDER BY created_at DESC, id DESC;
+    # recent activity and the time-window reports: ORDER BY / WHERE created_at
+    __table_args__ = (
+        db.Index('ix_recommendations_user_created', 'user_id', 'created_at', 'id'),
+        db.Index('ix_recommendations_created', 'created_at', 'id'),
+    )
+    items = db.relationship('RecommendationItem', backref='recommendation', lazy=True,
+                            cascade='all, delete-orphan', order_by='RecommendationItem.rank')
     
     def to_dict(self):
         return {
             'id': self.id,
             'query': self.query,
             'created_at': self.created_at.isoformat(),
-            'movies': [movie.to_dict() for movie in self.movies]
+            'movies': [item.to_dict() for item in self.items]
         }
 
-class Movie(db.Model):
-    """Movie model - stores individual movie recommendations"""
-    __tablename__ = 'movies'
+def catalog_key(title):
+    """Case/whitespace-folded title used to deduplicate the movie catalog"""
+    return ' '.join(str(title).lower().split())
+
+class CatalogMovie(db.Model):
+    """Catalog model - one row per distinct movie (title + year) ever recommended"""
+    __tablename__ = 'catalog_movies'
     id = db.Column(db.Integer, primary_key=True)
-    recommendation_id = db.Column(db.Integer, db.ForeignKey('recommendations.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
+    title_key = db.Column(db.String(200), nullable=False)
     year = db.Column(db.Integer, nullable=False)
     genre = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    rating = db.Column(db.Float, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    __table_args__ = (
+        db.UniqueConstraint('title_key', 'year', name='uq_catalog_movies_title_key_year'),
+    )
+
+class RecommendationItem(db.Model):
+    """Recommendation item model - a catalog movie's rank and rating within one recommendation"""
+    __tablename__ = 'recommendation_items'
+    id = db.Column(db.Integer, primary_key=True)
+    recommendation_id = db.Column(db.Integer, db.ForeignKey('recommendations.id', ondelete='CASCADE'),
+                                  nullable=False, index=True)
+    movie_id = db.Column(db.Integer, db.ForeignKey('catalog_movies.id'), nullable=False, index=True)
+    rank = db.Column(db.SmallInteger, nullable=False)
+    rating = db.Column(db.Float, nullable=False)
+    movie = db.relationship('CatalogMovie', lazy='joined')
     
     def to_dict(self):
         return {
             'id': self.id,
-            'title': self.title,
-            'year': self.year,
-            'genre': self.genre,
-            'description': self.description,
+            'title': self.movie.title,
+            'year': self.movie.year,
+            'genre': self.movie.genre,
+            'description': self.movie.description,
             'rating': self.rating
         }
 
+class AppStats(db.Model):
+    """Application statistics model - a single row of counters maintained on every write"""
+    __tablename__ = 'app_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    total_recommendations = db.Column(db.Integer, nullable=False, default=0)
+    total_movies = db.Column(db.Integer, nullable=False, default=0)
+    unique_movies = db.Column(db.Integer, nullable=False, default=0)
+    # Rows the retention job deleted; statistics report live + archived totals
+    archived_users = db.Column(db.Integer, default=0)
+    archived_recommendations = db.Column(db.Integer, default=0)
+    archived_movies = db.Column(db.Integer, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class RecommendationRollup(db.Model):
+    """Daily totals of recommendations removed by the retention job - one row per day and source"""
+    __tablename__ = 'recommendation_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    source = db.Column(db.String(20), nullable=False)
+    recommendations = db.Column(db.Integer, nullable=False, default=0)
+    movies = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('day', 'source', name='uq_recommendation_rollups_day_source'),
+    )
+
+class PrecomputedRecommendation(db.Model):
+    """Precomputed answer for a frequently requested query - written by the warm-cache job"""
+    __tablename__ = 'precomputed_recommendations'
+    id = db.Column(db.Integer, primary_key=True)
+    # cache_key() of the query: normalized text plus the response-shape variant
+    query_key = db.Column(db.Text, unique=True, nullable=False)
+    query_text = db.Column(db.Text, nullable=False)
+    movies = db.Column(db.Text, nullable=False)  # JSON list in the /api/recommend shape
+    request_count = db.Column(db.Integer, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 # ==================== HELPER FUNCTIONS ====================
 
-def get_or_create_user(session_id):
+# Per-worker metrics served by GET /metrics (see metrics.py)
+metrics_registry = MetricsRegistry()
+HTTP_REQUESTS = metrics_registry.counter(
+    'http_requests_total', "HTTP requests by route and status", ('method', 'route', 'status'))
+HTTP_SECONDS = metrics_registry.histogram(
+    'http_request_duration_seconds', "Time until the response headers were ready", ('method', 'route'))
+STAGE_SECONDS = metrics_registry.histogram(
+    'recommend_stage_seconds', "Time spent in each stage of a recommendation request", ('stage',))
+RECOMMENDATIONS = metrics_registry.counter(
+    'recommendations_total', "Recommendations saved, by where the movies came from", ('source',))
+LLM_TOKENS = metrics_registry.counter('llm_tokens_total', "Tokens Groq reported", ('kind',))
+
+def record_stage(stage, seconds):
+    """Observe a stage duration and add it to the request's Server-Timing header"""
+    if not app.config['METRICS_ENABLED']:
+        return
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    if has_request_context():
+        timings = g.setdefault('stage_timings', {})
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+@contextmanager
+def timed_stage(stage):
+    """Time the enclosed block as one stage of the request (see record_stage)"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+APP_STATS_ID = 1
+
+def bump_app_stats(**deltas):
+    """
+    Adjust the maintained counters inside the caller's transaction
+    If the row does not exist yet nothing is updated; it is seeded from real
+    counts the first time statistics are read.
+    """
+    db.session.query(AppStats).filter_by(id=APP_STATS_ID).update(
+        {getattr(AppStats, name): db.func.coalesce(getattr(AppStats, name), 0) + delta
+         for name, delta in deltas.items() if delta},
+        synchronize_session=False)
+
+def compute_app_stats():
+    """Count every table from scratch - used to seed or resynchronize app_stats"""
+    return {
+        'total_users': db.session.query(db.func.count(User.id)).scalar(),
+        'total_recommendations': db.session.query(db.func.count(Recommendation.id)).scalar(),
+        'total_movies': db.session.query(db.func.count(RecommendationItem.id)).scalar(),
+        'unique_movies': db.session.query(db.func.count(CatalogMovie.id)).scalar(),
+    }
+
+def get_app_stats():
+    """Read the counters row, seeding it from full table counts on first use"""
+    stats = db.session.get(AppStats, APP_STATS_ID)
+    if stats is None:
+        stats = AppStats(id=APP_STATS_ID, **compute_app_stats())
+        db.session.add(stats)
+        try:
+            db.session.commit()
+        except Exception:
+            # Another worker seeded it first
+            db.session.rollback()
+            stats = db.session.get(AppStats, APP_STATS_ID)
+    return stats
+
+RECOMMENDATION_MODES = ('llm', 'local', 'auto')
+
+def load_movie_rows_since(last_id, batch_size=5000):
+    """Feed the local index: catalog movies with an id greater than last_id, oldest first"""
+    rows = db.session.query(
+            CatalogMovie.id, CatalogMovie.title, CatalogMovie.year, CatalogMovie.genre,
+            CatalogMovie.description,
+            db.func.coalesce(db.func.avg(RecommendationItem.rating), 0).label('rating'),
+            db.func.count(RecommendationItem.id).label('times_recommended'))\
+        .outerjoin(RecommendationItem, RecommendationItem.movie_id == CatalogMovie.id)\
+        .filter(CatalogMovie.id > last_id)\
+        .group_by(CatalogMovie.id)\
+        .order_by(CatalogMovie.id)\
+        .limit(batch_size)\
+        .all()
+    return [row._asdict() for row in rows]
+
+def _dialect_insert(model):
+    """INSERT construct supporting ON CONFLICT for the configured database, or None"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        return None
+    return insert(model)
+
+def upsert_catalog_movies(movies):
+    """
+    Make sure every movie exists in the catalog and return {(title_key, year): (id, is_new)}
+    New titles go in with one multi-row INSERT ... ON CONFLICT DO NOTHING RETURNING;
+    titles already in the catalog are resolved with a single lookup.
+    """
+    rows = {}
+    for movie in movies:
+        key = (catalog_key(movie['title']), int(movie['year']))
+        rows.setdefault(key, {
+            'title': movie['title'],
+            'title_key': key[0],
+            'year': key[1],
+            'genre': movie['genre'],
+            'description': movie['description'],
+            'created_at': datetime.utcnow(),
+        })
+    
+    resolved = {}
+    statement = _dialect_insert(CatalogMovie)
+    if statement is not None:
+        inserted = db.session.execute(
+            statement.values(list(rows.values()))
+            .on_conflict_do_nothing(index_elements=['title_key', 'year'])
+            .returning(CatalogMovie.id, CatalogMovie.title_key, CatalogMovie.year)
+        ).all()
+        for movie_id, title_key, year in inserted:
+            resolved[(title_key, year)] = (movie_id, True)
+    
+    missing = [key for key in rows if key not in resolved]
+    if missing:
+        existing = db.session.query(CatalogMovie.id, CatalogMovie.title_key, CatalogMovie.year)\
+            .filter(db.tuple_(CatalogMovie.title_key, CatalogMovie.year).in_(missing))\
+            .all()
+        for movie_id, title_key, year in existing:
+            resolved[(title_key, year)] = (movie_id, False)
+        # Databases without ON CONFLICT support: plain insert for what is still missing
+        for key in missing:
+            if key not in resolved:
+                catalog_movie = CatalogMovie(**rows[key])
+                db.session.add(catalog_movie)
+                db.session.flush()
+                resolved[key] = (catalog_movie.id, True)
+    return resolved
+
+local_index = LocalMovieIndex(
+    load_movie_rows_since,
+    refresh_interval=app.config['LOCAL_INDEX_REFRESH_INTERVAL'],
+)
+
+def load_precomputed_version():
+    """Changes whenever the warm-cache job adds, refreshes or prunes an answer"""
+    return tuple(db.session.query(
+        db.func.count(PrecomputedRecommendation.id),
+        db.func.max(PrecomputedRecommendation.refreshed_at)).one())
+
+def load_precomputed_entries():
+    """Every precomputed answer as (query_key, movies JSON)"""
+    return db.session.query(PrecomputedRecommendation.query_key, PrecomputedRecommendation.movies).all()
+
+precomputed_answers = PrecomputedAnswers(
+    load_precomputed_version,
+    load_precomputed_entries,
+    refresh_interval=app.config['PRECOMPUTE_RELOAD_INTERVAL'],
+)
+
+def upsert_user(session_id):
+    """
+    Look up a session's user id, creating the user atomically if it is new
+    Returns (user_id, created). Existing sessions cost one indexed SELECT and
+    no write. New sessions use INSERT ... ON CONFLICT DO NOTHING, so two
+    workers racing on the same session id cannot both insert it.
+    """
+    user_id = db.session.query(User.id).filter_by(session_id=session_id).scalar()
+    if user_id is not None:
+        return user_id, False
+    
+    now = datetime.utcnow()
+    statement = _dialect_insert(User)
+    if statement is not None:
+        user_id = db.session.execute(
+            statement.values(session_id=session_id, created_at=now, last_active=now)
+            .on_conflict_do_nothing(index_elements=['session_id'])
+            .returning(User.id)
+        ).scalar()
+    else:
+        user = User(session_id=session_id, created_at=now, last_active=now)
+        db.session.add(user)
+        db.session.flush()
+        user_id = user.id
+    
+    if user_id is None:
+        # Lost the race - another worker created it between our SELECT and INSERT
+        db.session.rollback()
+        return db.session.query(User.id).filter_by(session_id=session_id).scalar(), False
+    bump_app_stats(total_users=1)
+    db.session.commit()
+    logger.debug("✅ Created new user: %s", session_id)
+    return user_id, True
+
+def flush_last_active(pending):
+    """Persist a batch of {user_id: last_active} in one transaction (background writer)"""
+    with app.app_context():
+        users = User.__table__
+        db.session.execute(
+            users.update().where(users.c.id == db.bindparam('b_user_id'))
+            .values(last_active=db.bindparam('b_last_active')),
+            [{'b_user_id': user_id, 'b_last_active': timestamp} for user_id, timestamp in pending.items()]
+        )
+        db.session.commit()
+
+session_registry = SessionRegistry(
+    upsert_user,
+    flush_last_active,
+    max_entries=app.config['SESSION_CACHE_MAX_ENTRIES'],
+    flush_interval=app.config['LAST_ACTIVE_FLUSH_INTERVAL'],
+    max_idle=app.config['SESSION_CACHE_MAX_IDLE'],
+)
+
+def get_or_create_user_id(session_id):
     """
-    Get existing user or create new one
+    Get existing user id or create new user
     WORKFLOW STEP 3: Backend validates and manages user sessions
+    Known sessions are answered from memory; last_active is buffered and
+    written in batches by a background thread.
     """
     try:
-        user = User.query.filter_by(session_id=session_id).first()
-        if not user:
-            user = User(session_id=session_id)
-            db.session.add(user)
-            db.session.commit()
-            print(f"✅ Created new user: {session_id}")
-        else:
-            user.last_active = datetime.utcnow()
-            db.session.commit()
-            print(f"✅ User found: {session_id}")
-        return user
+        return session_registry.get_user_id(session_id)
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error in get_or_create_user: {str(e)}")
+        logger.error("❌ Error in get_or_create_user_id: %s", e)
         return None
 
-def generate_recommendations_with_groq(query):
+def prompt_options(data=None):
+    """
+    Prompt options for a request body ("count", "description_length", "template"),
+    falling back to the configured defaults. Raises ValueError for invalid values.
+    """
+    data = data or {}
+    return validate_options(
+        count=data.get('count', app.config['RECOMMENDATION_COUNT']),
+        description_length=data.get('description_length', app.config['DESCRIPTION_LENGTH']),
+        template=data.get('template', app.config['PROMPT_TEMPLATE']),
+        max_count=app.config['RECOMMENDATION_MAX_COUNT'],
+    )
+
+def build_recommendation_request(query, options=None):
+    """Build the Groq chat completion arguments for a user query (see prompts.py)"""
+    return build_request(query, **(options or prompt_options()))
+
+def build_batch_recommendation_request(queries, options=None):
+    """
+    Build Groq arguments that answer several queries in one completion
+    `queries` maps short ids (q1, q2, ...) to query text; the model replies with
+    one JSON object keyed by the same ids.
+    """
+    return build_batch_request(queries, **(options or prompt_options()))
+
+def usage_from_completion(completion):
+    """Token counts Groq reported for a completion (zeros when absent)"""
+    usage = getattr(completion, 'usage', None)
+    counts = {name: getattr(usage, name, None) or 0
+              for name in ('prompt_tokens', 'completion_tokens', 'total_tokens')}
+    LLM_TOKENS.inc(counts['prompt_tokens'], kind='prompt')
+    LLM_TOKENS.inc(counts['completion_tokens'], kind='completion')
+    return counts
+
+def token_accounting(source, options, usage=None, latency_ms=None, share=1):
+    """
+    Recommendation columns recording what an LLM answer cost
+    `share` splits a packed call's tokens and latency evenly across the
+    queries it answered, so ms per token stays comparable with single calls.
+    """
+    accounting = {'source': source, 'prompt_template': options['template']}
+    if usage is not None:
+        accounting.update(
+            prompt_tokens=round(usage['prompt_tokens'] / share),
+            completion_tokens=round(usage['completion_tokens'] / share),
+            llm_latency_ms=round(latency_ms / share, 1) if latency_ms is not None else None,
+        )
+    return accounting
+
+def generate_recommendations_with_groq(query, options=None):
     """
     Generate movie recommendations using Groq AI (Llama 3.3 70B)
     WORKFLOW STEP 4: AI Model analyzes and generates recommendations
     """
+    options = options or prompt_options()
+    client = get_client()
     if not client:
         return {
             "success": False, 
@@ -118,125 +618,619 @@ def generate_recommendations_with_groq(query):
         }
     
     try:
-        print(f"🤖 Calling Groq AI (Llama 3.3 70B) with query: {query}")
-        
-        # Create the prompt for Groq
-        prompt = f"""You are a movie expert AI assistant. Based on the user's preference: "{query}", recommend exactly 5 movies.
-
-Return ONLY a valid JSON array with this exact format (no markdown, no explanation, no extra text):
-[
-  {{"title": "Movie Name", "year": 2024, "genre": "Action, Drama", "description": "Brief 2-3 sentence description of the movie plot and why it's recommended.", "rating": 8.5}}
-]
-
-IMPORTANT REQUIREMENTS:
-- Return exactly 5 movies
-- Use real movies with accurate release years
-- Genre should be comma-separated string (e.g., "Action, Thriller")
-- Rating must be between 6.0 and 10.0 as a float
-- Description should be 2-3 sentences explaining the plot and why it matches the user's preference
-- Return ONLY the JSON array with no additional text, no markdown code blocks, no explanations
-- Ensure the JSON is properly formatted and valid"""
-
-        # Call Groq API
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful movie recommendation assistant. You ONLY respond with valid JSON arrays containing movie data. Never include markdown formatting or explanations."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.7,
-            max_tokens=2048,
-            top_p=0.9,
-        )
+        logger.debug("🤖 Calling Groq AI (Llama 3.3 70B) with query: %s", query)
         
-        content = chat_completion.choices[0].message.content.strip()
-        print(f"📥 Groq AI Response: {content[:200]}...")
-        
-        # Clean and parse JSON
-        if content.startswith('```'):
-            content = content.replace('```json', '').replace('```', '').strip()
-        
-        # Remove any leading/trailing text before/after JSON
-        start_idx = content.find('[')
-        end_idx = content.rfind(']') + 1
-        if start_idx != -1 and end_idx > start_idx:
-            content = content[start_idx:end_idx]
-        
-        movies = json.loads(content)
-        
-        if not isinstance(movies, list):
-            # If wrapped in object, try to extract array
-            if isinstance(movies, dict):
-                for key in ['movies', 'recommendations', 'results']:
-                    if key in movies and isinstance(movies[key], list):
-                        movies = movies[key]
-                        break
-        
-        if not isinstance(movies, list) or len(movies) == 0:
-            raise ValueError("Invalid response format - expected array of movies")
-        
-        # Validate and ensure proper data types
-        required_fields = ['title', 'year', 'genre', 'description', 'rating']
-        for movie in movies:
-            for field in required_fields:
-                if field not in movie:
-                    raise ValueError(f"Missing required field: {field}")
-            
-            # Ensure proper data types
-            movie['year'] = int(movie['year'])
-            movie['rating'] = float(movie['rating'])
-            movie['title'] = str(movie['title'])
-            movie['genre'] = str(movie['genre'])
-            movie['description'] = str(movie['description'])
-        
-        print(f"✅ Generated {len(movies)} movie recommendations")
-        return {"success": True, "movies": movies}
-    
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {str(e)}")
-        print(f"Response content: {content}")
-        return {"success": False, "error": "Failed to parse AI response. Please try again."}
+        # Call Groq API through the upstream pool (rate limits, retries, deadline)
+        started = time.perf_counter()
+        chat_completion = client.create(**build_recommendation_request(query, options))
+        latency_ms = (time.perf_counter() - started) * 1000
+        record_stage('llm_call', latency_ms / 1000)
+        
+        with timed_stage('parse'):
+            result = parse_recommendation_response(chat_completion.choices[0].message.content)
+        if result['success']:
+            result['movies'] = result['movies'][:options['count']]
+        result['usage'] = usage_from_completion(chat_completion)
+        result['accounting'] = token_accounting('llm', options, result['usage'], latency_ms)
+        return result
+    
+    except UpstreamError as e:
+        logger.warning("❌ Upstream gave up: %s", e)
+        return {"success": False, "error": str(e), "status_code": e.status_code}
     except Exception as e:
-        print(f"❌ Error generating recommendations: {str(e)}")
+        logger.error("❌ Error generating recommendations: %s", e)
         return {"success": False, "error": str(e)}
 
-def save_recommendation_to_db(user, query, movies):
+def parse_recommendation_response(content):
+    """Turn raw Groq AI message content into a recommendation result dict"""
+    content = (content or '').strip()
+    logger.debug("📥 Groq AI Response: %.200s...", content)
+    # Salvages every valid movie instead of failing on one malformed entry
+    parsed = parse_movies(content)
+    for dropped in parsed.dropped:
+        logger.warning("⚠️  Dropped movie #%s from AI response: %s", dropped['index'], dropped['reason'])
+    if not parsed.movies:
+        logger.warning("❌ No valid movies in AI response: %s", content)
+        return {"success": False, "error": "Failed to parse AI response. Please try again."}
+    if parsed.truncated:
+        logger.warning("⚠️  AI response was cut off; keeping the complete movies")
+    logger.debug("✅ Generated %d movie recommendations", len(parsed.movies))
+    return {"success": True, "movies": parsed.movies, "dropped": len(parsed.dropped)}
+
+def stream_recommendations_with_groq(query, parser, options=None, accounting=None):
     """
-    Save recommendation and movies to database
-    WORKFLOW STEP 5: Backend stores recommendations in SQL database
+    Stream movie recommendations from Groq AI as they are generated
+    Yields each movie as soon as its JSON object closes in the token stream.
+    When the stream ends, `accounting` (if given) is filled with the token
+    usage Groq reports on the last chunk and the call latency.
+    """
+    options = options or prompt_options()
+    started = time.perf_counter()
+    stream = get_client().create(stream=True, **build_recommendation_request(query, options))
+    usage = None
+    emitted = 0
+    for chunk in stream:
+        # Groq reports usage on the final chunk under x_groq (OpenAI style: chunk.usage)
+        usage_holder = chunk if getattr(chunk, 'usage', None) else getattr(chunk, 'x_groq', None)
+        if getattr(usage_holder, 'usage', None) is not None:
+            usage = usage_from_completion(usage_holder)
+        if not chunk.choices:
+            continue
+        text = chunk.choices[0].delta.content
+        if text:
+            for movie in parser.feed(text):
+                if emitted < options['count']:
+                    emitted += 1
+                    yield movie
+    parser.close()
+    latency_ms = (time.perf_counter() - started) * 1000
+    record_stage('llm_call', latency_ms / 1000)
+    if accounting is not None:
+        accounting.update(token_accounting('llm', options, usage, latency_ms))
+
+def local_recommendations(query, mode, count=DEFAULT_COUNT):
+    """
+    Answer from the local index without calling Groq AI
+    'local' mode returns the best matches found; 'auto' mode only answers when
+    every match covers enough of the query, returning None to fall back to the LLM.
     """
     try:
-        # Create recommendation record
-        recommendation = Recommendation(user_id=user.id, query=query)
-        db.session.add(recommendation)
-        db.session.flush()  # Get recommendation.id without committing
-        
-        # Create movie records
-        for movie_data in movies:
-            movie = Movie(
-                recommendation_id=recommendation.id,
-                title=movie_data['title'],
-                year=movie_data['year'],
-                genre=movie_data['genre'],
-                description=movie_data['description'],
-                rating=movie_data['rating']
-            )
-            db.session.add(movie)
+        if mode == 'local':
+            matches = local_index.recommend(query, count=count, min_match=0.0)
+            if not matches:
+                return {"success": False, "error": "No local matches for this query yet", "status_code": 404}
+        else:
+            matches = local_index.recommend(query, count=count, min_match=app.config['LOCAL_INDEX_MIN_MATCH'])
+            if not matches:
+                return None
+    except Exception as e:
+        logger.warning("⚠️  Local index lookup failed: %s", e)
+        return None if mode == 'auto' else {"success": False, "error": "Local index unavailable"}
+    logger.debug("📚 Served query locally: %s", query)
+    return {"success": True, "movies": matches, "cached": False, "coalesced": False, "source": "local",
+            "accounting": {"source": "local"}}
+
+def fetch_recommendations(query, mode='llm', options=None):
+    """
+    Serve recommendations from the local index or cache, falling back to Groq AI
+    Identical queries already in flight are coalesced onto a single Groq call,
+    and successful AI results are written back so the next similar query is free.
+    Each result carries the `accounting` columns to save with the recommendation.
+    """
+    options = options or prompt_options()
+    # A different movie count or description length is a different answer
+    variant = cache_variant(**options)
+    if mode in ('local', 'auto'):
+        local_result = local_recommendations(query, mode, options['count'])
+        if local_result is not None:
+            return local_result
+    
+    cached_movies = recommendation_cache.get(query, variant)
+    if cached_movies is not None:
+        logger.debug("⚡ Cache hit for query: %s", query)
+        return {"success": True, "movies": cached_movies, "cached": True, "source": "cache",
+                "accounting": {"source": "cache"}}
+    
+    precomputed_movies = precomputed_answers.get(cache_key(query, variant))
+    if precomputed_movies is not None:
+        logger.debug("📌 Precomputed answer for query: %s", query)
+        return {"success": True, "movies": precomputed_movies, "cached": True, "source": "precomputed",
+                "accounting": {"source": "precomputed"}}
+    
+    def generate_and_cache():
+        generated = generate_recommendations_with_groq(query, options)
+        if generated['success']:
+            recommendation_cache.set(query, generated['movies'], variant)
+        return generated
+    
+    def peek_shared_cache():
+        movies = recommendation_cache.peek(query, variant)
+        return {"success": True, "movies": movies} if movies is not None else None
+    
+    shared, coalesced = recommendation_flight.do(
+        cache_key(query, variant), generate_and_cache, peek=peek_shared_cache)
+    if coalesced:
+        logger.debug("🔗 Coalesced onto in-flight request for query: %s", query)
+    
+    # Each caller gets its own copy - the leader's result is shared by reference
+    result = dict(shared)
+    if 'movies' in result:
+        result['movies'] = [dict(movie) for movie in result['movies']]
+    result['cached'] = False
+    result['coalesced'] = coalesced
+    if coalesced:
+        # The tokens were spent (and are recorded) by the leader's recommendation
+        result['accounting'] = token_accounting('llm', options)
+    return result
+
+def generate_packed_recommendations(queries, options=None):
+    """
+    Ask Groq for several queries in one call
+    Returns ({query: movies} for every query it answered, token usage, call
+    latency in ms, None) when the call went through - an unparseable answer
+    just answers nothing - or ({}, None, None, failed result) when it did not.
+    """
+    options = options or prompt_options()
+    ids = {f"q{number}": query for number, query in enumerate(queries, start=1)}
+    try:
+        logger.debug("🤖 Calling Groq AI (Llama 3.3 70B) with %d packed queries", len(queries))
+        started = time.perf_counter()
+        chat_completion = get_client().create(**build_batch_recommendation_request(ids, options))
+        latency_ms = (time.perf_counter() - started) * 1000
+    except UpstreamError as e:
+        logger.warning("❌ Upstream gave up on packed queries: %s", e)
+        return {}, None, None, {"success": False, "error": str(e), "status_code": e.status_code}
+    except Exception as e:
+        logger.error("❌ Error generating packed recommendations: %s", e)
+        return {}, None, None, {"success": False, "error": str(e)}
+    
+    usage = usage_from_completion(chat_completion)
+    try:
+        answered = parse_keyed_movies_response(chat_completion.choices[0].message.content or '')
+    except ValueError as e:
+        logger.warning("⚠️  Could not parse packed response: %s", e)
+        answered = {}
+    return ({ids[key]: movies[:options['count']] for key, movies in answered.items() if key in ids},
+            usage, latency_ms, None)
+
+def recommend_batch(queries, mode='llm', options=None, use_cache=True):
+    """
+    Resolve many queries at once for /api/recommend/batch
+    Duplicates (after normalization) are answered once. Local index, cache and
+    precomputed hits are served directly (unless use_cache is False, as when
+    the warm-cache job regenerates answers); the rest are packed BATCH_PACK_SIZE
+    to a prompt, packs run concurrently, and any query a pack left out is
+    retried on its own; when the packed call itself fails, its queries fail
+    with it. Returns ({normalized query: result}, stats); each result carries
+    its latency since the batch started. llm_calls counts calls that returned
+    an answer, failed_calls the ones that did not.
+    """
+    options = options or prompt_options()
+    variant = cache_variant(**options)
+    started = time.perf_counter()
+    unique = {}
+    for query in queries:
+        unique.setdefault(normalize_query(query), query)
+    
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 1)
+    
+    results = {}
+    pending = []
+    for key, query in unique.items():
+        result = None
+        if use_cache and mode in ('local', 'auto'):
+            result = local_recommendations(query, mode, options['count'])
+        if result is None and use_cache:
+            cached_movies = recommendation_cache.get(query, variant)
+            if cached_movies is not None:
+                result = {"success": True, "movies": cached_movies, "source": "cache",
+                          "accounting": {"source": "cache"}}
+        if result is None and use_cache:
+            precomputed_movies = precomputed_answers.get(cache_key(query, variant))
+            if precomputed_movies is not None:
+                result = {"success": True, "movies": precomputed_movies, "source": "precomputed",
+                          "accounting": {"source": "precomputed"}}
+        if result is None:
+            pending.append(key)
+        else:
+            result['latency_ms'] = elapsed_ms()
+            results[key] = result
+    
+    stats = {"queries": len(queries), "unique_queries": len(unique), "llm_calls": 0, "packed_calls": 0,
+             "failed_calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    
+    def add_usage(usage):
+        # Only a call that came back reports usage
+        if usage is None:
+            stats['failed_calls'] += 1
+            return
+        stats['llm_calls'] += 1
+        for name, value in (usage or {}).items():
+            stats[name] += value
+    
+    if pending and not get_client():
+        for key in pending:
+            results[key] = {"success": False, "status_code": 500,
+                            "error": "AI service not configured. Please set GROQ_API_KEY in the script."}
+        pending = []
+    
+    pack_size = max(1, app.config['BATCH_PACK_SIZE'])
+    packs = [pending[i:i + pack_size] for i in range(0, len(pending), pack_size)]
+    with ThreadPoolExecutor(max_workers=app.config['BATCH_MAX_PARALLEL']) as executor:
+        # Single leftovers skip the packed prompt; its keyed format only pays off for 2+
+        futures = {
+            executor.submit(generate_packed_recommendations, [unique[key] for key in pack], options)
+            if len(pack) > 1 else executor.submit(generate_recommendations_with_groq, unique[pack[0]], options): pack
+            for pack in packs
+        }
+        retry = []
+        for future in as_completed(futures):
+            pack = futures[future]
+            if len(pack) == 1:
+                generated = future.result()
+                add_usage(generated.get('usage'))
+                generated.update(source="llm", latency_ms=elapsed_ms())
+                results[pack[0]] = generated
+                continue
+            answered, usage, latency_ms, error = future.result()
+            add_usage(usage)
+            if error is not None:
+                # Rate limited or unreachable: one call per query would only fail the same way
+                for key in pack:
+                    results[key] = dict(error, source="llm-batch", latency_ms=elapsed_ms())
+                continue
+            stats['packed_calls'] += 1
+            for key in pack:
+                movies = answered.get(unique[key])
+                if movies:
+                    results[key] = {"success": True, "movies": movies, "source": "llm-batch",
+                                    "latency_ms": elapsed_ms(),
+                                    "accounting": token_accounting('llm-batch', options, usage, latency_ms,
+                                                                   share=len(answered))}
+                else:
+                    retry.append(key)
         
-        db.session.commit()
-        print(f"✅ Saved recommendation {recommendation.id} with {len(movies)} movies to database")
-        return recommendation
+        # Retry the queries a successful pack left out, one per call
+        singles = {executor.submit(generate_recommendations_with_groq, unique[key], options): key for key in retry}
+        for future in as_completed(singles):
+            generated = future.result()
+            add_usage(generated.get('usage'))
+            generated.update(source="llm", latency_ms=elapsed_ms())
+            results[singles[future]] = generated
+    
+    for key in pending:
+        if results[key]['success']:
+            recommendation_cache.set(unique[key], results[key]['movies'], variant)
+    stats['elapsed_ms'] = elapsed_ms()
+    return results, stats
+
+def write_recommendation(user_id, query, movies, accounting=None):
+    """
+    Insert one recommendation with its catalog movies and items in the current
+    transaction (no commit). Returns (recommendation_id, rows for the local index).
+    `accounting` holds the source/token columns from token_accounting().
+    """
+    # Create recommendation record
+    recommendation = Recommendation(user_id=user_id, query=query, **(accounting or {}))
+    db.session.add(recommendation)
+    db.session.flush()  # Get recommendation.id without committing
+    recommendation_id = recommendation.id
+    
+    # Resolve catalog movies, then link them with rank and rating
+    catalog_ids = upsert_catalog_movies(movies)
+    item_rows = []
+    indexed_rows = []
+    for rank, movie_data in enumerate(movies, start=1):
+        movie_id, is_new = catalog_ids[(catalog_key(movie_data['title']), int(movie_data['year']))]
+        item_rows.append({
+            'recommendation_id': recommendation_id,
+            'movie_id': movie_id,
+            'rank': rank,
+            'rating': movie_data['rating']
+        })
+        indexed_rows.append({
+            'id': movie_id, 'title': movie_data['title'], 'year': movie_data['year'],
+            'genre': movie_data['genre'], 'description': movie_data['description'],
+            'rating': movie_data['rating']
+        })
+    # One multi-row INSERT for all items instead of a statement per movie
+    db.session.execute(RecommendationItem.__table__.insert().values(item_rows))
+    bump_app_stats(
+        total_recommendations=1,
+        total_movies=len(movies),
+        unique_movies=sum(1 for _, is_new in catalog_ids.values() if is_new))
+    return recommendation_id, indexed_rows
+
+def run_write_batch(jobs):
+    """
+    Write-queue executor: run every job in one transaction with a single commit
+    If the batch fails, retry each job in its own transaction so one bad
+    write only fails its own request.
+    """
+    with app.app_context():
+        try:
+            results = [job() for job in jobs]
+            db.session.commit()
+            return results
+        except Exception:
+            db.session.rollback()
+        
+        results = []
+        for job in jobs:
+            try:
+                results.append(job())
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                results.append(e)
+        return results
+
+write_queue = WriteQueue(
+    run_write_batch,
+    max_batch=app.config['DB_WRITE_QUEUE_MAX_BATCH'],
+    max_wait=app.config['DB_WRITE_QUEUE_MAX_WAIT_MS'] / 1000,
+) if app.config['DB_WRITE_QUEUE'] else None
+
+# Serialized history pages (scoped by user id) and statistics; writes below drop them
+response_cache = ResponseCache(
+    ttl=app.config['RESPONSE_CACHE_TTL'],
+    max_scopes=app.config['RESPONSE_CACHE_MAX_ENTRIES'],
+)
+
+def save_recommendation_to_db(user_id, query, movies, accounting=None):
+    """
+    Save recommendation and movies to database, returning the recommendation id
+    WORKFLOW STEP 5: Backend stores recommendations in SQL database
+    Movies are stored once in the catalog; each recommendation only adds slim item rows.
+    With the write queue enabled, concurrent saves share one transaction.
+    """
+    try:
+        if write_queue is not None:
+            future = write_queue.submit(lambda: write_recommendation(user_id, query, movies, accounting))
+            try:
+                recommendation_id, indexed_rows = future.result(timeout=app.config['DB_WRITE_QUEUE_TIMEOUT'])
+            except FutureTimeoutError:
+                if not future.cancel():
+                    # The writer already has it; its outcome is unknown, so don't write it twice
+                    raise RuntimeError("write queue timed out with the save in progress")
+                logger.warning("⚠️  Write queue timed out; saving recommendation directly")
+                recommendation_id, indexed_rows = write_recommendation(user_id, query, movies, accounting)
+                db.session.commit()
+        else:
+            recommendation_id, indexed_rows = write_recommendation(user_id, query, movies, accounting)
+            db.session.commit()
+        local_index.add_rows(indexed_rows)
+        response_cache.invalidate(user_id, 'statistics')
+        RECOMMENDATIONS.inc(source=(accounting or {}).get('source') or 'llm')
+        logger.debug("✅ Saved recommendation %s with %d movies to database", recommendation_id, len(movies))
+        return recommendation_id
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error saving to database: {str(e)}")
+        logger.error("❌ Error saving to database: %s", e)
         return None
 
+def save_batch_to_db(user_id, entries):
+    """
+    Save [(query, movies, accounting), ...] in one transaction with a single commit
+    Returns the recommendation ids in order (all None if the transaction failed).
+    """
+    try:
+        recommendation_ids = []
+        indexed_rows = []
+        for query, movies, accounting in entries:
+            recommendation_id, rows = write_recommendation(user_id, query, movies, accounting)
+            recommendation_ids.append(recommendation_id)
+            indexed_rows.extend(rows)
+        db.session.commit()
+        local_index.add_rows(indexed_rows)
+        response_cache.invalidate(user_id, 'statistics')
+        for _, _, accounting in entries:
+            RECOMMENDATIONS.inc(source=(accounting or {}).get('source') or 'llm')
+        logger.debug("✅ Saved %d batch recommendations to database", len(entries))
+        return recommendation_ids
+    except Exception as e:
+        db.session.rollback()
+        logger.error("❌ Error saving batch to database: %s", e)
+        return [None] * len(entries)
+
+def mine_top_queries(days, limit):
+    """
+    The most requested normalized queries over the last `days` days
+    Returns (ranked [(key, text, request count)], total requests in the window).
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    rows = db.session.query(Recommendation.query, db.func.count(Recommendation.id))\
+        .filter(Recommendation.created_at >= since)\
+        .group_by(Recommendation.query)\
+        .all()
+    return rank_queries(rows, limit), sum(count for _, count in rows)
+
+def store_precomputed(entries):
+    """Upsert [(query_key, text, request_count, movies)] into precomputed_recommendations (no commit)"""
+    now = datetime.utcnow()
+    rows = [{'query_key': key, 'query_text': text, 'request_count': count,
+             'movies': json.dumps(movies), 'refreshed_at': now}
+            for key, text, count, movies in entries]
+    statement = _dialect_insert(PrecomputedRecommendation)
+    if statement is not None:
+        db.session.execute(statement.values(rows).on_conflict_do_update(
+            index_elements=['query_key'],
+            set_={name: getattr(statement.excluded, name)
+                  for name in ('query_text', 'request_count', 'movies', 'refreshed_at')}))
+        return
+    for row in rows:
+        existing = db.session.query(PrecomputedRecommendation).filter_by(query_key=row['query_key']).first()
+        if existing is None:
+            db.session.add(PrecomputedRecommendation(**row))
+        else:
+            for name, value in row.items():
+                setattr(existing, name, value)
+
+def warm_precomputed(top, days, max_age_hours, pause=0.0):
+    """
+    Precompute answers for the `top` most requested queries of the last `days` days
+    Missing answers and answers older than `max_age_hours` are regenerated
+    through recommend_batch, so they are packed several to a prompt and go
+    through the upstream pool's rate limits; `pause` adds a gap between chunks
+    to leave headroom for live traffic. Answers for queries that fell out of
+    the top list are pruned. Returns a report dict.
+    """
+    options = prompt_options()
+    variant = cache_variant(**options)
+    ranked, total_requests = mine_top_queries(days, top)
+    wanted = {cache_key(text, variant): (text, count) for _, text, count in ranked}
+    
+    fresh_after = datetime.utcnow() - timedelta(hours=max_age_hours)
+    stored = dict(db.session.query(PrecomputedRecommendation.query_key, PrecomputedRecommendation.refreshed_at))
+    due = [key for key in wanted if key not in stored or stored[key] < fresh_after]
+    report = {"requests_mined": total_requests, "top_queries": len(wanted), "due": len(due),
+              "refreshed": 0, "failed": 0, "pruned": 0, "llm_calls": 0, "total_tokens": 0,
+              "coverage": round(sum(count for _, count in wanted.values()) / total_requests, 4)
+              if total_requests else 0.0}
+    
+    chunk_size = max(1, app.config['BATCH_MAX_QUERIES'])
+    for start in range(0, len(due), chunk_size):
+        if start and pause:
+            time.sleep(pause)
+        chunk = due[start:start + chunk_size]
+        results, stats = recommend_batch([wanted[key][0] for key in chunk], 'llm', options, use_cache=False)
+        entries = []
+        for key in chunk:
+            text, count = wanted[key]
+            result = results[normalize_query(text)]
+            if result['success']:
+                entries.append((key, text, count, result['movies']))
+            else:
+                report['failed'] += 1
+                logger.warning("⚠️  Could not precompute '%s': %s", text, result.get('error'))
+        if entries:
+            store_precomputed(entries)
+            db.session.commit()
+        report['refreshed'] += len(entries)
+        report['llm_calls'] += stats['llm_calls']
+        report['total_tokens'] += stats['total_tokens']
+        logger.info("   ↪ precomputed %d/%d queries", report['refreshed'], len(due))
+    
+    # An empty window (no traffic yet, wrong --days) must not wipe the table
+    if wanted:
+        report['pruned'] = db.session.query(PrecomputedRecommendation)\
+            .filter(PrecomputedRecommendation.query_key.notin_(list(wanted)))\
+            .delete(synchronize_session=False)
+        db.session.commit()
+    return report
+
+def precompute_hit_report(days):
+    """
+    Where the last `days` days of recommendations were served from
+    `precomputed_hit_rate` is the share of requests answered from precomputed
+    answers (LLM calls avoided on cold caches); `coverage` is the share whose
+    query the current precomputed set would answer.
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    by_source = dict(db.session.query(
+            db.func.coalesce(Recommendation.source, 'unknown'), db.func.count(Recommendation.id))\
+        .filter(Recommendation.created_at >= since)\
+        .group_by(db.func.coalesce(Recommendation.source, 'unknown'))\
+        .all())
+    requests = sum(by_source.values())
+    variant = cache_variant(**prompt_options())
+    keys = {key for key, in db.session.query(PrecomputedRecommendation.query_key)}
+    covered = sum(count for text, count in db.session.query(Recommendation.query, db.func.count(Recommendation.id))
+                  .filter(Recommendation.created_at >= since)
+                  .group_by(Recommendation.query)
+                  if cache_key(text, variant) in keys)
+    
+    def rate(count):
+        return round(count / requests, 4) if requests else 0.0
+    
+    return {
+        "days": days,
+        "requests": requests,
+        "by_source": by_source,
+        "precomputed_entries": len(keys),
+        "precomputed_hit_rate": rate(by_source.get('precomputed', 0)),
+        "llm_rate": rate(by_source.get('llm', 0) + by_source.get('llm-batch', 0)),
+        "coverage": rate(covered),
+    }
+
+HISTORY_MAX_PAGE_SIZE = 100
+
+def encode_history_cursor(recommendation):
+    """Opaque keyset cursor pointing just past a recommendation"""
+    raw = json.dumps([recommendation.created_at.isoformat(), recommendation.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor):
+    """Inverse of encode_history_cursor; raises ValueError for a malformed cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, recommendation_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(recommendation_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+def history_validator(session_id, page=None):
+    """
+    (user id, recommendation count, newest id, newest created_at) of a session's history
+    Any save or delete changes one of them, so they make the history ETag.
+    `page` - rows of an uncursored history page that carry the windowed totals -
+    saves the extra aggregate query. None for an unknown session.
+    """
+    if page is not None:
+        if not page:
+            return None
+        row = page[0]
+        return row.Recommendation.user_id, row.history_count, row.newest_id, row.newest_created_at
+    return db.session.query(
+            User.id, db.func.count(Recommendation.id), db.func.max(Recommendation.id),
+            db.func.max(Recommendation.created_at))\
+        .outerjoin(Recommendation, Recommendation.user_id == User.id)\
+        .filter(User.session_id == session_id)\
+        .group_by(User.id)\
+        .first()
+
+def history_etag(session_id, limit, cursor, validator):
+    _, count, newest_id, newest_created_at = validator or (None, 0, None, None)
+    return make_etag('history', session_id, limit, cursor, count, newest_id, newest_created_at)
+
+# ==================== METRICS ====================
+
+metrics_registry.register_stats('cache', recommendation_cache.stats)
+metrics_registry.register_stats('single_flight', recommendation_flight.stats)
+metrics_registry.register_stats('local_index', local_index.stats)
+metrics_registry.register_stats('sessions', session_registry.stats)
+metrics_registry.register_stats('precomputed', precomputed_answers.stats)
+metrics_registry.register_stats('write_queue', lambda: write_queue.stats() if write_queue else None)
+metrics_registry.register_stats('upstream', lambda: _client.stats() if _client else None)
+metrics_registry.register_stats('response_cache', response_cache.stats)
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started (for the duration histogram)"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request, observe its duration and expose stage timings as Server-Timing"""
+    if not app.config['METRICS_ENABLED'] or 'request_started' not in g:
+        return response
+    elapsed = time.perf_counter() - g.request_started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    HTTP_SECONDS.observe(elapsed, method=request.method, route=route)
+    timings = g.get('stage_timings')
+    if timings:
+        response.headers['Server-Timing'] = ', '.join(
+            f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+    logger.debug("%s %s -> %s in %.1f ms", request.method, request.path, response.status_code, elapsed * 1000)
+    return response
+
+@app.after_request
+def compress_json_response(response):
+    """gzip/brotli-encode large JSON bodies the client accepts (cached bodies arrive already encoded)"""
+    return compress_response(response, request.accept_encodings, app.config['RESPONSE_COMPRESSION_MIN_BYTES'])
+
 # ==================== API ENDPOINTS ====================
 
 @app.route('/', methods=['GET'])
@@ -255,13 +1249,34 @@ def home():
                 "path": "/api/health",
                 "description": "Check server health and configuration status"
             },
+            "metrics": {
+                "method": "GET",
+                "path": "/metrics",
+                "description": "Request, stage and token metrics in the Prometheus text format"
+            },
             "recommend": {
                 "method": "POST",
                 "path": "/api/recommend",
                 "description": "Get AI-powered movie recommendations",
                 "body": {
                     "query": "string (required)",
-                    "session_id": "string (optional)"
+                    "session_id": "string (optional)",
+                    "mode": "string (optional: llm, local, auto)",
+                    "count": "integer (optional, movies to return)",
+                    "description_length": "string (optional: short, medium, long)",
+                    "template": "string (optional: compact, classic)"
+                }
+            },
+            "recommend_stream": {
+                "method": "POST",
+                "path": "/api/recommend/stream",
+                "description": "Stream recommendations as NDJSON events while the AI generates them",
+                "body": {
+                    "query": "string (required)",
+                    "session_id": "string (optional)",
+                    "count": "integer (optional)",
+                    "description_length": "string (optional)",
+                    "template": "string (optional)"
                 }
             },
             "history": {
@@ -269,7 +1284,16 @@ def home():
                 "path": "/api/history/<session_id>",
                 "description": "Retrieve user's recommendation history",
                 "query_params": {
-                    "limit": "integer (optional, default: 10)"
+                    "limit": "integer (optional, default: 10, max: 100)",
+                    "cursor": "string (optional, next_cursor from the previous page)"
+                }
+            },
+            "history_export": {
+                "method": "GET",
+                "path": "/api/history/<session_id>/export",
+                "description": "Stream the full recommendation history for a session",
+                "query_params": {
+                    "format": "string (optional: ndjson (default) or csv)"
                 }
             },
             "statistics": {
@@ -292,11 +1316,27 @@ def health_check():
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
         "database": "connected",
-        "ai_service": "configured" if client else "not configured",
+        "ai_service": "configured" if LLM_CONFIGURED else "not configured",
         "ai_provider": "Groq (Llama 3.3 70B Versatile)",
-        "environment": "development" if app.debug else "production"
+        "environment": "development" if app.debug else "production",
+        "cache": recommendation_cache.stats(),
+        "single_flight": recommendation_flight.stats(),
+        "local_index": local_index.stats(),
+        "sessions": session_registry.stats(),
+        "storage": describe_engine(db.engine, app.config['DB_STORAGE_MODE']),
+        "write_queue": write_queue.stats() if write_queue else None,
+        "precomputed": precomputed_answers.stats(),
+        "upstream": _client.stats() if _client else None,
+        "response_cache": response_cache.stats()
     }), 200
 
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint - counters are per worker process"""
+    if not app.config['METRICS_ENABLED']:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics_registry.render(), content_type=CONTENT_TYPE)
+
 @app.route('/api/recommend', methods=['POST', 'OPTIONS'])
 def get_recommendations():
     """
@@ -309,11 +1349,10 @@ def get_recommendations():
         return '', 204
     
     try:
-        print("\n" + "="*60)
-        print("📨 STEP 2: Received recommendation request from frontend")
+        logger.debug("📨 STEP 2: Received recommendation request from frontend")
         
         data = request.get_json()
-        print(f"📦 Request data: {data}")
+        logger.debug("📦 Request data: %s", data)
         
         if not data:
             return jsonify({"success": False, "error": "No data provided"}), 400
@@ -323,108 +1362,450 @@ def get_recommendations():
         if not query:
             return jsonify({"success": False, "error": "Query is required"}), 400
         
+        mode = data.get('mode', app.config['RECOMMENDATION_MODE'])
+        if mode not in RECOMMENDATION_MODES:
+            return jsonify({"success": False, "error": f"mode must be one of: {', '.join(RECOMMENDATION_MODES)}"}), 400
+        
+        try:
+            options = prompt_options(data)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
         session_id = data.get('session_id', str(uuid.uuid4()))
-        print(f"🔑 Session ID: {session_id}")
+        logger.debug("🔑 Session ID: %s", session_id)
         
         # STEP 3: Get or create user in database
-        print("📊 STEP 3: Managing user session in database")
-        user = get_or_create_user(session_id)
-        if not user:
+        logger.debug("📊 STEP 3: Managing user session in database")
+        with timed_stage('session'):
+            user_id = get_or_create_user_id(session_id)
+        if user_id is None:
             return jsonify({"success": False, "error": "Failed to create user session"}), 500
         
-        # STEP 4: Generate recommendations using Groq AI
-        print("🤖 STEP 4: Calling Groq AI (Llama 3.3 70B) to generate recommendations")
-        result = generate_recommendations_with_groq(query)
+        # STEP 4: Generate recommendations using Groq AI (or the recommendation cache)
+        logger.debug("🤖 STEP 4: Calling Groq AI (Llama 3.3 70B) to generate recommendations")
+        with timed_stage('fetch'):
+            result = fetch_recommendations(query, mode, options)
         
         if not result['success']:
-            return jsonify({"success": False, "error": result.get('error')}), 500
+            return jsonify({"success": False, "error": result.get('error')}), result.get('status_code', 500)
         
         movies = result['movies']
         
         # STEP 5: Save to database
-        print("💾 STEP 5: Saving recommendations to database")
-        recommendation = save_recommendation_to_db(user, query, movies)
+        logger.debug("💾 STEP 5: Saving recommendations to database")
+        with timed_stage('db_save'):
+            recommendation_id = save_recommendation_to_db(user_id, query, movies, result.get('accounting'))
         
         # STEP 6: Send response to frontend
         response_data = {
             "success": True,
             "movies": movies,
             "session_id": session_id,
-            "recommendation_id": recommendation.id if recommendation else None,
+            "recommendation_id": recommendation_id,
             "timestamp": datetime.utcnow().isoformat(),
-            "query": query
+            "query": query,
+            "cached": result.get('cached', False),
+            "coalesced": result.get('coalesced', False),
+            "source": result.get('source', 'llm')
         }
         
-        print(f"✅ STEP 6: Sending {len(movies)} movies to frontend")
-        print("="*60 + "\n")
+        logger.debug("✅ STEP 6: Sending %d movies to frontend", len(movies))
         
-        return jsonify(response_data), 200
+        with timed_stage('serialize'):
+            response = jsonify(response_data)
+        return response, 200
     
     except Exception as e:
-        print(f"❌ Error in get_recommendations: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error in get_recommendations: %s", e)
         return jsonify({"success": False, "error": "Internal server error"}), 500
 
+@app.route('/api/recommend/batch', methods=['POST', 'OPTIONS'])
+def recommend_batch_endpoint():
+    """
+    Batch recommendation endpoint for offline jobs (prewarming, digests)
+    Body: {"queries": [...], "session_id": ..., "mode": ..., plus the prompt options
+    of /api/recommend applied to every query}. Every query gets a
+    result in request order; duplicates share one answer and one saved recommendation.
+    """
+    
+    # Handle CORS preflight
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    try:
+        data = request.get_json(silent=True)
+        if not data:
+            return jsonify({"success": False, "error": "No data provided"}), 400
+        
+        queries = data.get('queries')
+        if not isinstance(queries, list) or not all(isinstance(query, str) for query in queries):
+            return jsonify({"success": False, "error": "queries must be a list of strings"}), 400
+        queries = [query.strip() for query in queries]
+        if not queries or not all(queries):
+            return jsonify({"success": False, "error": "queries must be non-empty"}), 400
+        if len(queries) > app.config['BATCH_MAX_QUERIES']:
+            return jsonify({
+                "success": False,
+                "error": f"At most {app.config['BATCH_MAX_QUERIES']} queries per batch"
+            }), 400
+        
+        mode = data.get('mode', app.config['RECOMMENDATION_MODE'])
+        if mode not in RECOMMENDATION_MODES:
+            return jsonify({"success": False, "error": f"mode must be one of: {', '.join(RECOMMENDATION_MODES)}"}), 400
+        
+        try:
+            options = prompt_options(data)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
+        
+        session_id = data.get('session_id', str(uuid.uuid4()))
+        user_id = get_or_create_user_id(session_id)
+        if user_id is None:
+            return jsonify({"success": False, "error": "Failed to create user session"}), 500
+        
+        logger.info("📨 Batch recommendation request: %d queries", len(queries))
+        results, stats = recommend_batch(queries, mode, options)
+        
+        # One transaction for every successful unique query
+        saved_keys = [key for key, result in results.items() if result['success']]
+        first_query = {}
+        for query in queries:
+            first_query.setdefault(normalize_query(query), query)
+        recommendation_ids = dict(zip(saved_keys, save_batch_to_db(
+            user_id, [(first_query[key], results[key]['movies'], results[key].get('accounting'))
+                      for key in saved_keys])))
+        
+        response_results = []
+        seen = set()
+        for query in queries:
+            key = normalize_query(query)
+            result = results[key]
+            entry = {
+                "query": query,
+                "success": result['success'],
+                "source": result.get('source'),
+                "latency_ms": result.get('latency_ms'),
+                "duplicate": key in seen,
+            }
+            if result['success']:
+                entry["movies"] = [dict(movie) for movie in result['movies']]
+                entry["recommendation_id"] = recommendation_ids.get(key)
+            else:
+                entry["error"] = result.get('error')
+            seen.add(key)
+            response_results.append(entry)
+        
+        return jsonify({
+            "success": True,
+            "session_id": session_id,
+            "results": response_results,
+            "stats": stats,
+            "timestamp": datetime.utcnow().isoformat()
+        }), 200
+    
+    except Exception as e:
+        logger.exception("❌ Error in batch recommendation endpoint: %s", e)
+        return jsonify({"success": False, "error": "Internal server error"}), 500
+
+@app.route('/api/recommend/stream', methods=['POST', 'OPTIONS'])
+def stream_recommendations():
+    """
+    Streaming recommendation endpoint - emits movies as NDJSON while Groq generates them
+    Each line is one event: "meta", then one "movie" per recommendation, then
+    "done" or "error". "done" goes out before the database write; a final
+    "saved" event carries the recommendation id (null if the save failed).
+    """
+    
+    # Handle CORS preflight
+    if request.method == 'OPTIONS':
+        return '', 204
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"success": False, "error": "No data provided"}), 400
+    
+    query = data.get('query', '').strip()
+    if not query:
+        return jsonify({"success": False, "error": "Query is required"}), 400
+    
+    try:
+        options = prompt_options(data)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    variant = cache_variant(**options)
+    
+    session_id = data.get('session_id', str(uuid.uuid4()))
+    user_id = get_or_create_user_id(session_id)
+    if user_id is None:
+        return jsonify({"success": False, "error": "Failed to create user session"}), 500
+    
+    cached_movies = recommendation_cache.get(query, variant)
+    served_from = "cache"
+    if cached_movies is None:
+        cached_movies = precomputed_answers.get(cache_key(query, variant))
+        served_from = "precomputed"
+    if cached_movies is None and not get_client():
+        return jsonify({
+            "success": False,
+            "error": "AI service not configured. Please set GROQ_API_KEY in the script."
+        }), 500
+    
+    def event(payload):
+        return json.dumps(payload) + "\n"
+    
+    def generate():
+        yield event({
+            "type": "meta",
+            "session_id": session_id,
+            "query": query,
+            "cached": cached_movies is not None
+        })
+        
+        movies = []
+        parser = IncrementalMovieParser()
+        accounting = {"source": served_from} if cached_movies is not None else {}
+        try:
+            source = iter(cached_movies) if cached_movies is not None \
+                else stream_recommendations_with_groq(query, parser, options, accounting)
+            for movie in source:
+                movies.append(movie)
+                yield event({"type": "movie", "index": len(movies) - 1, "movie": movie})
+        except Exception as e:
+            logger.error("❌ Error streaming recommendations: %s", e)
+            yield event({"type": "error",
+                         "error": str(e) if isinstance(e, UpstreamError) else "AI service error. Please try again."})
+            return
+        
+        if not movies:
+            yield event({"type": "error", "error": "Failed to parse AI response. Please try again."})
+            return
+        if parser.dropped:
+            logger.warning("⚠️  Skipped %d malformed movie objects in stream", len(parser.dropped))
+        
+        if cached_movies is None:
+            recommendation_cache.set(query, movies, variant)
+        try:
+            yield event({
+                "type": "done",
+                "count": len(movies),
+                "timestamp": datetime.utcnow().isoformat()
+            })
+        finally:
+            # Persist once "done" is on the wire - even if the client hangs up after it
+            recommendation_id = save_recommendation_to_db(user_id, query, movies, accounting)
+        yield event({"type": "saved", "recommendation_id": recommendation_id})
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.route('/api/history/<session_id>', methods=['GET'])
 def get_user_history(session_id):
-    """Get user recommendation history from database"""
+    """
+    Get user recommendation history from database
+    Answers If-None-Match with 304, and repeats of an unchanged page from the
+    response cache, after one aggregate query instead of the page queries.
+    """
     try:
-        limit = request.args.get('limit', 10, type=int)
-        user = User.query.filter_by(session_id=session_id).first()
+        limit = min(max(request.args.get('limit', 10, type=int), 1), HISTORY_MAX_PAGE_SIZE)
+        cursor = request.args.get('cursor')
+        page_key = (limit, cursor)
         
-        if not user:
-            return jsonify({"success": True, "recommendations": []}), 200
+        # Read the validator first when it can save the page queries: a conditional
+        # request, a page this worker has cached, or a cursor page (whose rows can't carry it)
+        cached_scope = response_cache.scope_for(session_id)
+        read_validator = bool(request.if_none_match or cursor or
+                              (cached_scope and response_cache.has(cached_scope, page_key)))
+        if read_validator:
+            validator = history_validator(session_id)
+            etag = history_etag(session_id, limit, cursor, validator)
+            if is_not_modified(request, etag):
+                response_cache.count_not_modified()
+                return not_modified_response(etag, cache_control='private, no-cache')
+            cached = response_cache.get(validator[0], page_key, etag) if validator else None
+            if cached is not None:
+                return cached.response(request.accept_encodings, app.config['RESPONSE_COMPRESSION_MIN_BYTES'],
+                                       cache_control='private, no-cache')
         
-        recommendations = Recommendation.query.filter_by(user_id=user.id)\
-            .order_by(Recommendation.created_at.desc())\
-            .limit(limit)\
+        # One query for the page of recommendations (joined to the session's user)
+        # and one for all of their items with catalog movies - never one per row.
+        # Recommendation.query is shadowed by the 'query' column, so go through the session
+        page_query = db.session.query(Recommendation)\
+            .join(User, User.id == Recommendation.user_id)\
+            .filter(User.session_id == session_id)
+        if cursor:
+            try:
+                cursor_created_at, cursor_id = decode_history_cursor(cursor)
+            except ValueError:
+                return jsonify({"success": False, "error": "Invalid cursor"}), 400
+            # Keyset pagination: seek past the last row of the previous page
+            page_query = page_query.filter(
+                db.tuple_(Recommendation.created_at, Recommendation.id) < (cursor_created_at, cursor_id))
+        elif not read_validator:
+            # The first page carries the session's totals (the ETag validator) as window columns
+            page_query = page_query.add_columns(
+                db.func.count(Recommendation.id).over().label('history_count'),
+                db.func.max(Recommendation.id).over().label('newest_id'),
+                db.func.max(Recommendation.created_at).over().label('newest_created_at'))
+        
+        # Fetch one extra row to learn whether another page exists
+        rows = page_query\
+            .options(selectinload(Recommendation.items).joinedload(RecommendationItem.movie))\
+            .order_by(Recommendation.created_at.desc(), Recommendation.id.desc())\
+            .limit(limit + 1)\
             .all()
+        if not read_validator:
+            validator = history_validator(session_id, page=rows)
+            rows = [row.Recommendation for row in rows]
+        has_more = len(rows) > limit
+        recommendations = rows[:limit]
         
-        print(f"📜 Retrieved {len(recommendations)} history items for session {session_id}")
+        logger.debug("📜 Retrieved %d history items for session %s", len(recommendations), session_id)
         
-        return jsonify({
+        payload = jsonify({
             "success": True,
-            "recommendations": [rec.to_dict() for rec in recommendations]
-        }), 200
+            "recommendations": [rec.to_dict() for rec in recommendations],
+            "has_more": has_more,
+            "next_cursor": encode_history_cursor(recommendations[-1]) if has_more else None
+        }).get_data()
+        cached = CachedBody(history_etag(session_id, limit, cursor, validator), payload)
+        if validator:
+            response_cache.set(validator[0], page_key, cached, alias=session_id)
+        return cached.response(request.accept_encodings, app.config['RESPONSE_COMPRESSION_MIN_BYTES'],
+                               cache_control='private, no-cache')
     
     except Exception as e:
-        print(f"❌ Error in get_user_history: {str(e)}")
+        logger.error("❌ Error in get_user_history: %s", e)
         return jsonify({"success": False, "error": "Failed to fetch history"}), 500
 
+EXPORT_COLUMNS = ['recommendation_id', 'query', 'created_at', 'rank', 'title', 'year', 'genre', 'rating', 'description']
+
+@app.route('/api/history/<session_id>/export', methods=['GET'])
+def export_user_history(session_id):
+    """
+    Stream a session's full history as NDJSON (one recommendation per line) or CSV (one movie per row)
+    Rows are read through a streaming cursor in batches, so memory stays flat
+    no matter how long the history is.
+    """
+    export_format = request.args.get('format', 'ndjson').lower()
+    if export_format not in ('ndjson', 'csv'):
+        return jsonify({"success": False, "error": "format must be 'ndjson' or 'csv'"}), 400
+    
+    statement = db.select(
+            Recommendation.id, Recommendation.query, Recommendation.created_at,
+            RecommendationItem.rank, CatalogMovie.title, CatalogMovie.year, CatalogMovie.genre,
+            RecommendationItem.rating, CatalogMovie.description)\
+        .join(User, User.id == Recommendation.user_id)\
+        .outerjoin(RecommendationItem, RecommendationItem.recommendation_id == Recommendation.id)\
+        .outerjoin(CatalogMovie, CatalogMovie.id == RecommendationItem.movie_id)\
+        .where(User.session_id == session_id)\
+        .order_by(Recommendation.created_at, Recommendation.id, RecommendationItem.rank)\
+        .execution_options(yield_per=500)
+    
+    def generate_csv():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        for row in db.session.execute(statement):
+            writer.writerow([row[0], row[1], row[2].isoformat(), *row[3:]])
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    
+    def generate_ndjson():
+        # Rows arrive ordered by recommendation, so group consecutive rows
+        current = None
+        for row in db.session.execute(statement):
+            if current is None or current['id'] != row[0]:
+                if current is not None:
+                    yield json.dumps(current) + "\n"
+                current = {"id": row[0], "query": row[1], "created_at": row[2].isoformat(), "movies": []}
+            if row[3] is not None:
+                current['movies'].append({
+                    "rank": row[3], "title": row[4], "year": row[5], "genre": row[6],
+                    "rating": row[7], "description": row[8]
+                })
+        if current is not None:
+            yield json.dumps(current) + "\n"
+    
+    if export_format == 'csv':
+        body, mimetype = generate_csv(), 'text/csv'
+    else:
+        body, mimetype = generate_ndjson(), 'application/x-ndjson'
+    return Response(
+        stream_with_context(body),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=history-{session_id}.{export_format}"}
+    )
+
 @app.route('/api/statistics', methods=['GET'])
 def get_statistics():
-    """Get application statistics from database"""
+    """
+    Get application statistics from database
+    The counters row is the version: its values and updated_at make the ETag,
+    so a conditional or repeated request costs one primary-key read.
+    """
     try:
-        total_users = User.query.count()
-        total_recommendations = Recommendation.query.count()
-        total_movies = Movie.query.count()
+        # Totals come from the maintained counters row instead of COUNT(*) scans,
+        # including the rows the retention job has archived
+        stats = get_app_stats()
+        etag = make_etag('statistics', stats.total_users, stats.total_recommendations, stats.total_movies,
+                         stats.unique_movies, stats.archived_users, stats.archived_recommendations,
+                         stats.archived_movies, stats.updated_at)
+        if is_not_modified(request, etag, stats.updated_at):
+            response_cache.count_not_modified()
+            return not_modified_response(etag, stats.updated_at)
+        cached = response_cache.get('statistics', None, etag)
+        if cached is not None:
+            return cached.response(request.accept_encodings, app.config['RESPONSE_COMPRESSION_MIN_BYTES'])
         
-        # Get recent activity
-        recent_recommendations = Recommendation.query\
-            .order_by(Recommendation.created_at.desc())\
+        total_users = stats.total_users + (stats.archived_users or 0)
+        total_recommendations = stats.total_recommendations + (stats.archived_recommendations or 0)
+        total_movies = stats.total_movies + (stats.archived_movies or 0)
+        unique_movies = stats.unique_movies
+        
+        # Get recent activity - item counts come back in the same query. The five
+        # newest rows are picked first (ix_recommendations_created), then grouped
+        recent_ids = db.session.query(Recommendation.id)\
+            .order_by(Recommendation.created_at.desc(), Recommendation.id.desc())\
             .limit(5)\
+            .subquery()
+        recent_recommendations = db.session.query(
+                Recommendation.query, Recommendation.created_at,
+                db.func.count(RecommendationItem.id).label('movie_count'))\
+            .select_from(recent_ids)\
+            .join(Recommendation, Recommendation.id == recent_ids.c.id)\
+            .outerjoin(RecommendationItem, RecommendationItem.recommendation_id == Recommendation.id)\
+            .group_by(recent_ids.c.id, Recommendation.query, Recommendation.created_at)\
+            .order_by(Recommendation.created_at.desc(), recent_ids.c.id.desc())\
             .all()
         
-        return jsonify({
+        payload = jsonify({
             "success": True,
             "statistics": {
                 "total_users": total_users,
                 "total_recommendations": total_recommendations,
                 "total_movies": total_movies,
+                "unique_movies": unique_movies,
                 "average_movies_per_recommendation": round(total_movies / total_recommendations, 2) if total_recommendations > 0 else 0
             },
             "recent_activity": [
                 {
                     "query": rec.query,
-                    "movie_count": len(rec.movies),
+                    "movie_count": rec.movie_count,
                     "timestamp": rec.created_at.isoformat()
                 } for rec in recent_recommendations
             ]
-        }), 200
+        }).get_data()
+        cached = CachedBody(etag, payload, last_modified=stats.updated_at)
+        response_cache.set('statistics', None, cached)
+        return cached.response(request.accept_encodings, app.config['RESPONSE_COMPRESSION_MIN_BYTES'])
     
     except Exception as e:
-        print(f"❌ Error in get_statistics: {str(e)}")
+        logger.error("❌ Error in get_statistics: %s", e)
         return jsonify({"success": False, "error": "Failed to fetch statistics"}), 500
 
 @app.route('/api/clear-history/<session_id>', methods=['DELETE', 'OPTIONS'])
@@ -441,11 +1822,20 @@ def clear_user_history(session_id):
         if not user:
             return jsonify({"success": False, "error": "User not found"}), 404
         
-        # Delete all recommendations (movies will be cascade deleted)
-        deleted_count = Recommendation.query.filter_by(user_id=user.id).delete()
+        # Bulk deletes skip ORM cascades, so remove the items explicitly first.
+        # Catalog movies are shared across users and are kept.
+        user_recommendation_ids = db.session.query(Recommendation.id).filter_by(user_id=user.id)
+        deleted_items = db.session.query(RecommendationItem)\
+            .filter(RecommendationItem.recommendation_id.in_(user_recommendation_ids.scalar_subquery()))\
+            .delete(synchronize_session=False)
+        deleted_count = db.session.query(Recommendation).filter_by(user_id=user.id)\
+            .delete(synchronize_session=False)
+        bump_app_stats(total_recommendations=-deleted_count, total_movies=-deleted_items)
+        user_id = user.id
         db.session.commit()
+        response_cache.invalidate(user_id, 'statistics')
         
-        print(f"🗑️  Cleared {deleted_count} recommendations for session {session_id}")
+        logger.info("🗑️  Cleared %d recommendations for session %s", deleted_count, session_id)
         
         return jsonify({
             "success": True,
@@ -454,7 +1844,7 @@ def clear_user_history(session_id):
     
     except Exception as e:
         db.session.rollback()
-        print(f"❌ Error in clear_user_history: {str(e)}")
+        logger.error("❌ Error in clear_user_history: %s", e)
         return jsonify({"success": False, "error": "Failed to clear history"}), 500
 
 # ==================== ERROR HANDLERS ====================
@@ -480,52 +1870,154 @@ def internal_error(error):
 # ==================== DATABASE INITIALIZATION ====================
 
 def init_db():
-    """Initialize database tables"""
+    """Create missing tables (run by init-db, and by python main.py unless DB_AUTO_CREATE=false)"""
     with app.app_context():
         db.create_all()
-        print("✅ Database initialized successfully")
-        
-        # Print table info
-        inspector = db.inspect(db.engine)
-        tables = inspector.get_table_names()
-        print(f"📊 Database tables: {', '.join(tables)}")
+        logger.info("✅ Database initialized successfully")
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Create the database tables on a fresh database"""
+    init_db()
+    click.echo(f"📊 Database tables: {', '.join(db.inspect(db.engine).get_table_names())}")
+
+def warm_worker_state():
+    """
+    Load the local index and precomputed answers now rather than on the first requests
+    Called by the gunicorn master with preload_app, so every worker forks with
+    them already in memory; the connections used are closed before the fork.
+    """
+    started = time.perf_counter()
+    with app.app_context():
+        try:
+            local_index.refresh(force=True)
+            precomputed_answers.refresh(force=True)
+            logger.info("🔥 Warmed %d indexed movies and %d precomputed answers in %.0f ms",
+                        local_index.stats()['movies'], precomputed_answers.stats()['entries'],
+                        (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            # A fresh database without tables: workers load lazily once init-db has run
+            logger.warning("⚠️  Skipped startup warm-up: %s", e)
+        finally:
+            db.session.remove()
+            db.engine.dispose()
+
+@app.cli.command('migrate-db')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Recommendations migrated per transaction.')
+@click.option('--keep-legacy', is_flag=True,
+              help='Keep the legacy movies table instead of dropping it.')
+def migrate_db_command(batch_size, keep_legacy):
+    """Upgrade an existing database to the current schema"""
+    from migrations import run_migrations
+    
+    reports = run_migrations(normalize_movie_catalog={
+        'batch_size': batch_size,
+        'keep_legacy': keep_legacy,
+    })
+    for name, report in reports:
+        click.echo(f"✅ {name}: {json.dumps(report)}")
+
+@app.cli.command('token-report')
+@click.option('--hours', default=24.0, show_default=True,
+              help='Only count recommendations saved in the last N hours.')
+def token_report_command(hours):
+    """Token usage and LLM latency per prompt template"""
+    since = datetime.utcnow() - timedelta(hours=hours)
+    rows = db.session.query(
+            Recommendation.prompt_template, Recommendation.source,
+            db.func.count(Recommendation.id).label('calls'),
+            db.func.avg(Recommendation.prompt_tokens).label('prompt_tokens'),
+            db.func.avg(Recommendation.completion_tokens).label('completion_tokens'),
+            db.func.avg(Recommendation.llm_latency_ms).label('latency_ms'),
+            (db.func.sum(Recommendation.llm_latency_ms) /
+             db.func.nullif(db.func.sum(Recommendation.completion_tokens), 0)).label('ms_per_token'))\
+        .filter(Recommendation.created_at >= since, Recommendation.completion_tokens.isnot(None))\
+        .group_by(Recommendation.prompt_template, Recommendation.source)\
+        .order_by(Recommendation.prompt_template, Recommendation.source)\
+        .all()
+    if not rows:
+        click.echo(f"No LLM-generated recommendations with token usage in the last {hours:g} hours")
+        return
+    click.echo(f"{'template':<10}{'source':<11}{'rows':>7}{'prompt tok':>12}{'compl tok':>11}"
+          f"{'latency ms':>12}{'ms/token':>10}")
+    for row in rows:
+        click.echo(f"{row.prompt_template or '-':<10}{row.source or '-':<11}{row.calls:>7}"
+              f"{row.prompt_tokens or 0:>12.0f}{row.completion_tokens or 0:>11.0f}"
+              f"{row.latency_ms or 0:>12.0f}{row.ms_per_token or 0:>10.2f}")
+
+@app.cli.command('warm-cache')
+@click.option('--top', type=int, default=lambda: app.config['PRECOMPUTE_TOP_QUERIES'],
+              show_default='PRECOMPUTE_TOP_QUERIES', help='Most requested queries to precompute.')
+@click.option('--days', type=float, default=lambda: app.config['PRECOMPUTE_WINDOW_DAYS'],
+              show_default='PRECOMPUTE_WINDOW_DAYS', help='Days of requests mined for the top queries.')
+@click.option('--max-age-hours', type=float, default=lambda: app.config['PRECOMPUTE_MAX_AGE_HOURS'],
+              show_default='PRECOMPUTE_MAX_AGE_HOURS', help='Regenerate answers older than this.')
+@click.option('--pause', type=float, default=0.0, show_default=True,
+              help='Seconds between chunks of LLM calls, to leave rate-limit headroom for live traffic.')
+@click.option('--interval', type=float, default=0.0, show_default=True,
+              help='Keep running and repeat every N seconds (0 runs once).')
+@click.option('--report-only', is_flag=True, help='Only print the hit-rate report.')
+def warm_cache_command(top, days, max_age_hours, pause, interval, report_only):
+    """Precompute answers for the most frequent queries and report the hit rate"""
+    if not get_client() and not report_only:
+        click.echo("⚠️  GROQ_API_KEY not set - answers cannot be precomputed")
+    while True:
+        if not report_only:
+            click.echo(f"🔥 Warming precomputed answers for the top {top} queries of the last {days:g} days")
+            click.echo(f"✅ warm-cache: {json.dumps(warm_precomputed(top, days, max_age_hours, pause))}")
+        click.echo(f"📈 hit rate: {json.dumps(precompute_hit_report(days))}")
+        if report_only or not interval:
+            return
+        db.session.remove()
+        time.sleep(interval)
+
+@app.cli.command('retention')
+@click.option('--session-ttl-days', type=float, default=lambda: app.config['RETENTION_SESSION_TTL_DAYS'],
+              show_default='RETENTION_SESSION_TTL_DAYS', help='Delete sessions inactive for longer (0 keeps them).')
+@click.option('--rollup-after-days', type=float, default=lambda: app.config['RETENTION_ROLLUP_AFTER_DAYS'],
+              show_default='RETENTION_ROLLUP_AFTER_DAYS',
+              help='Fold older recommendations into daily rollups (0 keeps them).')
+@click.option('--chunk-size', type=int, default=lambda: app.config['RETENTION_CHUNK_SIZE'],
+              show_default='RETENTION_CHUNK_SIZE', help='Rows deleted per transaction.')
+@click.option('--pause', type=float, default=lambda: app.config['RETENTION_CHUNK_PAUSE'],
+              show_default='RETENTION_CHUNK_PAUSE', help='Seconds between transactions, to let requests write.')
+@click.option('--prune-catalog', is_flag=True,
+              help='Also delete catalog movies no recommendation refers to any more.')
+@click.option('--vacuum/--no-vacuum', default=None,
+              help='Force or skip VACUUM [default: when RETENTION_VACUUM_THRESHOLD of the pages are free].')
+@click.option('--dry-run', is_flag=True, help='Only count the rows that would be removed.')
+@click.option('--interval', type=float, default=0.0, show_default=True,
+              help='Keep running and repeat every N seconds (0 runs once).')
+def retention_command(session_ttl_days, rollup_after_days, chunk_size, pause, prune_catalog, vacuum,
+                      dry_run, interval):
+    """Delete inactive sessions, roll up old recommendations and compact the database"""
+    from retention import run_retention
+    
+    if session_ttl_days and session_ttl_days * 86400 <= app.config['SESSION_CACHE_MAX_IDLE']:
+        raise click.BadParameter("must be longer than SESSION_CACHE_MAX_IDLE", param_hint='--session-ttl-days')
+    while True:
+        report = run_retention(
+            session_ttl_days=session_ttl_days, rollup_after_days=rollup_after_days, chunk_size=chunk_size,
+            pause=pause, prune_catalog=prune_catalog, vacuum=vacuum,
+            vacuum_threshold=app.config['RETENTION_VACUUM_THRESHOLD'], dry_run=dry_run)
+        click.echo(f"{'🔍' if dry_run else '🧹'} retention: {json.dumps(report)}")
+        if dry_run or not interval:
+            return
+        db.session.remove()
+        time.sleep(interval)
 
 # ==================== MAIN ====================
 
 if __name__ == '__main__':
-    print("\n" + "="*60)
-    print("🎬 CineAI Backend API Server")
-    print("="*60)
-    
-    # Initialize database
-    init_db()
+    # Development server; creates missing tables unless DB_AUTO_CREATE=false
+    if app.config['DB_AUTO_CREATE']:
+        init_db()
     
-    # Display configuration
-    print(f"\n🔧 Configuration:")
-    print(f"   🔑 Groq API Key: {'✅ Configured' if client else '❌ Not Set (Update GROQ_API_KEY variable)'}")
-    print(f"   🤖 AI Model: Llama 3.3 70B Versatile (via Groq)")
-    print(f"   🗄️  Database: SQLite (movies.db)")
-    print(f"   🔒 Secret Key: Using default")
-    
-    print(f"\n🌐 Server Configuration:")
-    print(f"   📍 Host: 0.0.0.0")
-    print(f"   🔌 Port: 5000")
-    print(f"   🌍 Backend API: http://localhost:5000")
-    print(f"   🐛 Debug Mode: {app.debug}")
-    
-    print(f"\n📡 API Endpoints (JSON only):")
-    print(f"   - GET    /                              → API Info")
-    print(f"   - GET    /api/health                    → Health Check")
-    print(f"   - POST   /api/recommend                 → Get Recommendations")
-    print(f"   - GET    /api/history/<session_id>      → Get History")
-    print(f"   - GET    /api/statistics                → Get Statistics")
-    print(f"   - DELETE /api/clear-history/<session_id> → Clear History")
-    
-    print("\n" + "="*60)
-    print("🚀 Starting API Server...")
-    print("⚛️  React Frontend: http://localhost:3000")
-    print("📝 Make sure React is running separately!")
-    print("="*60 + "\n")
+    logger.info("🎬 CineAI Backend API on http://localhost:5000 (endpoints listed at GET /)")
+    logger.info("🔑 Groq API Key: %s | ⚡ Recommendation Cache: %s",
+                'configured' if LLM_CONFIGURED else 'not set (update GROQ_API_KEY)',
+                app.config['RECOMMENDATION_CACHE_BACKEND'])
     
     # Run the Flask app
     app.run(
@@ -0,0 +1,152 @@
+"""
+In-process metrics in the Prometheus text format
+Counters and histograms are kept per worker process (like the counters in
+/api/health) and rendered by GET /metrics. Components that already keep
+their own stats() dicts are exported through collectors instead of being
+counted twice.
+"""
+
+import bisect
+import threading
+
+# Seconds; spans a cache hit (~1 ms) to a slow LLM call with retries
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, '') for name in self.labelnames), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram:
+    """
+    Bucketed distribution per label set
+    observe() increments a single bucket; cumulative counts are only built
+    when the histogram is rendered.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum and count
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(name, '') for name in self.labelnames))
+        return series[-1] if series else 0
+
+    def samples(self):
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        lines = []
+        for key, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), series):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', _number(bound))])} "
+                             f"{cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_label_text(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Owns every metric of a process and renders them for /metrics"""
+
+    def __init__(self, prefix='cineai'):
+        self.prefix = prefix
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(f"{self.prefix}_{name}", documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(f"{self.prefix}_{name}", documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, component, stats):
+        """
+        Export a component's stats() dict as gauges named <prefix>_<component>_<field>
+        `stats` is called at scrape time; non-numeric fields are skipped.
+        """
+        self._collectors.append((component, stats))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for component, stats in self._collectors:
+            try:
+                values = stats() or {}
+            except Exception:
+                continue
+            for field, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{component}_{field}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {_number(value)}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,174 @@
+"""
+Schema migrations for existing databases
+db.create_all() only creates missing tables; the steps here reshape data,
+add indexes and drop legacy tables on databases created by older versions.
+Every step is idempotent and safe to re-run after an interruption.
+
+Run with:
+    flask --app main migrate-db
+"""
+
+from sqlalchemy import bindparam, inspect, text
+
+from logging_setup import get_logger
+from main import (db, APP_STATS_ID, AppStats, Recommendation, RecommendationItem, catalog_key,
+                  compute_app_stats, upsert_catalog_movies)
+
+logger = get_logger('migrations')
+
+
+def database_size_bytes():
+    """On-disk size of the database (SQLite page count, Postgres pg_database_size)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        page_count = db.session.execute(text("PRAGMA page_count")).scalar()
+        page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+        return page_count * page_size
+    if dialect == 'postgresql':
+        return db.session.execute(text("SELECT pg_database_size(current_database())")).scalar()
+    return None
+
+
+def vacuum_database():
+    """Return freed pages to the filesystem; VACUUM cannot run inside a transaction"""
+    dialect = db.engine.dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        return
+    db.session.commit()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        connection.execute(text("VACUUM"))
+
+
+def migrate_legacy_movies(batch_size=500, keep_legacy=False):
+    """
+    Move rows from the legacy per-recommendation `movies` table into the
+    deduplicated catalog plus recommendation_items
+    Works through whole recommendations in batches and deletes each batch
+    from `movies` in the same transaction, so an interrupted run resumes
+    where it stopped.
+    """
+    if 'movies' not in inspect(db.engine).get_table_names():
+        return {"skipped": "no legacy movies table"}
+
+    bytes_before = database_size_bytes()
+
+    # Rows whose recommendation was bulk-deleted by clear-history were never cascaded
+    orphans_removed = db.session.execute(text(
+        "DELETE FROM movies WHERE recommendation_id NOT IN (SELECT id FROM recommendations)"
+    )).rowcount
+    db.session.commit()
+
+    select_batch_ids = text(
+        "SELECT DISTINCT recommendation_id FROM movies ORDER BY recommendation_id LIMIT :limit")
+    select_rows = text(
+        "SELECT id, recommendation_id, title, year, genre, description, rating"
+        " FROM movies WHERE recommendation_id IN :ids ORDER BY recommendation_id, id"
+    ).bindparams(bindparam('ids', expanding=True))
+    delete_rows = text(
+        "DELETE FROM movies WHERE recommendation_id IN :ids"
+    ).bindparams(bindparam('ids', expanding=True))
+
+    migrated_rows = 0
+    migrated_recommendations = 0
+    while True:
+        recommendation_ids = db.session.execute(select_batch_ids, {"limit": batch_size}).scalars().all()
+        if not recommendation_ids:
+            break
+        rows = db.session.execute(select_rows, {"ids": recommendation_ids}).mappings().all()
+        catalog_ids = upsert_catalog_movies(rows)
+
+        items = []
+        rank = 0
+        previous_recommendation_id = None
+        for row in rows:
+            rank = rank + 1 if row['recommendation_id'] == previous_recommendation_id else 1
+            previous_recommendation_id = row['recommendation_id']
+            items.append({
+                'recommendation_id': row['recommendation_id'],
+                'movie_id': catalog_ids[(catalog_key(row['title']), int(row['year']))][0],
+                'rank': rank,
+                'rating': row['rating'],
+            })
+        db.session.execute(RecommendationItem.__table__.insert(), items)
+        db.session.execute(delete_rows, {"ids": recommendation_ids})
+        db.session.commit()
+
+        migrated_rows += len(rows)
+        migrated_recommendations += len(recommendation_ids)
+        logger.info("   ↪ migrated %d movie rows (%d recommendations)", migrated_rows, migrated_recommendations)
+
+    report = {
+        "migrated_rows": migrated_rows,
+        "migrated_recommendations": migrated_recommendations,
+        "orphans_removed": orphans_removed,
+        "legacy_table_dropped": not keep_legacy,
+    }
+    if not keep_legacy:
+        db.session.execute(text("DROP TABLE movies"))
+        db.session.commit()
+        vacuum_database()
+        report["bytes_before"] = bytes_before
+        report["bytes_after"] = database_size_bytes()
+    return report
+
+
+def resync_app_stats():
+    """Recount every table into the app_stats counters row"""
+    counts = compute_app_stats()
+    stats = db.session.get(AppStats, APP_STATS_ID)
+    if stats is None:
+        db.session.add(AppStats(id=APP_STATS_ID, **counts))
+    else:
+        for name, value in counts.items():
+            setattr(stats, name, value)
+    db.session.commit()
+    return counts
+
+
+def add_missing_columns():
+    """
+    create_all() never alters tables that already exist; add the nullable
+    columns introduced since (e.g. token accounting on recommendations)
+    """
+    added = []
+    for table in (Recommendation.__table__, AppStats.__table__):
+        existing = {column['name'] for column in inspect(db.engine).get_columns(table.name)}
+        for column in table.columns:
+            # NOT NULL columns would need a backfill; none have been added so far
+            if column.name in existing or not column.nullable:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(f"{table.name}.{column.name}")
+    db.session.commit()
+    return {"added": added}
+
+
+def create_missing_indexes():
+    """create_all() skips indexes on tables that already exist; add them here"""
+    created = []
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(Recommendation.__tablename__)}
+    for index in Recommendation.__table__.indexes:
+        if index.name not in existing:
+            index.create(db.engine)
+            created.append(index.name)
+    return {"created": created}
+
+
+# Applied in order by run_migrations()
+MIGRATIONS = [
+    ('add-missing-columns', add_missing_columns),
+    ('normalize-movie-catalog', migrate_legacy_movies),
+    ('resync-app-stats', resync_app_stats),
+    ('create-missing-indexes', create_missing_indexes),
+]
+
+
+def run_migrations(**options):
+    """Create missing tables, then run every migration step; returns [(name, report)]"""
+    db.create_all()
+    reports = []
+    for name, step in MIGRATIONS:
+        logger.info("🔧 Running migration: %s", name)
+        reports.append((name, step(**options.get(name.replace('-', '_'), {}))))
+    return reports
@@ -0,0 +1,98 @@
+"""
+Precomputed answers for the most frequent queries
+The warm-cache job (flask --app main warm-cache) mines the recommendations
+table for the most requested normalized queries, asks Groq for them ahead of
+time and stores the answers in precomputed_recommendations. Every worker keeps
+an in-memory copy of that table and reloads it only when the job publishes a
+new version, so serving a precomputed answer costs no SQL and no LLM call.
+"""
+
+import json
+import threading
+import time
+from collections import Counter, defaultdict
+
+from cache import normalize_query
+from logging_setup import get_logger
+
+logger = get_logger('precompute')
+
+
+def rank_queries(rows, limit):
+    """
+    Fold (query text, request count) rows by normalized query
+    Returns the `limit` most requested as [(normalized key, text, count)], where
+    text is the most common spelling of that key.
+    """
+    totals = Counter()
+    spellings = defaultdict(Counter)
+    for text, count in rows:
+        key = normalize_query(text)
+        if not key:
+            continue
+        totals[key] += count
+        spellings[key][text.strip()] += count
+    return [(key, spellings[key].most_common(1)[0][0], total) for key, total in totals.most_common(limit)]
+
+
+class PrecomputedAnswers:
+    """
+    Per-worker copy of the precomputed_recommendations table
+    `load_version` returns something that changes whenever the table does
+    (row count + newest refresh time); `load_entries` returns (key, movies JSON)
+    pairs. The version is polled at most every `refresh_interval` seconds.
+    """
+
+    def __init__(self, load_version, load_entries, refresh_interval=30.0):
+        self.load_version = load_version
+        self.load_entries = load_entries
+        self.refresh_interval = refresh_interval
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._answers = {}
+        self._version = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, force=False):
+        """Reload the table if the warm-cache job changed it since the last look"""
+        now = time.monotonic()
+        if not force and now - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = now
+        try:
+            version = self.load_version()
+            if version == self._version and not force:
+                return
+            answers = {key: json.loads(movies) for key, movies in self.load_entries()}
+        except Exception as e:
+            logger.warning("⚠️  Precomputed answers reload failed: %s", e)
+            return
+        with self._lock:
+            self._answers = answers
+            self._version = version
+            self.reloads += 1
+
+    def get(self, key):
+        """Movies precomputed for a cache key (see cache.cache_key), or None"""
+        self.refresh()
+        movies = self._answers.get(key)
+        with self._lock:
+            if movies is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [dict(movie) for movie in movies]
+
+    def stats(self):
+        """Counters are per worker process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._answers),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "reloads": self.reloads,
+            }
@@ -0,0 +1,166 @@
+"""
+Prompt templates for Groq AI movie recommendations
+Every LLM call is built here: the instruction template, how many movies to
+ask for, how long each description should be, and a max_tokens budget sized
+from those two instead of a fixed 2048.
+
+Templates:
+    compact - short instructions, the default (fewer prompt tokens per call)
+    classic - the original long instruction prompt
+"""
+
+import json
+import math
+
+MODEL = "llama-3.3-70b-versatile"
+TEMPERATURE = 0.7
+TOP_P = 0.9
+
+DEFAULT_TEMPLATE = 'compact'
+DEFAULT_COUNT = 5
+DEFAULT_DESCRIPTION_LENGTH = 'medium'
+MAX_COUNT = 10
+
+# How each description length is worded in the prompt, and the completion
+# tokens one description of that length takes on average
+DESCRIPTION_LENGTHS = {
+    'short': {'sentence': '1 sentence', 'sentences': '1 sentence', 'words': 20, 'tokens': 30},
+    'medium': {'sentence': '2-3 sentence', 'sentences': '2-3 sentences', 'words': 50, 'tokens': 70},
+    'long': {'sentence': '3-4 sentence', 'sentences': '3-4 sentences', 'words': 80, 'tokens': 110},
+}
+
+# Completion tokens for one movie object apart from its description
+# ({"title": ..., "year": ..., "genre": ..., "rating": ...} plus punctuation)
+MOVIE_OVERHEAD_TOKENS = 35
+# Per query in a packed prompt: the id key and the array brackets
+PACKED_QUERY_OVERHEAD_TOKENS = 8
+# Headroom over the estimate; a response cut short still keeps its complete movies
+MAX_TOKENS_HEADROOM = 1.3
+MAX_TOKENS_CAP = 8192
+
+TEMPLATES = {
+    'compact': {
+        'system': "You recommend real movies. Reply with JSON only, no markdown.",
+        'single': (
+            'Recommend exactly {count} movies for: "{query}".\n'
+            'Reply with only a JSON array of objects with keys title, year (int), '
+            'genre (comma-separated string), description ({sentences}, at most {words} words, '
+            'on the plot and why it fits) and rating (float, 6.0-10.0).'
+        ),
+        'batch': (
+            'Recommend exactly {count} movies for each preference below.\n'
+            'Preferences by id: {queries}\n'
+            'Reply with only a JSON object mapping every id to an array of objects with keys '
+            'title, year (int), genre (comma-separated string), description ({sentences}, '
+            'at most {words} words, on the plot and why it fits) and rating (float, 6.0-10.0).'
+        ),
+    },
+    'classic': {
+        'system': (
+            "You are a helpful movie recommendation assistant. You ONLY respond with valid JSON "
+            "arrays containing movie data. Never include markdown formatting or explanations."
+        ),
+        'batch_system': (
+            "You are a helpful movie recommendation assistant. You ONLY respond with valid JSON "
+            "objects containing movie data. Never include markdown formatting or explanations."
+        ),
+        'single': """You are a movie expert AI assistant. Based on the user's preference: "{query}", recommend exactly {count} movies.
+
+Return ONLY a valid JSON array with this exact format (no markdown, no explanation, no extra text):
+[
+  {{"title": "Movie Name", "year": 2024, "genre": "Action, Drama", "description": "Brief {sentence} description of the movie plot and why it's recommended.", "rating": 8.5}}
+]
+
+IMPORTANT REQUIREMENTS:
+- Return exactly {count} movies
+- Use real movies with accurate release years
+- Genre should be comma-separated string (e.g., "Action, Thriller")
+- Rating must be between 6.0 and 10.0 as a float
+- Description should be {sentences} explaining the plot and why it matches the user's preference
+- Return ONLY the JSON array with no additional text, no markdown code blocks, no explanations
+- Ensure the JSON is properly formatted and valid""",
+        'batch': """You are a movie expert AI assistant. Recommend exactly {count} movies for EACH user preference below.
+
+Preferences by id: {queries}
+
+Return ONLY a valid JSON object with one key per id, each holding an array in this exact format (no markdown, no explanation, no extra text):
+{{"q1": [{{"title": "Movie Name", "year": 2024, "genre": "Action, Drama", "description": "Brief {sentence} description of the movie plot and why it's recommended.", "rating": 8.5}}]}}
+
+IMPORTANT REQUIREMENTS:
+- Every id must be present with exactly {count} movies
+- Use real movies with accurate release years
+- Genre should be comma-separated string (e.g., "Action, Thriller")
+- Rating must be between 6.0 and 10.0 as a float
+- Description should be {sentences} explaining the plot and why it matches that preference
+- Return ONLY the JSON object with no additional text, no markdown code blocks, no explanations""",
+    },
+}
+
+
+def validate_options(count=DEFAULT_COUNT, description_length=DEFAULT_DESCRIPTION_LENGTH,
+                     template=DEFAULT_TEMPLATE, max_count=MAX_COUNT):
+    """
+    Check request-level prompt options and return them normalized
+    Raises ValueError with a message fit for a 400 response.
+    """
+    if isinstance(count, bool) or not isinstance(count, int) or not 1 <= count <= max_count:
+        raise ValueError(f"count must be an integer between 1 and {max_count}")
+    if description_length not in DESCRIPTION_LENGTHS:
+        raise ValueError(f"description_length must be one of: {', '.join(DESCRIPTION_LENGTHS)}")
+    if template not in TEMPLATES:
+        raise ValueError(f"template must be one of: {', '.join(TEMPLATES)}")
+    return {'count': count, 'description_length': description_length, 'template': template}
+
+
+def cache_variant(count=DEFAULT_COUNT, description_length=DEFAULT_DESCRIPTION_LENGTH, **_):
+    """
+    Cache/single-flight key suffix for a response shape, None for the default shape
+    The template is left out: it changes how the question is asked, not the answer.
+    """
+    if count == DEFAULT_COUNT and description_length == DEFAULT_DESCRIPTION_LENGTH:
+        return None
+    return f"{count}-{description_length}"
+
+
+def max_tokens_for(count=DEFAULT_COUNT, description_length=DEFAULT_DESCRIPTION_LENGTH, queries=1):
+    """Completion budget for `queries` answers of `count` movies each"""
+    per_movie = MOVIE_OVERHEAD_TOKENS + DESCRIPTION_LENGTHS[description_length]['tokens']
+    per_query = count * per_movie + (PACKED_QUERY_OVERHEAD_TOKENS if queries > 1 else 0)
+    return min(MAX_TOKENS_CAP, math.ceil(per_query * queries * MAX_TOKENS_HEADROOM) + 16)
+
+
+def _request(system_prompt, user_prompt, max_tokens, **extra):
+    request = {
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ],
+        "model": MODEL,
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens,
+        "top_p": TOP_P,
+    }
+    request.update(extra)
+    return request
+
+
+def build_request(query, count=DEFAULT_COUNT, description_length=DEFAULT_DESCRIPTION_LENGTH,
+                  template=DEFAULT_TEMPLATE):
+    """Groq chat completion arguments for one query"""
+    prompt = TEMPLATES[template]['single'].format(
+        query=query, count=count, **DESCRIPTION_LENGTHS[description_length])
+    return _request(TEMPLATES[template]['system'], prompt, max_tokens_for(count, description_length))
+
+
+def build_batch_request(queries, count=DEFAULT_COUNT, description_length=DEFAULT_DESCRIPTION_LENGTH,
+                        template=DEFAULT_TEMPLATE):
+    """
+    Groq arguments that answer several queries in one completion
+    `queries` maps short ids (q1, q2, ...) to query text; the model replies with
+    one JSON object keyed by the same ids.
+    """
+    prompt = TEMPLATES[template]['batch'].format(
+        queries=json.dumps(queries), count=count, **DESCRIPTION_LENGTHS[description_length])
+    system_prompt = TEMPLATES[template].get('batch_system', TEMPLATES[template]['system'])
+    return _request(system_prompt, prompt, max_tokens_for(count, description_length, queries=len(queries)),
+                    response_format={"type": "json_object"})
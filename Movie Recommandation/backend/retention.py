@@ -0,0 +1,220 @@
+"""
+Retention and compaction for the recommendations database
+Sessions inactive for longer than a TTL are deleted with their history, and
+recommendations older than a cutoff are folded into daily rollups before
+being deleted. Statistics keep counting both through the archived_* columns
+of app_stats. Deletes run in small keyset-paged chunks, one short
+transaction each, so live requests can write in between. The job finishes
+with ANALYZE, and a VACUUM once enough of the file is free pages.
+
+Run with:
+    flask --app main retention --dry-run
+    flask --app main retention
+"""
+
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from logging_setup import get_logger
+from main import (db, CatalogMovie, Recommendation, RecommendationItem, RecommendationRollup, User,
+                  _dialect_insert, bump_app_stats, session_registry)
+from migrations import database_size_bytes, vacuum_database
+
+logger = get_logger('retention')
+
+TABLES = (User, Recommendation, RecommendationItem, CatalogMovie, RecommendationRollup)
+
+
+def table_counts():
+    return {model.__tablename__: db.session.query(db.func.count(model.id)).scalar() for model in TABLES}
+
+
+def free_page_ratio():
+    """Share of the SQLite file that is free pages (None on other databases)"""
+    if db.engine.dialect.name != 'sqlite':
+        return None
+    page_count = db.session.execute(text("PRAGMA page_count")).scalar()
+    free_pages = db.session.execute(text("PRAGMA freelist_count")).scalar()
+    return free_pages / page_count if page_count else 0.0
+
+
+def in_chunks(select_ids, process, chunk_size, pause):
+    """
+    Call process(ids) and commit for each chunk of id rows select_ids(after_id, limit) returns
+    Paging by id means rows that process() decides to keep are not selected again.
+    Returns the number of chunks.
+    """
+    after_id = 0
+    chunks = 0
+    while True:
+        ids = [row[0] for row in select_ids(after_id, chunk_size)]
+        if not ids:
+            return chunks
+        process(ids)
+        db.session.commit()
+        chunks += 1
+        after_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+
+
+def rollup_recommendations(recommendation_ids):
+    """Add the recommendations' daily totals to recommendation_rollups (no commit)"""
+    rows = db.session.query(
+            Recommendation.created_at, Recommendation.source, Recommendation.prompt_tokens,
+            Recommendation.completion_tokens, db.func.count(RecommendationItem.id))\
+        .outerjoin(RecommendationItem, RecommendationItem.recommendation_id == Recommendation.id)\
+        .filter(Recommendation.id.in_(recommendation_ids))\
+        .group_by(Recommendation.id)\
+        .all()
+    totals = defaultdict(lambda: {'recommendations': 0, 'movies': 0, 'prompt_tokens': 0, 'completion_tokens': 0})
+    for created_at, source, prompt_tokens, completion_tokens, movies in rows:
+        total = totals[(created_at.date(), source or 'unknown')]
+        total['recommendations'] += 1
+        total['movies'] += movies
+        total['prompt_tokens'] += prompt_tokens or 0
+        total['completion_tokens'] += completion_tokens or 0
+
+    statement = _dialect_insert(RecommendationRollup)
+    for (day, source), total in totals.items():
+        if statement is not None:
+            db.session.execute(statement.values(day=day, source=source, **total).on_conflict_do_update(
+                index_elements=['day', 'source'],
+                set_={name: getattr(RecommendationRollup, name) + getattr(statement.excluded, name)
+                      for name in total}))
+            continue
+        existing = db.session.query(RecommendationRollup).filter_by(day=day, source=source).first()
+        if existing is None:
+            db.session.add(RecommendationRollup(day=day, source=source, **total))
+        else:
+            for name, value in total.items():
+                setattr(existing, name, getattr(existing, name) + value)
+
+
+def archive_recommendations(recommendation_ids):
+    """Roll up, then delete recommendations and their items (no commit); returns (recommendations, items)"""
+    rollup_recommendations(recommendation_ids)
+    deleted_items = db.session.query(RecommendationItem)\
+        .filter(RecommendationItem.recommendation_id.in_(recommendation_ids))\
+        .delete(synchronize_session=False)
+    deleted = db.session.query(Recommendation)\
+        .filter(Recommendation.id.in_(recommendation_ids))\
+        .delete(synchronize_session=False)
+    bump_app_stats(total_recommendations=-deleted, total_movies=-deleted_items,
+                   archived_recommendations=deleted, archived_movies=deleted_items)
+    return deleted, deleted_items
+
+
+def run_retention(session_ttl_days=90, rollup_after_days=180, chunk_size=500, pause=0.05,
+                  prune_catalog=False, vacuum=None, vacuum_threshold=0.2, dry_run=False):
+    """
+    One retention pass; returns a report of rows and bytes reclaimed
+    `vacuum` forces (True) or skips (False) the VACUUM; by default SQLite is
+    vacuumed when `vacuum_threshold` of its pages are free and PostgreSQL
+    always gets a plain (non-blocking) VACUUM after rows were deleted.
+    """
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    session_cutoff = now - timedelta(days=session_ttl_days) if session_ttl_days else None
+    rollup_cutoff = now - timedelta(days=rollup_after_days) if rollup_after_days else None
+
+    # A recent recommendation also counts as activity, in case last_active lags behind
+    # (it is written in batches, and an older worker may not have updated it at all)
+    expired_users = db.session.query(User.id).filter(
+        User.last_active < session_cutoff,
+        ~db.exists().where(Recommendation.user_id == User.id, Recommendation.created_at >= session_cutoff),
+    ) if session_cutoff else None
+    old = []
+    if rollup_cutoff:
+        old.append(Recommendation.created_at < rollup_cutoff)
+    if expired_users is not None:
+        old.append(Recommendation.user_id.in_(expired_users.scalar_subquery()))
+    orphaned = ~db.exists().where(RecommendationItem.movie_id == CatalogMovie.id)
+
+    if dry_run:
+        return {
+            "expired_sessions": expired_users.count() if expired_users is not None else 0,
+            "recommendations_to_archive":
+                db.session.query(Recommendation.id).filter(db.or_(*old)).count() if old else 0,
+            "orphaned_catalog_movies":
+                db.session.query(CatalogMovie.id).filter(orphaned).count() if prune_catalog else 0,
+            "rows": table_counts(),
+            "bytes": database_size_bytes(),
+        }
+
+    rows_before = table_counts()
+    bytes_before = database_size_bytes()
+    report = {"archived_recommendations": 0, "archived_items": 0, "expired_sessions": 0,
+              "pruned_catalog_movies": 0, "chunks": 0}
+
+    # Old recommendations and the whole history of expired sessions
+    def select_old(after_id, limit):
+        return db.session.query(Recommendation.id).filter(Recommendation.id > after_id, db.or_(*old))\
+            .order_by(Recommendation.id).limit(limit).all()
+
+    def archive(ids):
+        deleted, deleted_items = archive_recommendations(ids)
+        report["archived_recommendations"] += deleted
+        report["archived_items"] += deleted_items
+
+    if old:
+        report["chunks"] += in_chunks(select_old, archive, chunk_size, pause)
+
+    # Expired sessions, now without history; a session that came back meanwhile is kept
+    if expired_users is not None:
+        def select_expired(after_id, limit):
+            return expired_users.filter(User.id > after_id).order_by(User.id).limit(limit).all()
+
+        def expire(ids):
+            session_ids = [row.session_id for row in db.session.query(User.session_id).filter(User.id.in_(ids))]
+            deleted = db.session.query(User)\
+                .filter(User.id.in_(ids), User.last_active < session_cutoff,
+                        ~db.exists().where(Recommendation.user_id == User.id))\
+                .delete(synchronize_session=False)
+            bump_app_stats(total_users=-deleted, archived_users=deleted)
+            session_registry.forget(*session_ids)
+            report["expired_sessions"] += deleted
+
+        report["chunks"] += in_chunks(select_expired, expire, chunk_size, pause)
+
+    # Catalog movies no recommendation refers to any more (opt-in: they still feed the local index)
+    if prune_catalog:
+        def select_orphans(after_id, limit):
+            return db.session.query(CatalogMovie.id).filter(CatalogMovie.id > after_id, orphaned)\
+                .order_by(CatalogMovie.id).limit(limit).all()
+
+        def prune(ids):
+            deleted = db.session.query(CatalogMovie).filter(CatalogMovie.id.in_(ids), orphaned)\
+                .delete(synchronize_session=False)
+            bump_app_stats(unique_movies=-deleted)
+            report["pruned_catalog_movies"] += deleted
+
+        report["chunks"] += in_chunks(select_orphans, prune, chunk_size, pause)
+
+    db.session.execute(text("ANALYZE"))
+    db.session.commit()
+    free_ratio = free_page_ratio()
+    deleted_any = report["archived_recommendations"] or report["expired_sessions"] or report["pruned_catalog_movies"]
+    if vacuum is None:
+        vacuum = free_ratio >= vacuum_threshold if free_ratio is not None else bool(deleted_any)
+    if vacuum:
+        logger.info("🧹 Vacuuming the database")
+        vacuum_database()
+
+    rows_after = table_counts()
+    bytes_after = database_size_bytes()
+    report.update(
+        rows_reclaimed={table: rows_before[table] - rows_after[table]
+                        for table in rows_before if rows_before[table] > rows_after[table]},
+        rollup_rows_added=rows_after['recommendation_rollups'] - rows_before['recommendation_rollups'],
+        free_page_ratio=round(free_ratio, 4) if free_ratio is not None else None,
+        vacuumed=bool(vacuum),
+        bytes_before=bytes_before,
+        bytes_after=bytes_after,
+        bytes_reclaimed=bytes_before - bytes_after if bytes_before is not None else None,
+        seconds=round(time.perf_counter() - started, 2),
+    )
+    return report
@@ -0,0 +1,134 @@
+"""
+Session bookkeeping kept off the request hot path
+Maps session ids to user ids in memory and batches last_active updates so a
+returning session costs no database writes before the LLM call starts.
+"""
+
+import atexit
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from logging_setup import get_logger
+
+logger = get_logger('sessions')
+
+
+class SessionRegistry:
+    """
+    session_id -> user_id cache plus a buffer of pending last_active timestamps
+    `resolve_user_id(session_id)` looks up or atomically creates the user and
+    returns (user_id, created); `flush_last_active({user_id: timestamp})`
+    persists a batch in one transaction.
+    A mapping unused for `max_idle` seconds is resolved again, so a user deleted
+    by the retention job in another process is recreated instead of reused.
+    """
+
+    def __init__(self, resolve_user_id, flush_last_active, max_entries=50000, flush_interval=30.0,
+                 max_idle=3600.0):
+        self.resolve_user_id = resolve_user_id
+        self.flush_last_active = flush_last_active
+        self.max_entries = max_entries
+        self.flush_interval = flush_interval
+        self.max_idle = max_idle
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_rows = 0
+        self._users = OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._writer_pid = None
+        atexit.register(self.flush)
+
+    def get_user_id(self, session_id):
+        """Return the user id for a session, creating the user on first sight"""
+        now = time.monotonic()
+        with self._lock:
+            user_id, last_used = self._users.get(session_id, (None, None))
+            if user_id is not None and self.max_idle and now - last_used > self.max_idle:
+                del self._users[session_id]
+                user_id = None
+            if user_id is not None:
+                self._users[session_id] = (user_id, now)
+                self._users.move_to_end(session_id)
+                self.hits += 1
+                self._pending[user_id] = datetime.utcnow()
+        if user_id is not None:
+            self._ensure_writer()
+            return user_id
+
+        # New sessions get last_active = now from the insert itself; an existing
+        # user (served by another worker, or before a restart) is touched like a hit
+        user_id, created = self.resolve_user_id(session_id)
+        with self._lock:
+            self.misses += 1
+            if not created:
+                self._pending[user_id] = datetime.utcnow()
+            self._users[session_id] = (user_id, now)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+        self._ensure_writer()
+        return user_id
+
+    def forget(self, *session_ids):
+        """Drop cached mappings, e.g. after users were deleted"""
+        with self._lock:
+            for session_id in session_ids:
+                user_id, _ = self._users.pop(session_id, (None, None))
+                self._pending.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._pending.clear()
+
+    def flush(self):
+        """Write every buffered last_active timestamp in one batch"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                self.flush_last_active(pending)
+            except Exception as e:
+                # Keep the newest timestamps for the next attempt
+                with self._lock:
+                    for user_id, timestamp in pending.items():
+                        self._pending.setdefault(user_id, timestamp)
+                logger.warning("⚠️  Failed to flush last_active updates: %s", e)
+                return 0
+            with self._lock:
+                self.flushes += 1
+                self.flushed_rows += len(pending)
+            return len(pending)
+
+    def _ensure_writer(self):
+        # Threads do not survive fork, so each worker process starts its own writer
+        if self._writer_pid == os.getpid() or self.flush_interval <= 0:
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            self._writer_pid = os.getpid()
+        threading.Thread(target=self._run_writer, name='cineai-last-active', daemon=True).start()
+
+    def _run_writer(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached_sessions": len(self._users),
+                "hits": self.hits,
+                "misses": self.misses,
+                "pending_last_active": len(self._pending),
+                "flushes": self.flushes,
+                "flushed_rows": self.flushed_rows,
+            }
@@ -0,0 +1,189 @@
+"""
+Request coalescing (single-flight) for upstream LLM calls
+Concurrent callers asking for the same key wait on one in-flight call and
+share its result instead of each hitting Groq.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from logging_setup import get_logger
+
+logger = get_logger('singleflight')
+
+
+class _Call:
+    """One in-flight upstream call that followers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SQLiteFlightLock:
+    """
+    Cross-process lock table so gunicorn workers on one host coalesce too
+    A row in inflight_requests marks a key as being computed by some worker;
+    rows expire so a crashed worker cannot block a key forever.
+    """
+
+    def __init__(self, path, lease_seconds=60):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().execute(
+            "CREATE TABLE IF NOT EXISTS inflight_requests ("
+            " key TEXT PRIMARY KEY,"
+            " owner TEXT NOT NULL,"
+            " expires_at REAL NOT NULL)"
+        )
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def try_acquire(self, key):
+        now = time.time()
+        conn = self._connect()
+        conn.execute("DELETE FROM inflight_requests WHERE key = ? AND expires_at <= ?", (key, now))
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO inflight_requests (key, owner, expires_at) VALUES (?, ?, ?)",
+            (key, self.owner, now + self.lease_seconds),
+        )
+        return cursor.rowcount == 1
+
+    def is_held(self, key):
+        row = self._connect().execute(
+            "SELECT 1 FROM inflight_requests WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def release(self, key):
+        self._connect().execute(
+            "DELETE FROM inflight_requests WHERE key = ? AND owner = ?",
+            (key, self.owner),
+        )
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent calls
+    Within a process followers block on the leader's Event. With a lock store,
+    a worker that loses the cross-process race polls `peek` (normally the
+    shared cache) until the winning worker publishes its result.
+    """
+
+    def __init__(self, lock_store=None, wait_timeout=60.0, poll_interval=0.1):
+        self.lock_store = lock_store
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self.leader_calls = 0
+        self.coalesced = 0
+        self.coalesced_cross_process = 0
+        self.wait_timeouts = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, peek=None):
+        """
+        Run fn() once per key at a time and return (result, coalesced)
+        Exceptions raised by the leader are re-raised in every follower.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.wait_timeouts += 1
+                return fn(), False
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, coalesced = self._lead(key, fn, peek)
+            return call.result, coalesced
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    def _lead(self, key, fn, peek):
+        if self.lock_store is None or peek is None:
+            with self._lock:
+                self.leader_calls += 1
+            return fn(), False
+
+        try:
+            acquired = self.lock_store.try_acquire(key)
+        except Exception as e:
+            logger.warning("⚠️  Single-flight lock unavailable, calling upstream directly: %s", e)
+            acquired = True
+            lock_usable = False
+        else:
+            lock_usable = True
+
+        if not acquired:
+            deadline = time.monotonic() + self.wait_timeout
+            while time.monotonic() < deadline:
+                shared = peek()
+                if shared is not None:
+                    with self._lock:
+                        self.coalesced_cross_process += 1
+                    return shared, True
+                if not self.lock_store.is_held(key):
+                    # Holder finished without publishing (failure) - compute ourselves
+                    shared = peek()
+                    if shared is not None:
+                        with self._lock:
+                            self.coalesced_cross_process += 1
+                        return shared, True
+                    break
+                time.sleep(self.poll_interval)
+            else:
+                with self._lock:
+                    self.wait_timeouts += 1
+
+        with self._lock:
+            self.leader_calls += 1
+        try:
+            return fn(), False
+        finally:
+            if acquired and lock_usable:
+                try:
+                    self.lock_store.release(key)
+                except Exception:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cross_process": self.lock_store is not None,
+                "upstream_calls": self.leader_calls,
+                "coalesced": self.coalesced,
+                "coalesced_cross_process": self.coalesced_cross_process,
+                "wait_timeouts": self.wait_timeouts,
+                "in_flight": len(self._calls),
+            }
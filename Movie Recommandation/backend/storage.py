@@ -0,0 +1,106 @@
+"""
+Storage engine configuration
+Builds SQLAlchemy engine options for the configured database and storage mode.
+
+DATABASE_URL selects the database: SQLite (the default movies.db) or
+PostgreSQL, which always gets a pooled engine with pre-ping so several
+workers and hosts can write at once.
+
+DB_STORAGE_MODE=default keeps SQLAlchemy's defaults. DB_STORAGE_MODE=tuned is
+meant for production SQLite under several gunicorn workers: WAL journaling so
+readers never block the writer, synchronous=NORMAL (fsync at checkpoints
+rather than every commit), a generous busy_timeout instead of immediate
+"database is locked" errors, memory-mapped reads and a sized connection pool.
+"""
+
+import os
+
+STORAGE_MODES = ('default', 'tuned')
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def sqlite_pragmas():
+    """PRAGMAs applied to every new SQLite connection in tuned mode"""
+    return {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 30000),
+        'mmap_size': _env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024),
+        'cache_size': -_env_int('SQLITE_CACHE_SIZE_KB', 64 * 1024),
+        'temp_store': 'MEMORY',
+    }
+
+
+def database_uri(url):
+    """
+    Normalize DATABASE_URL for SQLAlchemy
+    Hosted Postgres often hands out the old postgres:// scheme, and a URL without
+    a driver is pinned to psycopg2 (requirements.txt) since newer SQLAlchemy
+    releases default to psycopg 3.
+    """
+    for scheme in ('postgres://', 'postgresql://'):
+        if url.startswith(scheme):
+            return 'postgresql+psycopg2://' + url[len(scheme):]
+    return url
+
+
+def engine_options(database_uri, mode):
+    """SQLALCHEMY_ENGINE_OPTIONS for a database URI and storage mode"""
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"DB_STORAGE_MODE must be one of: {', '.join(STORAGE_MODES)}")
+    if database_uri.startswith('postgresql'):
+        return {
+            'pool_size': _env_int('DB_POOL_SIZE', 8),
+            'max_overflow': _env_int('DB_MAX_OVERFLOW', 4),
+            'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+            # Drop connections the server or a proxy closed while idle
+            'pool_pre_ping': True,
+            'pool_recycle': _env_int('DB_POOL_RECYCLE', 1800),
+        }
+    if mode == 'default' or not database_uri.startswith('sqlite'):
+        return {}
+    return {
+        'pool_size': _env_int('DB_POOL_SIZE', 8),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 4),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+        'connect_args': {
+            # busy_timeout below supersedes this, but pysqlite applies it first
+            'timeout': _env_int('SQLITE_BUSY_TIMEOUT_MS', 30000) / 1000,
+            'check_same_thread': False,
+        },
+    }
+
+
+def configure_engine(engine, mode):
+    """Attach per-connection setup (SQLite PRAGMAs) to an engine"""
+    if mode != 'tuned' or engine.dialect.name != 'sqlite':
+        return
+    from sqlalchemy import event
+
+    pragmas = sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+def describe_engine(engine, mode):
+    """Summary of the active storage settings for /api/health"""
+    summary = {
+        "dialect": engine.dialect.name,
+        "mode": mode,
+        "pool": type(engine.pool).__name__,
+    }
+    size = getattr(engine.pool, 'size', None)
+    if callable(size):
+        summary["pool_size"] = size()
+        summary["pool_checked_out"] = engine.pool.checkedout()
+    if mode == 'tuned' and engine.dialect.name == 'sqlite':
+        summary["pragmas"] = sqlite_pragmas()
+    return summary
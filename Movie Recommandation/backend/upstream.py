@@ -0,0 +1,442 @@
+"""
+Upstream LLM execution layer
+Every Groq call goes through a pool that spreads requests over one client per
+API key and enforces, per call:
+  - bounded concurrency (a semaphore shared by all keys)
+  - token-bucket rate limiting per key, in requests and tokens per minute,
+    so bursts queue locally instead of coming back as 429s
+  - retries with full-jitter exponential backoff on transient errors
+    (429, timeouts, connection errors, 5xx), honouring Retry-After
+  - one deadline covering queueing, every attempt and every backoff
+  - optional hedging: a duplicate request on another key once the call has
+    run longer than a chosen percentile of recent latencies
+
+UpstreamPool wraps sync clients (Flask), AsyncUpstreamPool async ones (asgi.py).
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+def groq_errors():
+    """
+    (RateLimitError, APITimeoutError, every transient error) from the groq SDK
+    Imported when the first pool is built rather than with this module, so
+    importing the app (and booting a worker) does not load the SDK.
+    """
+    from groq import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return RateLimitError, APITimeoutError, (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+class UpstreamError(Exception):
+    """The upstream call gave up; status_code is what the API should answer with"""
+
+    def __init__(self, message, status_code=503, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Reservation-based token bucket
+    delay() says how long a caller must wait and reserve() always succeeds
+    (the balance may go negative), so sync and async callers can share it
+    and sleep in their own way. Callers reserve only once they have decided
+    to wait for the call, so rejected calls leave the balance untouched.
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost, now):
+        """Seconds until `cost` tokens would be available"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def reserve(self, cost, now):
+        if self.rate:
+            self._refill(now)
+            self.tokens -= cost
+
+    def refund(self, amount):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Key:
+    def __init__(self, index, client, requests_per_minute, tokens_per_minute):
+        self.index = index
+        self.client = client
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+
+
+def estimate_tokens(request):
+    """Rough request cost for the TPM bucket: prompt characters / 4 plus the completion budget"""
+    prompt = sum(len(json.dumps(message.get('content', ''))) for message in request.get('messages', []))
+    return prompt // 4 + int(request.get('max_tokens') or 0)
+
+
+def _retry_after(error):
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class _PoolBase:
+    def __init__(self, clients, max_concurrency=16, requests_per_minute=0, tokens_per_minute=0,
+                 timeout=30.0, max_retries=3, backoff_base=0.5, backoff_max=8.0,
+                 hedge_percentile=0, hedge_min_samples=20):
+        if not clients:
+            raise ValueError("UpstreamPool needs at least one client")
+        self.keys = [_Key(index, client, requests_per_minute, tokens_per_minute)
+                     for index, client in enumerate(clients)]
+        self.rate_limit_error, self.timeout_error, self.transient_errors = groq_errors()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.latencies = deque(maxlen=500)
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    # ---------- scheduling ----------
+
+    def _reserve_key(self, cost, deadline, exclude=None):
+        """
+        Pick the key that can send soonest, reserve its budget and return (key, wait)
+        Keys are tried round-robin from a moving start so equal keys share load.
+        When even the best key cannot send before the deadline nothing is
+        reserved and (None, wait) is returned.
+        """
+        with self._lock:
+            now = time.monotonic()
+            best, best_wait = None, None
+            for offset in range(len(self.keys)):
+                key = self.keys[(self._next_key + offset) % len(self.keys)]
+                if key is exclude and len(self.keys) > 1:
+                    continue
+                delay = max(key.requests.delay(1, now), key.tokens.delay(cost, now), key.cooldown_until - now)
+                if best is None or delay < best_wait:
+                    best, best_wait = key, delay
+            if best_wait >= deadline - now:
+                return None, best_wait
+            self._next_key = (best.index + 1) % len(self.keys)
+            best.requests.reserve(1, now)
+            best.tokens.reserve(cost, now)
+            best.calls += 1
+            self.attempts += 1
+            return best, best_wait
+
+    def _backoff(self, attempt, error):
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        return max(delay, retry_after) if retry_after is not None else delay
+
+    def _on_rate_limited(self, key, error):
+        retry_after = _retry_after(error)
+        with self._lock:
+            key.rate_limited += 1
+            if retry_after:
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + retry_after)
+
+    def _on_success(self, key, cost, response, latency):
+        usage = getattr(response, 'usage', None)
+        with self._lock:
+            self.latencies.append(latency)
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', None) or 0
+            self.completion_tokens += getattr(usage, 'completion_tokens', None) or 0
+            used = getattr(usage, 'total_tokens', None)
+            if used is not None:
+                key.tokens.refund(cost - used)
+
+    def hedge_delay(self):
+        """Latency percentile after which a hedge is sent, or None while hedging is off"""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))]
+
+    def _give_up(self, error):
+        with self._lock:
+            self.failures += 1
+        if isinstance(error, UpstreamError):
+            return error
+        if isinstance(error, self.rate_limit_error):
+            return UpstreamError("AI service is rate limited. Please try again shortly.", 503, _retry_after(error))
+        if isinstance(error, self.timeout_error):
+            return UpstreamError("AI service timed out. Please try again.", 504)
+        return UpstreamError(f"AI service unavailable: {error}", 503)
+
+    def stats(self):
+        with self._lock:
+            samples = sorted(self.latencies)
+            return {
+                "keys": len(self.keys),
+                "max_concurrency": self.max_concurrency,
+                "calls": self.calls,
+                "attempts": self.attempts,
+                "retries": self.retries,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "failures": self.failures,
+                "rate_limited": sum(key.rate_limited for key in self.keys),
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "p50_latency_ms": round(samples[len(samples) // 2] * 1000, 1) if samples else None,
+                "p95_latency_ms": round(samples[int(len(samples) * 0.95)] * 1000, 1) if samples else None,
+            }
+
+
+class UpstreamPool(_PoolBase):
+    """Pool over synchronous Groq clients"""
+
+    def __init__(self, clients, **options):
+        super().__init__(clients, **options)
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # Hedged calls run their attempts here so the caller can race two of them;
+        # a slot is held until both have finished, so a primary and a hedge per slot
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency * 2, thread_name_prefix='cineai-hedge'
+        ) if self.hedge_percentile else None
+
+    def create(self, **request):
+        """chat.completions.create with scheduling, retries and the call deadline"""
+        with self._lock:
+            self.calls += 1
+        deadline = time.monotonic() + self.timeout
+        if not self._slots.acquire(timeout=self.timeout):
+            raise self._give_up(UpstreamError("AI service is busy. Please try again shortly.", 503))
+        if request.get('stream'):
+            return self._stream(request, deadline)
+        hedge_after = self.hedge_delay()
+        if hedge_after is not None:
+            return self._hedged(request, deadline, hedge_after)
+        try:
+            return self._call_with_retries(request, deadline)
+        finally:
+            self._slots.release()
+
+    def _stream(self, request, deadline):
+        # Retries only cover opening the stream; the slot is held until it is consumed
+        try:
+            stream = self._call_with_retries(request, deadline)
+        except Exception:
+            self._slots.release()
+            raise
+
+        def chunks():
+            try:
+                yield from stream
+            finally:
+                self._slots.release()
+        return chunks()
+
+    def _hedged(self, request, deadline, hedge_after):
+        """
+        Race the primary against a hedge on another key once it runs past hedge_after
+        Threads cannot be cancelled, so the caller's slot is released only when
+        the losing attempt has finished too; max_concurrency stays a hard cap.
+        """
+        primary_keys = []
+        futures = [self._hedge_executor.submit(self._call_with_retries, request, deadline, None, primary_keys)]
+        try:
+            primary = futures[0]
+            done, _ = wait([primary], timeout=hedge_after)
+            if done:
+                return primary.result()
+            with self._lock:
+                self.hedges += 1
+            hedge = self._hedge_executor.submit(
+                self._call_with_retries, request, deadline, primary_keys[-1] if primary_keys else None)
+            futures.append(hedge)
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()),
+                                     return_when=FIRST_COMPLETED)
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        if future is hedge:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return future.result()
+                    error = future.exception()
+            raise error or self._give_up(UpstreamError("AI service timed out. Please try again.", 504))
+        finally:
+            self._release_when_done(futures)
+
+    def _release_when_done(self, futures):
+        """Release the caller's slot once every future has finished"""
+        pending = [future for future in futures if not future.done()]
+        if not pending:
+            self._slots.release()
+            return
+        remaining = [len(pending)]
+        lock = threading.Lock()
+
+        def finished(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self._slots.release()
+        for future in pending:
+            future.add_done_callback(finished)
+
+    def _call_with_retries(self, request, deadline, exclude=None, sent_on=None):
+        """
+        One call with retries; each retry (and a hedge, via `exclude`) avoids the key just used
+        Keys used are appended to `sent_on`, so a hedge can avoid the primary's key.
+        """
+        cost = estimate_tokens(request)
+        previous_key = exclude
+        for attempt in range(self.max_retries + 1):
+            key, delay = self._reserve_key(cost, deadline, exclude=previous_key)
+            if key is None:
+                raise self._give_up(UpstreamError(
+                    "AI service is rate limited. Please try again shortly.", 503, retry_after=delay))
+            if sent_on is not None:
+                sent_on.append(key)
+            if delay:
+                time.sleep(delay)
+            started = time.monotonic()
+            try:
+                response = key.client.chat.completions.create(
+                    timeout=max(0.1, deadline - started), **request)
+            except self.transient_errors as error:
+                if isinstance(error, self.rate_limit_error):
+                    self._on_rate_limited(key, error)
+                backoff = self._backoff(attempt, error)
+                if attempt == self.max_retries or time.monotonic() + backoff >= deadline:
+                    raise self._give_up(error)
+                with self._lock:
+                    self.retries += 1
+                previous_key = key
+                time.sleep(backoff)
+                continue
+            self._on_success(key, cost, response, time.monotonic() - started)
+            return response
+
+
+class AsyncUpstreamPool(_PoolBase):
+    """Pool over AsyncGroq clients; one instance per event loop"""
+
+    def __init__(self, clients, **options):
+        super().__init__(clients, **options)
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+
+    async def create(self, **request):
+        with self._lock:
+            self.calls += 1
+        deadline = time.monotonic() + self.timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise self._give_up(UpstreamError("AI service is busy. Please try again shortly.", 503))
+        try:
+            hedge_after = self.hedge_delay()
+            if hedge_after is None:
+                return await self._call_with_retries(request, deadline)
+            return await self._hedged(request, deadline, hedge_after)
+        finally:
+            self._slots.release()
+
+    async def _hedged(self, request, deadline, hedge_after):
+        primary_keys = []
+        primary = asyncio.ensure_future(self._call_with_retries(request, deadline, None, primary_keys))
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+        with self._lock:
+            self.hedges += 1
+        hedge = asyncio.ensure_future(
+            self._call_with_retries(request, deadline, primary_keys[-1] if primary_keys else None))
+        pending = {primary, hedge}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error or self._give_up(UpstreamError("AI service timed out. Please try again.", 504))
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call_with_retries(self, request, deadline, exclude=None, sent_on=None):
+        """Async twin of UpstreamPool._call_with_retries"""
+        cost = estimate_tokens(request)
+        previous_key = exclude
+        for attempt in range(self.max_retries + 1):
+            key, delay = self._reserve_key(cost, deadline, exclude=previous_key)
+            if key is None:
+                raise self._give_up(UpstreamError(
+                    "AI service is rate limited. Please try again shortly.", 503, retry_after=delay))
+            if sent_on is not None:
+                sent_on.append(key)
+            if delay:
+                await asyncio.sleep(delay)
+            started = time.monotonic()
+            try:
+                response = await key.client.chat.completions.create(
+                    timeout=max(0.1, deadline - started), **request)
+            except self.transient_errors as error:
+                if isinstance(error, self.rate_limit_error):
+                    self._on_rate_limited(key, error)
+                backoff = self._backoff(attempt, error)
+                if attempt == self.max_retries or time.monotonic() + backoff >= deadline:
+                    raise self._give_up(error)
+                with self._lock:
+                    self.retries += 1
+                previous_key = key
+                await asyncio.sleep(backoff)
+                continue
+            self._on_success(key, cost, response, time.monotonic() - started)
+            return response
@@ -0,0 +1,100 @@
+"""
+Background write queue that coalesces database writes into batched transactions
+Request threads submit a write job and wait for its result; a single writer
+thread per process drains the queue and commits up to `max_batch` jobs at once,
+so N concurrent saves cost one commit (and one fsync) instead of N.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class WriteQueue:
+    """
+    `run_batch(jobs)` executes a list of zero-argument callables inside one
+    transaction and returns one result per job; exceptions it raises fail
+    only the jobs of that batch. A job whose Future is cancelled before the
+    writer picks it up is never run.
+    """
+
+    def __init__(self, run_batch, max_batch=64, max_wait=0.005):
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.jobs = 0
+        self.failed_jobs = 0
+        self.largest_batch = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._writer_pid = None
+
+    def submit(self, job):
+        """Queue a write job and return a Future for its result"""
+        self._ensure_writer()
+        future = Future()
+        self._queue.put((job, future))
+        return future
+
+    def _ensure_writer(self):
+        # Threads do not survive fork, so each worker process starts its own writer
+        if self._writer_pid == os.getpid():
+            return
+        with self._lock:
+            if self._writer_pid == os.getpid():
+                return
+            # Publish the pid last: a thread taking the lock-free path above
+            # must never see it while self._queue is still the old queue
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run_writer, args=(self._queue,),
+                             name='cineai-write-queue', daemon=True).start()
+            self._writer_pid = os.getpid()
+
+    def _collect_batch(self, jobs_queue):
+        batch = [jobs_queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(jobs_queue.get(timeout=remaining) if remaining > 0 else jobs_queue.get_nowait())
+            except queue.Empty:
+                break
+        # Drop jobs whose caller gave up waiting; the rest can no longer be cancelled
+        return [(job, future) for job, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run_writer(self, jobs_queue):
+        while True:
+            batch = self._collect_batch(jobs_queue)
+            if not batch:
+                continue
+            jobs = [job for job, _ in batch]
+            try:
+                results = self.run_batch(jobs)
+            except Exception as e:
+                results = [e] * len(batch)
+            failed = 0
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    failed += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            with self._lock:
+                self.batches += 1
+                self.jobs += len(batch)
+                self.failed_jobs += failed
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "batches": self.batches,
+                "jobs": self.jobs,
+                "failed_jobs": self.failed_jobs,
+                "largest_batch": self.largest_batch,
+                "average_batch": round(self.jobs / self.batches, 2) if self.batches else 0,
+                "queued": self._queue.qsize(),
+            }